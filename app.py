@@ -1,34 +1,34 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import os
 import io
 import tempfile
 import json
 import base64
+import html
 import sys
-
-# Try to download NLTK data on startup
-try:
-    import nltk_setup
-    nltk_setup.download_nltk_data()
-except Exception as e:
-    st.warning(f"NLTK setup warning: {e}")
+from concurrent.futures import as_completed
 
 # Check for API keys
 import check_api_keys
 has_openai_key = check_api_keys.check_api_keys()
 
 # Import application modules
-from utils.transcription import get_youtube_transcript, transcribe_audio
-from utils.file_processor import process_file
+# Transcription, file processing and personalization pull in heavy dependencies
+# (Whisper, document parsers), so they are imported only on the paths that use them
 from utils.content_processor import (
     get_summary, 
     get_resources, 
     generate_study_guide, 
     generate_quiz,
-    extract_main_topics
+    extract_main_topics,
+    is_ai_result,
+    script_thread_pool,
+    submit_batch,
+    collect_batch
 )
-from utils.personal_insight import process_profile_data
 from utils.export_utils import create_export_section
+from utils import disk_cache
 
 # Set page config
 st.set_page_config(
@@ -57,14 +57,26 @@ if 'main_topic' not in st.session_state:
     st.session_state.main_topic = ""
 if 'personalized_insights' not in st.session_state:
     st.session_state.personalized_insights = None
-if 'current_step' not in st.session_state:
-    st.session_state.current_step = 0
 if 'total_steps' not in st.session_state:
     st.session_state.total_steps = 5
+if 'batch_mode' not in st.session_state:
+    st.session_state.batch_mode = False
+if 'batch_id' not in st.session_state:
+    st.session_state.batch_id = None
+
+
+def set_input_text(text):
+    """Store the input text for the current session"""
+    st.session_state.input_text = text
+
+
+def get_input_text():
+    """Return the input text for the current session"""
+    return st.session_state.input_text
 
 
 def reset_session():
-    """Reset session state variables to initial values"""
+    """Reset session state variables to initial values (used as a button callback)"""
     st.session_state.input_text = ""
     st.session_state.summary = None
     st.session_state.resources = None
@@ -74,25 +86,145 @@ def reset_session():
     st.session_state.processing_complete = False
     st.session_state.main_topic = ""
     st.session_state.personalized_insights = None
-    st.session_state.current_step = 0
-    st.rerun()
+    st.session_state.batch_id = None
+
+
+STUDY_KIT_SECTIONS = ("summary", "resources", "study_guide", "quiz")
+
+# How long a saved study kit is recalled for the same input, in seconds
+STUDY_KIT_TTL = 24 * 60 * 60
+
+
+def study_kit_cache_key():
+    """Build the disk cache key for the current input text and topic"""
+    return disk_cache.content_key(st.session_state.main_topic, get_input_text())
+
+
+def save_study_kit():
+    """Persist the generated study kit so identical input can be recalled later"""
+    study_kit = {section: st.session_state[section] for section in STUDY_KIT_SECTIONS}
+    # Kits with any fallback section aren't kept, so the input is retried once the APIs recover,
+    # and kits without input text would be keyed on the topic alone
+    if get_input_text() and all(is_ai_result(result) for result in study_kit.values()):
+        disk_cache.store("study_kit", study_kit_cache_key(), study_kit)
+
+
+def start_processing():
+    """Mark the current input for processing, recalling a cached study kit if one exists"""
+    # Recall a previously generated study kit for the same input
+    cached_kit = None
+    if get_input_text():
+        cached_kit = disk_cache.load("study_kit", study_kit_cache_key(), max_age=STUDY_KIT_TTL)
+    if cached_kit:
+        for section in STUDY_KIT_SECTIONS:
+            st.session_state[section] = cached_kit[section]
+        st.session_state.is_processing = False
+        st.session_state.processing_complete = True
+    else:
+        st.session_state.is_processing = True
+        st.session_state.processing_complete = False
 
 
 def process_input():
     """Process user input and generate study materials"""
-    st.session_state.is_processing = True
-    st.session_state.processing_complete = False
+    start_processing()
     
     # Update the UI
     st.rerun()
 
 
-def progress_step():
-    """Increment the progress step"""
-    st.session_state.current_step += 1
-    if st.session_state.current_step > st.session_state.total_steps:
-        st.session_state.current_step = st.session_state.total_steps
+def start_text_input():
+    """Callback for the text input's generate button"""
+    manual_input = st.session_state.manual_input
+    if manual_input:
+        set_input_text(manual_input)
+        st.session_state.main_topic = extract_main_topics(manual_input)
+        start_processing()
+
+
+def generate_personalized_insights():
+    """Callback for the personalization button"""
+    resume_file = st.session_state.resume_upload
+    linkedin_file = st.session_state.linkedin_upload
+    linkedin_url = st.session_state.linkedin_url
+    
+    if not (resume_file or linkedin_file or linkedin_url):
+        st.session_state.personalization_message = (
+            "warning", "Please provide either a resume, LinkedIn profile, or LinkedIn URL."
+        )
+        return
+    
+    with st.spinner("Generating personalized learning insights..."):
+        from utils.personal_insight import process_profile_data
+        linkedin_data = linkedin_file if linkedin_file else linkedin_url
+        
+        insights_result = process_profile_data(
+            resume_file, 
+            linkedin_data, 
+            get_input_text()
+        )
+    
+    if insights_result["success"]:
+        st.session_state.personalized_insights = insights_result["insights"]
+        st.session_state.personalization_message = ("success", "Personalized insights generated!")
+    else:
+        st.session_state.personalization_message = ("error", f"Error: {insights_result['error']}")
+
+
+def poll_batch():
+    """Check on a submitted batch and store its results once it has completed"""
+    batch_result = collect_batch(
+        st.session_state.batch_id,
+        get_input_text(),
+        st.session_state.main_topic
+    )
+    
+    if not batch_result["success"]:
+        st.session_state.batch_error = batch_result["error"]
+        st.session_state.batch_id = None
+        return
+    
+    st.session_state.batch_status = batch_result["status"]
+    if batch_result["results"] is not None:
+        results = batch_result["results"]
+        st.session_state.summary = results["summary"]
+        st.session_state.resources = results["resources"]
+        st.session_state.study_guide = results["study_guide"]
+        st.session_state.quiz = results["quiz"]
+        st.session_state.batch_id = None
+        st.session_state.is_processing = False
+        st.session_state.processing_complete = True
+        save_study_kit()
+
+
+def display_batch_screen():
+    """Submit the study kit as a batch job and let the user poll for results"""
+    st.subheader("⚙️ Generating Your Study Kit (Batch Mode)...")
+    
+    if st.session_state.get("batch_error"):
+        st.error(f"Batch error: {st.session_state.batch_error}")
+        st.session_state.batch_error = None
+        st.info("Generating your study kit directly instead.")
+        return False
     
+    if st.session_state.batch_id is None:
+        with st.spinner("Submitting batch job..."):
+            batch_result = submit_batch(get_input_text(), st.session_state.main_topic)
+        
+        if not batch_result["success"]:
+            st.warning(f"Batch submission failed ({batch_result['error']}), generating directly instead.")
+            return False
+        
+        st.session_state.batch_id = batch_result["batch_id"]
+        st.session_state.batch_status = "validating"
+    
+    st.info(
+        f"Batch job `{st.session_state.batch_id}` is **{st.session_state.get('batch_status', 'pending')}**. "
+        "Batch jobs cost half as much but can take a while to complete."
+    )
+    st.button("Check Batch Status", type="primary", key="poll_batch", on_click=poll_batch)
+    return True
+
 
 def display_header():
     """Display the app header"""
@@ -120,12 +252,7 @@ def display_input_section():
         
         col1, col2 = st.columns([1, 4])
         with col1:
-            generate_button = st.button("Generate Study Kit", type="primary", key="generate_text")
-        
-        if generate_button and manual_input:
-            st.session_state.input_text = manual_input
-            st.session_state.main_topic = extract_main_topics(manual_input)
-            process_input()
+            st.button("Generate Study Kit", type="primary", key="generate_text", on_click=start_text_input)
     
     with youtube_tab:
         youtube_url = st.text_input(
@@ -140,11 +267,12 @@ def display_input_section():
         
         if process_youtube_button and youtube_url:
             with st.spinner("Extracting transcript from YouTube..."):
+                from utils.transcription import get_youtube_transcript
                 transcript_result = get_youtube_transcript(youtube_url)
                 
                 if transcript_result["success"]:
-                    st.session_state.input_text = transcript_result["transcript"]
-                    st.session_state.main_topic = extract_main_topics(st.session_state.input_text)
+                    set_input_text(transcript_result["transcript"])
+                    st.session_state.main_topic = extract_main_topics(transcript_result["transcript"])
                     process_input()
                 else:
                     st.error(f"Error: {transcript_result['error']}")
@@ -166,11 +294,12 @@ def display_input_section():
                 
                 if file_process_button:
                     with st.spinner("Processing document..."):
+                        from utils.file_processor import process_file
                         result = process_file(uploaded_file)
                         
                         if result["success"]:
-                            st.session_state.input_text = result["text"]
-                            st.session_state.main_topic = extract_main_topics(st.session_state.input_text)
+                            set_input_text(result["text"])
+                            st.session_state.main_topic = extract_main_topics(result["text"])
                             process_input()
                         else:
                             st.error(f"Error: {result['error']}")
@@ -187,13 +316,14 @@ def display_input_section():
                 
                 if audio_process_button:
                     with st.spinner("Transcribing audio... This may take a while."):
-                        # Convert to BytesIO
-                        audio_bytes = io.BytesIO(audio_file.getvalue())
-                        result = transcribe_audio(audio_bytes)
+                        from utils.transcription import transcribe_audio
+                        # The uploaded file is already file-like, so pass it straight through
+                        audio_file.seek(0)
+                        result = transcribe_audio(audio_file)
                         
                         if result["success"]:
-                            st.session_state.input_text = result["transcript"]
-                            st.session_state.main_topic = extract_main_topics(st.session_state.input_text)
+                            set_input_text(result["transcript"])
+                            st.session_state.main_topic = extract_main_topics(result["transcript"])
                             process_input()
                         else:
                             st.error(f"Error: {result['error']}")
@@ -231,83 +361,151 @@ def display_personalization_section():
                 key="linkedin_url"
             )
         
-        personalize_button = st.button("Generate Personalized Insights", key="personalize")
+        st.button("Generate Personalized Insights", key="personalize", on_click=generate_personalized_insights)
         
-        if personalize_button:
-            if resume_file or linkedin_file or linkedin_url:
-                with st.spinner("Generating personalized learning insights..."):
-                    linkedin_data = linkedin_file if linkedin_file else linkedin_url
-                    
-                    insights_result = process_profile_data(
-                        resume_file, 
-                        linkedin_data, 
-                        st.session_state.input_text
-                    )
-                    
-                    if insights_result["success"]:
-                        st.session_state.personalized_insights = insights_result["insights"]
-                        st.success("Personalized insights generated!")
-                        st.rerun()
-                    else:
-                        st.error(f"Error: {insights_result['error']}")
-            else:
-                st.warning("Please provide either a resume, LinkedIn profile, or LinkedIn URL.")
+        # Show the outcome of the last personalization request
+        message = st.session_state.pop("personalization_message", None)
+        if message:
+            level, text = message
+            getattr(st, level)(text)
 
 
 def display_processing_screen():
-    """Display processing screen with progress indicators"""
+    """Display processing screen and generate the study kit in a single pass"""
     if not st.session_state.is_processing:
         return
     
+    if st.session_state.batch_mode and display_batch_screen():
+        return
+    
     st.subheader("⚙️ Generating Your Study Kit...")
     
+    total_steps = st.session_state.total_steps
     progress_bar = st.progress(0)
     
-    # Update progress based on current step
-    progress_value = st.session_state.current_step / st.session_state.total_steps
-    progress_bar.progress(progress_value)
-    
-    # Show step indicators
-    if st.session_state.current_step == 0:
-        # Step 1: Extracting Key Concepts
-        with st.spinner("Extracting Key Concepts..."):
-            st.session_state.summary = get_summary(st.session_state.input_text)
-            progress_step()
-            st.rerun()
-    
-    elif st.session_state.current_step == 1:
-        # Step 2: Finding Study Resources
-        st.info("Key concepts extracted!")
-        with st.spinner("Finding Study Resources..."):
-            st.session_state.resources = get_resources(st.session_state.main_topic)
-            progress_step()
-            st.rerun()
-    
-    elif st.session_state.current_step == 2:
-        # Step 3: Generating Study Guide
-        st.info("Study resources found!")
-        with st.spinner("Generating Study Guide..."):
-            st.session_state.study_guide = generate_study_guide(st.session_state.input_text)
-            progress_step()
-            st.rerun()
-    
-    elif st.session_state.current_step == 3:
-        # Step 4: Preparing Quiz
-        st.info("Study guide generated!")
-        with st.spinner("Preparing Quiz Questions..."):
-            st.session_state.quiz = generate_quiz(st.session_state.input_text)
-            progress_step()
-            st.rerun()
-    
-    elif st.session_state.current_step == 4:
-        # Step 5: Finalizing
-        st.info("Quiz prepared!")
-        with st.spinner("Finalizing your study kit..."):
-            # Final step
-            progress_step()
-            st.session_state.is_processing = False
-            st.session_state.processing_complete = True
-            st.rerun()
+    input_text = get_input_text()
+    main_topic = st.session_state.main_topic
+    
+    with st.status("Generating your study kit...", expanded=True) as status:
+        # The four generators are independent network calls, so run them
+        # concurrently and record each result as soon as it arrives
+        with script_thread_pool(max_workers=4) as executor:
+            futures = {
+                executor.submit(get_summary, input_text): ("summary", "Key concepts extracted!"),
+                executor.submit(get_resources, main_topic): ("resources", "Study resources found!"),
+                executor.submit(generate_study_guide, input_text): ("study_guide", "Study guide generated!"),
+                executor.submit(generate_quiz, input_text): ("quiz", "Quiz prepared!"),
+            }
+            
+            for completed, future in enumerate(as_completed(futures), start=1):
+                state_key, message = futures[future]
+                st.session_state[state_key] = future.result()
+                st.write(message)
+                progress_bar.progress(completed / total_steps)
+        
+        # Finalizing
+        st.write("Finalizing your study kit...")
+        progress_bar.progress(1.0)
+        status.update(label="Study kit ready!", state="complete")
+    
+    save_study_kit()
+    st.session_state.is_processing = False
+    st.session_state.processing_complete = True
+    st.rerun()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_export_payload(topic, summary, resources, study_guide, quiz, insights):
+    """Flatten the generated study materials into the dict used by the export section"""
+    results = {
+        "topic": topic,
+        "summary": summary.get("summary") if summary else "",
+        "resources": resources.get("resources", {}).get("resources", []) if resources else []
+    }
+    
+    # Handle study guide format
+    if study_guide and study_guide["success"]:
+        study_guide_data = study_guide.get("study_guide", {})
+        if isinstance(study_guide_data, dict) and "study_guide" in study_guide_data:
+            results["study_guide"] = study_guide_data["study_guide"]
+        else:
+            results["study_guide"] = study_guide_data
+    else:
+        results["study_guide"] = {}
+    
+    # Handle quiz format
+    if quiz and quiz["success"]:
+        quiz_data = quiz.get("quiz", None)
+        if isinstance(quiz_data, dict) and "quiz" in quiz_data:
+            results["quiz"] = quiz_data["quiz"]
+        elif isinstance(quiz_data, list):
+            results["quiz"] = quiz_data
+        else:
+            results["quiz"] = []
+    else:
+        results["quiz"] = []
+    
+    # Add personalized insights if available
+    if insights:
+        results["personalized_insights"] = insights
+    
+    return results
+
+
+QUIZ_SCRIPT = """
+<script>
+function checkAnswers() {
+    const questions = document.querySelectorAll(".quiz-question");
+    let correct = 0;
+    let feedback = "";
+    questions.forEach((question, i) => {
+        const expected = atob(question.dataset.correct);
+        const checked = question.querySelector("input:checked");
+        const selected = checked ? checked.value : null;
+        if (selected === expected) {
+            correct += 1;
+        } else {
+            feedback += `<div class="wrong">Question ${i + 1}: You selected ${selected || "nothing"}, ` +
+                        `correct answer is ${expected}.</div>`;
+        }
+    });
+    const percentage = questions.length ? (correct / questions.length * 100).toFixed(1) : "0.0";
+    document.getElementById("quiz-results").innerHTML =
+        `<div class="score">You got ${correct} out of ${questions.length} correct (${percentage}%)!</div>` +
+        (feedback ? "<h4>Correct Answers:</h4>" + feedback : "");
+}
+</script>
+"""
+
+QUIZ_STYLE = """
+<style>
+    body { font-family: "Source Sans Pro", sans-serif; }
+    .quiz-question { margin-bottom: 1rem; padding-bottom: 1rem; border-bottom: 1px solid #e6e9ef; }
+    .quiz-question label { display: block; margin: 0.3rem 0; }
+    .score { background-color: #eafaf1; padding: 0.8rem; border-radius: 6px; margin-top: 1rem; }
+    .wrong { background-color: #fff8e6; padding: 0.6rem; border-radius: 6px; margin-top: 0.5rem; }
+    button { background-color: #ff4b4b; color: white; border: none; padding: 0.5rem 1rem; border-radius: 6px; cursor: pointer; }
+</style>
+"""
+
+
+def build_quiz_html(quiz):
+    """Build a self-contained HTML quiz whose answers are checked client-side"""
+    parts = [QUIZ_STYLE]
+    for i, question in enumerate(quiz):
+        # Encode the correct answer so it isn't visible as plain text in the markup
+        correct = base64.b64encode(str(question.get("correct_answer", "")).encode()).decode()
+        parts.append(f'<div class="quiz-question" data-correct="{correct}">')
+        parts.append(f"<p><strong>Question {i+1}:</strong> {html.escape(str(question['question']))}</p>")
+        for opt_key, opt_value in question.get("options", {}).items():
+            parts.append(
+                f'<label><input type="radio" name="q{i}" value="{html.escape(str(opt_key))}"> '
+                f"<strong>{html.escape(str(opt_key))}:</strong> {html.escape(str(opt_value))}</label>"
+            )
+        parts.append("</div>")
+    parts.append('<button onclick="checkAnswers()">Check Answers</button><div id="quiz-results"></div>')
+    parts.append(QUIZ_SCRIPT)
+    return "".join(parts)
 
 
 def display_results():
@@ -359,29 +557,16 @@ def display_results():
                 for i, concept in enumerate(concepts):
                     st.markdown(f"**Concept {i+1}:** {concept}")
             
-            # Display flashcards
+            # Display flashcards as collapsed <details> elements so revealing an
+            # answer happens in the browser without a rerun
             with st.expander("Flashcards", expanded=True):
                 flashcards = study_guide.get("flashcards", [])
-                
-                for i, card in enumerate(flashcards):
-                    # Create a unique key for each flashcard
-                    card_key = f"flashcard_{i}"
-                    
-                    # Create a container for the flashcard
-                    card_container = st.container()
-                    
-                    # Create columns for the flashcard
-                    question_col, answer_col = st.columns(2)
-                    
-                    with question_col:
-                        st.info(f"**Question {i+1}:** {card['question']}")
-                    
-                    with answer_col:
-                        # Create a checkbox to toggle the answer visibility
-                        show_answer = st.checkbox(f"Show Answer {i+1}", key=card_key)
-                        
-                        if show_answer:
-                            st.success(f"**Answer:** {card['answer']}")
+                flashcards_html = "".join(
+                    f"<details><summary><strong>Question {i+1}:</strong> {html.escape(str(card['question']))}</summary>"
+                    f"<p><strong>Answer:</strong> {html.escape(str(card['answer']))}</p></details>"
+                    for i, card in enumerate(flashcards)
+                )
+                st.markdown(flashcards_html, unsafe_allow_html=True)
         else:
             st.error("Failed to generate study guide.")
     
@@ -397,55 +582,9 @@ def display_results():
             else:
                 quiz = []
             
-            # Create a form for the quiz
-            with st.form(key="quiz_form"):
-                correct_answers = 0
-                total_questions = len(quiz)
-                
-                for i, question in enumerate(quiz):
-                    st.markdown(f"**Question {i+1}:** {question['question']}")
-                    
-                    # Radio buttons for answer options
-                    options = question.get("options", {})
-                    answer_key = f"q{i}_answer"
-                    user_answer = st.radio(
-                        "Select your answer:",
-                        options.keys(),
-                        key=answer_key,
-                        index=None
-                    )
-                    
-                    # Show options
-                    for opt_key, opt_value in options.items():
-                        st.markdown(f"**{opt_key}:** {opt_value}")
-                    
-                    st.markdown("---")
-                
-                submit_button = st.form_submit_button("Check Answers")
-                
-                if submit_button:
-                    for i, question in enumerate(quiz):
-                        user_answer = st.session_state.get(f"q{i}_answer")
-                        correct_answer = question.get("correct_answer")
-                        
-                        if user_answer == correct_answer:
-                            correct_answers += 1
-                    
-                    # Display results
-                    score_percentage = (correct_answers / total_questions) * 100
-                    st.success(f"You got {correct_answers} out of {total_questions} correct ({score_percentage:.1f}%)!")
-                    
-                    # Display correct answers
-                    st.subheader("Correct Answers:")
-                    for i, question in enumerate(quiz):
-                        user_answer = st.session_state.get(f"q{i}_answer")
-                        correct_answer = question.get("correct_answer")
-                        
-                        if user_answer != correct_answer:
-                            st.warning(
-                                f"Question {i+1}: You selected {user_answer if user_answer else 'nothing'}, " 
-                                f"correct answer is {correct_answer}."
-                            )
+            # Render the quiz as a self-contained HTML form that is scored in the
+            # browser, so checking answers doesn't rerun the app
+            components.html(build_quiz_html(quiz), height=220 * len(quiz) + 120, scrolling=True)
         else:
             st.error("Failed to generate quiz questions.")
     
@@ -478,37 +617,14 @@ def display_results():
     with export_tab:
         st.subheader("💾 Export Study Materials")
         # Prepare results for export
-        results = {
-            "topic": st.session_state.main_topic,
-            "summary": st.session_state.summary.get("summary") if st.session_state.summary else "",
-            "resources": st.session_state.resources.get("resources", {}).get("resources", []) if st.session_state.resources else []
-        }
-        
-        # Handle study guide format
-        if st.session_state.study_guide and st.session_state.study_guide["success"]:
-            study_guide_data = st.session_state.study_guide.get("study_guide", {})
-            if isinstance(study_guide_data, dict) and "study_guide" in study_guide_data:
-                results["study_guide"] = study_guide_data["study_guide"]
-            else:
-                results["study_guide"] = study_guide_data
-        else:
-            results["study_guide"] = {}
-        
-        # Handle quiz format
-        if st.session_state.quiz and st.session_state.quiz["success"]:
-            quiz_data = st.session_state.quiz.get("quiz", None)
-            if isinstance(quiz_data, dict) and "quiz" in quiz_data:
-                results["quiz"] = quiz_data["quiz"]
-            elif isinstance(quiz_data, list):
-                results["quiz"] = quiz_data
-            else:
-                results["quiz"] = []
-        else:
-            results["quiz"] = []
-        
-        # Add personalized insights if available
-        if st.session_state.personalized_insights:
-            results["personalized_insights"] = st.session_state.personalized_insights
+        results = build_export_payload(
+            st.session_state.main_topic,
+            st.session_state.summary,
+            st.session_state.resources,
+            st.session_state.study_guide,
+            st.session_state.quiz,
+            st.session_state.personalized_insights
+        )
         
         # Create export section
         create_export_section(results)
@@ -520,8 +636,14 @@ def display_sidebar():
         st.header("📋 Options")
         
         # Reset button
-        if st.button("Start New Study Kit", key="reset"):
-            reset_session()
+        st.button("Start New Study Kit", key="reset", on_click=reset_session)
+        
+        st.toggle(
+            "Batch mode",
+            key="batch_mode",
+            help="Submit generation as an OpenAI batch job at half the cost. Results may take a while.",
+            disabled=st.session_state.is_processing
+        )
         
         st.divider()
         
@@ -1,14 +1,19 @@
+import functools
 import os
 import sys
 import streamlit as st
 
-def check_api_keys():
-    """Check for required API keys and display appropriate messages"""
-    
-    openai_key = os.environ.get("OPENAI_API_KEY")
-    huggingface_key = os.environ.get("HUGGINGFACE_API_KEY")
-    
-    if not openai_key:
+@functools.lru_cache(maxsize=1)
+def get_api_key_status():
+    """Look up which API keys are configured (cached for the process lifetime)"""
+    return {
+        "openai": bool(os.environ.get("OPENAI_API_KEY")),
+        "huggingface": bool(os.environ.get("HUGGINGFACE_API_KEY"))
+    }
+
+def render_key_warnings(status):
+    """Display messages for any missing API keys"""
+    if not status["openai"]:
         st.error(
             "⚠️ OpenAI API key not found! Please provide an API key to use AI-powered features. "
             "Set the OPENAI_API_KEY environment variable or add it as a secret in Streamlit Cloud."
@@ -16,9 +21,9 @@ def check_api_keys():
         st.info(
             "You can get an OpenAI API key at: https://platform.openai.com/api-keys"
         )
-        return False
-    
-    if not huggingface_key:
+        return
+
+    if not status["huggingface"]:
         st.warning(
             "⚠️ Hugging Face API key not found. This is optional, but recommended for fallback functionality. "
             "Set the HUGGINGFACE_API_KEY environment variable or add it as a secret in Streamlit Cloud."
@@ -26,10 +31,18 @@ def check_api_keys():
         st.info(
             "You can get a Hugging Face API key at: https://huggingface.co/settings/tokens"
         )
-    
-    return True
+
+def check_api_keys():
+    """Check for required API keys and display appropriate messages once per session"""
+    status = get_api_key_status()
+
+    if "keys_checked" not in st.session_state:
+        st.session_state.keys_checked = True
+        render_key_warnings(status)
+
+    return status["openai"]
 
 
 if __name__ == "__main__":
     # This allows the script to be run standalone to check API keys
-    check_api_keys()
\ No newline at end of file
+    check_api_keys()
@@ -1,30 +1,26 @@
 import nltk
 import os
 
-# This will be called by app.py on startup
+# NLTK data is fetched lazily by utils.nlp; run this to pre-fetch it
+NLTK_RESOURCES = [
+    ("punkt", "tokenizers/punkt"),
+    ("stopwords", "corpora/stopwords"),
+    ("wordnet", "corpora/wordnet")
+]
+
+def ensure_nltk_resource(resource, path):
+    """Download a single NLTK resource if it is not already present"""
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        nltk.download(resource)
+        print(f"Downloaded NLTK {resource}")
+
 def download_nltk_data():
     """Download required NLTK data if not already present"""
     try:
-        # Check if punkt is already downloaded
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-            print("Downloaded NLTK punkt")
-        
-        # Check if stopwords is already downloaded
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
-            print("Downloaded NLTK stopwords")
-        
-        # Check if wordnet is already downloaded
-        try:
-            nltk.data.find('corpora/wordnet')
-        except LookupError:
-            nltk.download('wordnet')
-            print("Downloaded NLTK wordnet")
+        for resource, path in NLTK_RESOURCES:
+            ensure_nltk_resource(resource, path)
         
         return True
     except Exception as e:
@@ -1,8 +1,7 @@
 import streamlit as st
 import re
 import os
-from utils.content_processor import process_input
-from utils.export_utils import create_export_section
+from utils.content_processor import process_input_cached
 import json
 
 # Set custom theme and styling
@@ -13,165 +12,28 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Custom CSS for better aesthetics
-st.markdown("""
-<style>
-    .main-header {
-        font-family: 'Helvetica Neue', sans-serif;
-        font-size: 2.5rem !important;
-        font-weight: 700;
-        color: #4f8bf9;
-        margin-bottom: 1rem;
-        text-align: center;
-        padding: 0.5rem;
-        border-bottom: 2px solid #f0f2f6;
-    }
-    
-    .section-header {
-        font-family: 'Helvetica Neue', sans-serif;
-        font-size: 1.5rem !important;
-        font-weight: 600;
-        color: #1f77b4;
-        margin-top: 1.5rem;
-        padding-bottom: 0.3rem;
-        border-bottom: 1px solid #e6e9ef;
-    }
-    
-    .resource-card {
-        background-color: #f8f9fa;
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 0.8rem;
-        border-left: 4px solid #4CAF50;
-    }
-    
-    .key-point {
-        font-weight: bold;
-        color: #2c3e50;
-        background-color: #f8f9fa;
-        padding: 0.3rem 0.6rem;
-        border-radius: 4px;
-        margin-bottom: 0.5rem;
-        border-left: 3px solid #3498db;
-    }
-    
-    .example-text {
-        background-color: #eaf2fd;
-        padding: 0.8rem;
-        border-radius: 6px;
-        margin-top: 0.5rem;
-        font-style: italic;
-        border-left: 3px solid #9b59b6;
-    }
-    
-    .term-definition {
-        background-color: #f5f5f5;
-        padding: 1rem;
-        border-radius: 5px;
-        line-height: 1.6;
-        border-left: 3px solid #f39c12;
-    }
-    
-    .concept-item {
-        background-color: #f8f9fa;
-        padding: 0.6rem 0.8rem;
-        margin-bottom: 0.5rem;
-        border-radius: 4px;
-        border-left: 3px solid #27ae60;
-    }
-    
-    .concept-number {
-        font-weight: bold;
-        color: #27ae60;
-        margin-right: 0.5rem;
-    }
-    
-    .flashcard-q {
-        background-color: #e8f4f8;
-        padding: 1rem;
-        border-radius: 8px 8px 0 0;
-        border-top: 3px solid #3498db;
-    }
-    
-    .flashcard-a {
-        background-color: #eafaf1;
-        padding: 1rem;
-        border-radius: 0 0 8px 8px;
-        border-bottom: 3px solid #2ecc71;
-    }
-    
-    .stButton>button {
-        background-color: #4f8bf9;
-        color: white;
-    }
-    
-    .tab-content {
-        padding: 1.5rem;
-        border: 1px solid #e6e9ef;
-        border-radius: 0 0 5px 5px;
-    }
-    
-    .insight-container {
-        display: flex;
-        flex-direction: column;
-        gap: 1rem;
-        margin-top: 1rem;
-    }
-    
-    .insight-section {
-        background-color: #f8f9fa;
-        padding: 1rem;
-        border-radius: 8px;
-        box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-    }
-    
-    .insight-section h4 {
-        color: #2c3e50;
-        margin-bottom: 0.5rem;
-        font-weight: 600;
-        border-bottom: 1px solid #e6e9ef;
-        padding-bottom: 0.3rem;
-    }
-    
-    .insight-section p {
-        margin-top: 0.5rem;
-        line-height: 1.6;
-    }
-    
-    .definition-box {
-        background-color: #f5f8fa;
-        padding: 1rem;
-        border-radius: 8px;
-        border-left: 4px solid #2980b9;
-        margin-bottom: 1rem;
-        box-shadow: 0 1px 2px rgba(0,0,0,0.05);
-    }
-    
-    .diagram-ref {
-        background-color: #f0f7fb;
-        padding: 0.8rem;
-        border-radius: 6px;
-        margin-top: 0.5rem;
-        border-left: 3px solid #3498db;
-        color: #2c3e50;
-        font-size: 0.9rem;
-    }
-    
-    .diagram-ref i {
-        margin-right: 0.5rem;
-        color: #3498db;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Path to the custom stylesheet for better aesthetics
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css")
+
+@st.cache_resource
+def load_css():
+    """Read and minify the stylesheet once per server process."""
+    with open(CSS_PATH, "r", encoding="utf-8") as f:
+        css = f.read()
+    # Collapse whitespace so less markup is sent on every rerun
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{}:;,>])\s*', r'\1', css)
+    return f"<style>{css}</style>"
+
+# Streamlit removes elements that are not re-emitted on a rerun, so the style
+# tag is sent each time, but the file is only read and minified once
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # Set up logging for debugging
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import personalized insights module
-from utils.personal_insight import process_profile_data
-
 # Check if OpenAI API key is available and provide info about alternatives
 openai_api_key = os.environ.get("OPENAI_API_KEY")
 
@@ -181,163 +43,309 @@ if not openai_api_key:
 else:
     logger.info("OpenAI API key found. Will try OpenAI first, with free AI APIs as fallback.")
 
+# Pattern for valid YouTube URLs, compiled once at import
+YOUTUBE_URL_RE = re.compile(r'^(https?\:\/\/)?(www\.youtube\.com|youtu\.?be)\/.+$', re.ASCII)
+
 # Function to check if URL is a valid YouTube URL
 def is_youtube_url(url):
-    youtube_regex = r'^(https?\:\/\/)?(www\.youtube\.com|youtu\.?be)\/.+$'
-    return bool(re.match(youtube_regex, url))
+    return YOUTUBE_URL_RE.match(url) is not None
+
+# Default session state; reset_app restores every key from here
+SESSION_DEFAULTS = {
+    "processing_complete": False,
+    "results": None,
+    "processing": False,
+    "error": None,
+    "personal_insights": None,
+    "quiz_submitted": False,
+    "quiz_answers": {},
+    "quiz_score": 0,
+    "quiz_valid": []
+}
+
+def apply_session_defaults(overwrite=False):
+    """Populate session state from SESSION_DEFAULTS, copying mutable values per session"""
+    for key, value in SESSION_DEFAULTS.items():
+        if overwrite or key not in st.session_state:
+            st.session_state[key] = value.copy() if isinstance(value, (dict, list)) else value
 
 # Initialize session state
-if 'processing_complete' not in st.session_state:
-    st.session_state.processing_complete = False
-if 'results' not in st.session_state:
-    st.session_state.results = None
-if 'processing' not in st.session_state:
-    st.session_state.processing = False
-if 'error' not in st.session_state:
-    st.session_state.error = None
-if 'show_answers' not in st.session_state:
-    st.session_state.show_answers = {}
-if 'personal_insights' not in st.session_state:
-    st.session_state.personal_insights = None
+apply_session_defaults()
 
 def reset_app():
     """Reset the app to its initial state"""
-    st.session_state.processing_complete = False
-    st.session_state.results = None
-    st.session_state.processing = False
-    st.session_state.error = None
-    st.session_state.show_answers = {}
-    st.session_state.personal_insights = None
+    apply_session_defaults(overwrite=True)
     st.rerun()
 
 # Header section
 st.markdown('<h1 class="main-header">🎓 AI Study Assistant</h1>', unsafe_allow_html=True)
 st.markdown('<p style="text-align: center; font-size: 1.2rem; margin-bottom: 2rem;">Turn any lecture or topic into a complete learning kit in minutes.</p>', unsafe_allow_html=True)
 
-# Main content
-if not st.session_state.processing_complete:
-    # Input options
-    st.subheader("Choose Your Input Method")
-    
-    tab1, tab2, tab3, tab4 = st.tabs(["✏️ Enter Topic", "🔗 YouTube URL", "🔊 Upload Audio", "📄 Upload Files"])
-    
-    with tab1:
-        text_input = st.text_area("Enter a topic or paste lecture text:", height=150, 
-                                  placeholder="E.g., Photosynthesis process in plants...")
-        text_submit = st.button("Generate Study Kit", key="text_submit")
-        
-        if text_submit and text_input.strip():
+# Progress messages shown as each processing step finishes
+STAGE_MESSAGES = {
+    "transcript": "Content loaded",
+    "summary": "Key concepts extracted",
+    "resources": "Study resources found",
+    "study_guide": "Study guide generated",
+    "quiz": "Quiz prepared",
+    "detailed_notes": "Detailed notes written"
+}
+
+def show_stage(stage, stage_result):
+    """Report a finished processing step, previewing the summary as soon as it arrives"""
+    if not stage_result.get("success"):
+        return
+    st.write(f"✓ {STAGE_MESSAGES[stage]}")
+    if stage == "summary":
+        st.markdown(stage_result["summary"])
+
+# Input renderers. Each one is a fragment, so interacting with its widgets only
+# reruns that input method rather than the whole page.
+@st.fragment
+def render_text_input():
+    """Render the topic / lecture text input."""
+    text_input = st.text_area("Enter a topic or paste lecture text:", height=150, 
+                              placeholder="E.g., Photosynthesis process in plants...")
+    text_submit = st.button("Generate Study Kit", key="text_submit")
+    
+    if text_submit and text_input.strip():
+        st.session_state.processing = True
+        with st.status("Processing your text...", expanded=True) as status:
+            results = process_input_cached("text", text_input, on_stage=show_stage)
+            if results["success"]:
+                st.session_state.results = results
+                st.session_state.processing_complete = True
+                st.rerun()
+            else:
+                st.session_state.error = results["error"]
+                status.update(state="error")
+                st.error(f"Error: {results['error']}")
+    elif text_submit:
+        st.warning("Please enter some text first.")
+
+@st.fragment
+def render_youtube_input():
+    """Render the YouTube URL input."""
+    youtube_url = st.text_input("Enter YouTube URL:", placeholder="https://www.youtube.com/watch?v=...")
+    youtube_submit = st.button("Generate Study Kit", key="youtube_submit")
+    
+    if youtube_submit and youtube_url.strip():
+        if is_youtube_url(youtube_url):
             st.session_state.processing = True
-            with st.spinner("Processing your text..."):
-                results = process_input("text", text_input)
+            with st.status("Processing YouTube video...", expanded=True) as status:
+                results = process_input_cached("youtube", youtube_url, on_stage=show_stage)
                 if results["success"]:
                     st.session_state.results = results
                     st.session_state.processing_complete = True
                     st.rerun()
                 else:
                     st.session_state.error = results["error"]
+                    status.update(state="error")
                     st.error(f"Error: {results['error']}")
-        elif text_submit:
-            st.warning("Please enter some text first.")
-    
-    with tab2:
-        youtube_url = st.text_input("Enter YouTube URL:", placeholder="https://www.youtube.com/watch?v=...")
-        youtube_submit = st.button("Generate Study Kit", key="youtube_submit")
-        
-        if youtube_submit and youtube_url.strip():
-            if is_youtube_url(youtube_url):
-                st.session_state.processing = True
-                with st.spinner("Processing YouTube video..."):
-                    results = process_input("youtube", youtube_url)
-                    if results["success"]:
-                        st.session_state.results = results
-                        st.session_state.processing_complete = True
-                        st.rerun()
-                    else:
-                        st.session_state.error = results["error"]
-                        st.error(f"Error: {results['error']}")
+        else:
+            st.warning("Please enter a valid YouTube URL.")
+    elif youtube_submit:
+        st.warning("Please enter a YouTube URL first.")
+
+@st.fragment
+def render_audio_input():
+    """Render the audio upload input."""
+    uploaded_file = st.file_uploader("Upload audio file (MP3):", type=["mp3"])
+    audio_submit = st.button("Generate Study Kit", key="audio_submit")
+    
+    if audio_submit and uploaded_file is not None:
+        st.session_state.processing = True
+        with st.status("Transcribing and processing audio...", expanded=True) as status:
+            results = process_input_cached("audio", uploaded_file, on_stage=show_stage)
+            if results["success"]:
+                st.session_state.results = results
+                st.session_state.processing_complete = True
+                st.rerun()
+            else:
+                st.session_state.error = results["error"]
+                status.update(state="error")
+                st.error(f"Error: {results['error']}")
+    elif audio_submit:
+        st.warning("Please upload an audio file first.")
+
+@st.fragment
+def render_file_input():
+    """Render the document, video, code and ZIP upload input."""
+    st.write("Upload lecture notes, course materials, or multiple files for processing:")
+    
+    file_type_options = [
+        "Document (.pdf, .docx, .pptx)",
+        "Video (.mp4, .mov)",
+        "Code (.py, .ipynb)",
+        "Multiple Files (.zip)"
+    ]
+    
+    file_type_choice = st.radio("Select file type:", file_type_options)
+    
+    # Set the file types based on the user's selection
+    if "Document" in file_type_choice:
+        allowed_types = ["pdf", "docx", "pptx"]
+        upload_label = "Upload document files:"
+    elif "Video" in file_type_choice:
+        allowed_types = ["mp4", "mov", "avi", "mkv"]
+        upload_label = "Upload video file (will extract audio):"
+    elif "Code" in file_type_choice:
+        allowed_types = ["py", "ipynb", "txt"]
+        upload_label = "Upload code or text files:"
+    elif "Multiple" in file_type_choice:
+        allowed_types = ["zip"]
+        upload_label = "Upload ZIP archive (containing multiple files):"
+    
+    uploaded_file = st.file_uploader(upload_label, type=allowed_types)
+    
+    file_submit = st.button("Generate Study Kit", key="file_submit")
+    
+    if file_submit and uploaded_file is not None:
+        st.session_state.processing = True
+    
+        # Determine file extension
+        file_extension = uploaded_file.name.split('.')[-1].lower()
+    
+        with st.status(f"Processing {file_extension.upper()} file...", expanded=True) as status:
+            # Process file with appropriate message
+            if file_extension == "zip":
+                status_message = "Extracting and processing files from ZIP archive..."
+            elif file_extension in ["mp4", "mov", "avi", "mkv"]:
+                status_message = "Extracting audio from video and transcribing..."
+            elif file_extension in ["docx", "pptx", "pdf"]:
+                status_message = f"Extracting text from {file_extension.upper()} document..."
             else:
-                st.warning("Please enter a valid YouTube URL.")
-        elif youtube_submit:
-            st.warning("Please enter a YouTube URL first.")
+                status_message = f"Processing {file_extension.upper()} file..."
     
-    with tab3:
-        uploaded_file = st.file_uploader("Upload audio file (MP3):", type=["mp3"])
-        audio_submit = st.button("Generate Study Kit", key="audio_submit")
-        
-        if audio_submit and uploaded_file is not None:
-            st.session_state.processing = True
-            with st.spinner("Transcribing and processing audio..."):
-                results = process_input("audio", uploaded_file)
-                if results["success"]:
-                    st.session_state.results = results
-                    st.session_state.processing_complete = True
-                    st.rerun()
-                else:
-                    st.session_state.error = results["error"]
-                    st.error(f"Error: {results['error']}")
-        elif audio_submit:
-            st.warning("Please upload an audio file first.")
-            
-    with tab4:
-        st.write("Upload lecture notes, course materials, or multiple files for processing:")
-        
-        file_type_options = [
-            "Document (.pdf, .docx, .pptx)",
-            "Video (.mp4, .mov)",
-            "Code (.py, .ipynb)",
-            "Multiple Files (.zip)"
-        ]
-        
-        file_type_choice = st.radio("Select file type:", file_type_options)
-        
-        # Set the file types based on the user's selection
-        if "Document" in file_type_choice:
-            allowed_types = ["pdf", "docx", "pptx"]
-            upload_label = "Upload document files:"
-        elif "Video" in file_type_choice:
-            allowed_types = ["mp4", "mov", "avi", "mkv"]
-            upload_label = "Upload video file (will extract audio):"
-        elif "Code" in file_type_choice:
-            allowed_types = ["py", "ipynb", "txt"]
-            upload_label = "Upload code or text files:"
-        elif "Multiple" in file_type_choice:
-            allowed_types = ["zip"]
-            upload_label = "Upload ZIP archive (containing multiple files):"
-        
-        uploaded_file = st.file_uploader(upload_label, type=allowed_types)
-        
-        file_submit = st.button("Generate Study Kit", key="file_submit")
-        
-        if file_submit and uploaded_file is not None:
-            st.session_state.processing = True
-            
-            # Determine file extension
-            file_extension = uploaded_file.name.split('.')[-1].lower()
+            st.info(status_message)
+            results = process_input_cached("file", uploaded_file, on_stage=show_stage)
+    
+            if results["success"]:
+                st.session_state.results = results
+                st.session_state.processing_complete = True
+                st.rerun()
+            else:
+                st.session_state.error = results["error"]
+                status.update(state="error")
+                st.error(f"Error: {results['error']}")
+    elif file_submit:
+        st.warning("Please upload a file first.")
+
+@st.fragment
+def render_flashcards(flashcards):
+    """Render the flashcards. Toggling an answer only reruns this fragment."""
+    for i, card in enumerate(flashcards):
+        if isinstance(card, dict) and "question" in card and "answer" in card:
+            st.markdown(f'<div class="flashcard-q"><strong>Q:</strong> {card["question"]}</div>', unsafe_allow_html=True)
             
-            with st.spinner(f"Processing {file_extension.upper()} file..."):
-                # Process file with appropriate message
-                if file_extension == "zip":
-                    status_message = "Extracting and processing files from ZIP archive..."
-                elif file_extension in ["mp4", "mov", "avi", "mkv"]:
-                    status_message = "Extracting audio from video and transcribing..."
-                elif file_extension in ["docx", "pptx", "pdf"]:
-                    status_message = f"Extracting text from {file_extension.upper()} document..."
-                else:
-                    status_message = f"Processing {file_extension.upper()} file..."
-                
-                st.info(status_message)
-                results = process_input("file", uploaded_file)
-                
-                if results["success"]:
-                    st.session_state.results = results
-                    st.session_state.processing_complete = True
-                    st.rerun()
-                else:
-                    st.session_state.error = results["error"]
-                    st.error(f"Error: {results['error']}")
-        elif file_submit:
-            st.warning("Please upload a file first.")
+            if st.toggle("Show answer", key=f"fc_{i}"):
+                st.markdown(f'<div class="flashcard-a"><strong>A:</strong> {card["answer"]}</div>', unsafe_allow_html=True)
+
+def is_valid_question(question):
+    """Check that a quiz question has text and at least two options"""
+    return (isinstance(question, dict) and "question" in question and
+            isinstance(question.get("options"), dict) and len(question["options"]) >= 2)
+
+def submit_quiz():
+    """Score the submitted quiz answers (form submit callback)"""
+    answers = {}
+    for i, question in st.session_state.quiz_valid:
+        choice = st.session_state.get(f"q_{i}")
+        if choice is not None:
+            answers[i] = list(question["options"])[choice]
+    
+    st.session_state.quiz_answers = answers
+    st.session_state.quiz_score = sum(
+        1 for i, question in st.session_state.quiz_valid
+        if i in answers and answers[i] == question.get("correct_answer")
+    )
+    st.session_state.quiz_submitted = True
+
+def retake_quiz():
+    """Clear the quiz answers and score so the quiz can be taken again"""
+    st.session_state.quiz_submitted = False
+    st.session_state.quiz_answers = {}
+    st.session_state.quiz_score = 0
+
+def reset_personal_insights():
+    """Discard the generated personalized insights"""
+    st.session_state.personal_insights = None
+
+INPUT_METHODS = {
+    "✏️ Enter Topic": render_text_input,
+    "🔗 YouTube URL": render_youtube_input,
+    "🔊 Upload Audio": render_audio_input,
+    "📄 Upload Files": render_file_input
+}
+
+# (insight key, heading, fallback text) for each personalized insight section
+INSIGHT_FIELDS = (
+    ("relevance", "🔄 Relevance to Your Background", "No relevance information available."),
+    ("alignment", "🎯 Alignment with Your Skills", "No alignment information available."),
+    ("growth_areas", "📈 Areas for Growth", "No growth areas information available."),
+    ("applications", "💡 Practical Applications", "No applications information available."),
+    ("learning_path", "🛤️ Personalized Learning Path", "No learning path information available.")
+)
+
+def render_resource_card(resource):
+    """Build the HTML card for a single suggested resource"""
+    link = f'<a href="{resource["url"]}" target="_blank">🔗 Access Resource</a>' if "url" in resource else ""
+    return (f'<div class="resource-card">'
+            f'<h4>{resource["title"]} <small>({resource["type"]})</small></h4>'
+            f'<p>{resource.get("description", "")}</p>'
+            f'{link}</div>')
+
+def build_note_section(section):
+    """Build the markdown for one detailed-notes section, so it is sent as a single element"""
+    parts = []
+    
+    # Definition (if available)
+    if "definition" in section and section["definition"]:
+        parts.append(f'<div class="definition-box"><strong>Definition:</strong> {section["definition"]}</div>')
+        parts.append("---")
+    
+    # Key points in bold
+    if "key_points" in section and section["key_points"]:
+        parts.append("### Key Points:")
+        points_html = []
+        for point in section["key_points"]:
+            # For key points that are already in bold format, extract and display the text
+            if isinstance(point, str) and point.startswith("**") and point.endswith("**"):
+                point_text = point[2:-2]  # Remove the ** markers
+            else:
+                point_text = point
+            points_html.append(f'<div class="key-point">{point_text}</div>')
+        parts.append("".join(points_html))
+        parts.append("---")
+    
+    # Content
+    if "content" in section and section["content"]:
+        parts.append(section["content"])
+    
+    # Examples (multiple if available)
+    if "examples" in section and section["examples"] and isinstance(section["examples"], list):
+        parts.append("### Examples:")
+        parts.append("".join(f'<div class="example-text">{example}</div>' for example in section["examples"]))
+    # Fallback for old format with single example
+    elif "example" in section and section["example"]:
+        parts.append("### Example:")
+        parts.append(f'<div class="example-text">{section["example"]}</div>')
+    
+    # Diagram references (if available)
+    if "diagrams" in section and section["diagrams"] and isinstance(section["diagrams"], list):
+        parts.append("### Diagram References:")
+        parts.append("".join(f'<div class="diagram-ref"><i>📊</i> {diagram}</div>' for diagram in section["diagrams"]))
+    
+    return "\n\n".join(parts)
+
+# Main content
+if not st.session_state.processing_complete:
+    # Input options
+    st.subheader("Choose Your Input Method")
+    
+    # Only the selected input method's widgets are built on each rerun
+    input_method = st.radio("Input method", list(INPUT_METHODS), horizontal=True, label_visibility="collapsed")
+    INPUT_METHODS[input_method]()
 
 else:
     # Display results
@@ -365,13 +373,10 @@ else:
             resources = results["resources"].get("resources", []) if isinstance(results["resources"], dict) else []
             
             if resources and isinstance(resources, list) and len(resources) > 0:
-                for resource in resources:
-                    if isinstance(resource, dict) and "title" in resource and "type" in resource:
-                        st.markdown(f'<div class="resource-card">' +
-                                  f'<h4>{resource["title"]} <small>({resource["type"]})</small></h4>' +
-                                  f'<p>{resource.get("description", "")}</p>' +
-                                  (f'<a href="{resource["url"]}" target="_blank">🔗 Access Resource</a>' if "url" in resource else "") +
-                                  f'</div>', unsafe_allow_html=True)
+                st.markdown("".join(
+                    render_resource_card(resource) for resource in resources
+                    if isinstance(resource, dict) and "title" in resource and "type" in resource
+                ), unsafe_allow_html=True)
             else:
                 st.info("No resources details available.")
         else:
@@ -406,26 +411,7 @@ else:
             # Flashcards
             if study_guide and "flashcards" in study_guide and study_guide["flashcards"]:
                 st.subheader("Flashcards")
-                for i, card in enumerate(study_guide["flashcards"]):
-                    # Initialize show_answers state for this card if not present
-                    if i not in st.session_state.show_answers:
-                        st.session_state.show_answers[i] = False
-                    
-                    if isinstance(card, dict) and "question" in card and "answer" in card:
-                        question = card["question"]
-                        answer = card["answer"]
-                        
-                        col1, col2 = st.columns([5, 1])
-                        with col1:
-                            st.markdown(f'<div class="flashcard-q"><strong>Q:</strong> {question}</div>', unsafe_allow_html=True)
-                            
-                            if st.session_state.show_answers[i]:
-                                st.markdown(f'<div class="flashcard-a"><strong>A:</strong> {answer}</div>', unsafe_allow_html=True)
-                        
-                        with col2:
-                            if st.button("Reveal" if not st.session_state.show_answers[i] else "Hide", key=f"fc_{i}"):
-                                st.session_state.show_answers[i] = not st.session_state.show_answers[i]
-                                st.rerun()
+                render_flashcards(study_guide["flashcards"])
             
             if (not study_guide or 
                 "key_terms" not in study_guide or 
@@ -449,77 +435,45 @@ else:
             
             # Verify we have quiz questions
             if quiz and isinstance(quiz, list) and len(quiz) > 0:
-                # Initialize session state for quiz scores if not present
-                if 'quiz_submitted' not in st.session_state:
-                    st.session_state.quiz_submitted = False
-                if 'quiz_answers' not in st.session_state:
-                    st.session_state.quiz_answers = {}
-                if 'quiz_score' not in st.session_state:
-                    st.session_state.quiz_score = 0
-                
                 # Show quiz questions
                 if not st.session_state.quiz_submitted:
+                    # Remember which questions are usable so scoring and results reuse this pass
+                    valid = [(i, q) for i, q in enumerate(quiz) if is_valid_question(q)]
+                    st.session_state.quiz_valid = valid
+                    
                     with st.form(key="quiz_form"):
-                        valid_questions = 0
-                        
-                        for i, question in enumerate(quiz):
-                            # Verify question has required fields
-                            if not isinstance(question, dict) or "question" not in question or "options" not in question:
-                                continue
-                                
-                            # Verify options is a dictionary
-                            options = question.get("options", {})
-                            if not isinstance(options, dict) or len(options) < 2:
-                                continue
-                                
-                            valid_questions += 1
-                            st.markdown(f"**Question {valid_questions}:** {question['question']}")
+                        for number, (i, question) in enumerate(valid, start=1):
+                            st.markdown(f"**Question {number}:** {question['question']}")
                             
-                            st.session_state.quiz_answers[i] = st.radio(
-                                f"Select your answer for question {valid_questions}:",
-                                options.keys(),
-                                format_func=lambda x: f"{x}: {options[x]}",
+                            labels = [f"{k}: {v}" for k, v in question["options"].items()]
+                            st.radio(
+                                f"Select your answer for question {number}:",
+                                range(len(labels)),
+                                format_func=labels.__getitem__,
                                 key=f"q_{i}",
                                 index=None  # No default selection
                             )
                             st.write("---")
                         
                         # Only show submit if we have valid questions
-                        if valid_questions > 0:
-                            submit_quiz = st.form_submit_button("Submit Quiz")
-                            
-                            if submit_quiz:
-                                # Calculate score
-                                correct_count = 0
-                                for i, question in enumerate(quiz):
-                                    if (isinstance(question, dict) and 
-                                        "correct_answer" in question and 
-                                        st.session_state.quiz_answers.get(i) == question["correct_answer"]):
-                                        correct_count += 1
-                                
-                                st.session_state.quiz_score = correct_count
-                                st.session_state.quiz_submitted = True
-                                st.rerun()
+                        if valid:
+                            # Scoring happens in the callback, before the rerun the submit triggers
+                            st.form_submit_button("Submit Quiz", on_click=submit_quiz)
                         else:
                             st.info("No valid quiz questions available.")
                 
                 # Show quiz results
                 else:
-                    valid_questions = sum(1 for q in quiz if isinstance(q, dict) and "question" in q and "options" in q)
-                    st.subheader(f"Your Score: {st.session_state.quiz_score}/{valid_questions}")
+                    valid = st.session_state.quiz_valid
+                    st.subheader(f"Your Score: {st.session_state.quiz_score}/{len(valid)}")
                     
-                    for i, question in enumerate(quiz):
-                        # Skip invalid questions
-                        if not isinstance(question, dict) or "question" not in question or "options" not in question:
-                            continue
-                            
+                    for number, (i, question) in enumerate(valid, start=1):
                         user_answer = st.session_state.quiz_answers.get(i)
                         correct_answer = question.get("correct_answer", "")
                         
-                        st.markdown(f"**Question {i+1}:** {question['question']}")
-                        options = question.get("options", {})
+                        st.markdown(f"**Question {number}:** {question['question']}")
                         
-                        for opt, text in options.items():
+                        for opt, text in question["options"].items():
                             if opt == correct_answer:
                                 st.success(f"✓ {opt}: {text} (Correct Answer)")
                             elif opt == user_answer:
@@ -530,11 +484,7 @@ else:
                         st.info(f"**Explanation:** {question.get('explanation', 'No explanation provided.')}")
                         st.write("---")
                     
-                    if st.button("Retake Quiz"):
-                        st.session_state.quiz_submitted = False
-                        st.session_state.quiz_answers = {}
-                        st.session_state.quiz_score = 0
-                        st.rerun()
+                    st.button("Retake Quiz", on_click=retake_quiz)
             else:
                 st.info("No quiz questions available.")
         else:
@@ -559,43 +509,8 @@ else:
                     section_key = "title" if "title" in section else "topic"
                     
                     if isinstance(section, dict) and section_key in section:
-                        with st.expander(f"📌 {section_title}", expanded=True):
-                            # Display definition (if available)
-                            if "definition" in section and section["definition"]:
-                                st.markdown(f'<div class="definition-box"><strong>Definition:</strong> {section["definition"]}</div>', unsafe_allow_html=True)
-                                st.write("---")
-                            
-                            # Display key points in bold
-                            if "key_points" in section and section["key_points"]:
-                                st.subheader("Key Points:")
-                                for point in section["key_points"]:
-                                    # For key points that are already in bold format, extract and display the text
-                                    if isinstance(point, str) and point.startswith("**") and point.endswith("**"):
-                                        point_text = point[2:-2]  # Remove the ** markers
-                                    else:
-                                        point_text = point
-                                    st.markdown(f'<div class="key-point">{point_text}</div>', unsafe_allow_html=True)
-                                st.write("---")
-                            
-                            # Display content
-                            if "content" in section and section["content"]:
-                                st.markdown(section["content"])
-                            
-                            # Display examples (multiple if available)
-                            if "examples" in section and section["examples"] and isinstance(section["examples"], list):
-                                st.subheader("Examples:")
-                                for example in section["examples"]:
-                                    st.markdown(f'<div class="example-text">{example}</div>', unsafe_allow_html=True)
-                            # Fallback for old format with single example
-                            elif "example" in section and section["example"]:
-                                st.subheader("Example:")
-                                st.markdown(f'<div class="example-text">{section["example"]}</div>', unsafe_allow_html=True)
-                            
-                            # Display diagram references (if available)
-                            if "diagrams" in section and section["diagrams"] and isinstance(section["diagrams"], list) and len(section["diagrams"]) > 0:
-                                st.subheader("Diagram References:")
-                                for diagram in section["diagrams"]:
-                                    st.markdown(f'<div class="diagram-ref"><i>📊</i> {diagram}</div>', unsafe_allow_html=True)
+                        with st.expander(f"📌 {section_title}", expanded=False):
+                            st.markdown(build_note_section(section), unsafe_allow_html=True)
             else:
                 st.info("No detailed notes available.")
         else:
@@ -619,48 +534,22 @@ else:
                     
                     # Check that all sections exist
                     if isinstance(insights, dict):
-                        st.markdown('<div class="insight-container">', unsafe_allow_html=True)
-                        
-                        st.markdown('<div class="insight-section">' +
-                                     '<h4>🔄 Relevance to Your Background</h4>' +
-                                     f'<p>{insights.get("relevance", "No relevance information available.")}</p>' +
-                                     '</div>', unsafe_allow_html=True)
-                        
-                        st.markdown('<div class="insight-section">' +
-                                     '<h4>🎯 Alignment with Your Skills</h4>' +
-                                     f'<p>{insights.get("alignment", "No alignment information available.")}</p>' +
-                                     '</div>', unsafe_allow_html=True)
-                            
-                        st.markdown('<div class="insight-section">' +
-                                     '<h4>📈 Areas for Growth</h4>' +
-                                     f'<p>{insights.get("growth_areas", "No growth areas information available.")}</p>' +
-                                     '</div>', unsafe_allow_html=True)
-                            
-                        st.markdown('<div class="insight-section">' +
-                                     '<h4>💡 Practical Applications</h4>' +
-                                     f'<p>{insights.get("applications", "No applications information available.")}</p>' +
-                                     '</div>', unsafe_allow_html=True)
-                            
-                        st.markdown('<div class="insight-section">' +
-                                     '<h4>🛤️ Personalized Learning Path</h4>' +
-                                     f'<p>{insights.get("learning_path", "No learning path information available.")}</p>' +
-                                     '</div>', unsafe_allow_html=True)
-                                     
-                        st.markdown('</div>', unsafe_allow_html=True)
+                        # Emit the whole insights block as one markdown element
+                        sections_html = "".join(
+                            f'<div class="insight-section"><h4>{title}</h4><p>{insights.get(field, default)}</p></div>'
+                            for field, title, default in INSIGHT_FIELDS
+                        )
+                        st.markdown(f'<div class="insight-container">{sections_html}</div>', unsafe_allow_html=True)
                     else:
                         st.error("Invalid format for insights data.")
                 else:
                     st.error("No insights data found in the generated results.")
                     
-            if st.button("Reset Personalized Insights", key="reset_insights"):
-                st.session_state.personal_insights = None
-                st.rerun()
+            st.button("Reset Personalized Insights", key="reset_insights", on_click=reset_personal_insights)
                 
         except Exception as e:
             st.error(f"Error displaying personal insights: {str(e)}")
-            if st.button("Reset Personalized Insights", key="reset_error"):
-                st.session_state.personal_insights = None
-                st.rerun()
+            st.button("Reset Personalized Insights", key="reset_error", on_click=reset_personal_insights)
     else:
         # Show form to upload profile data
         st.write("Upload your resume and/or LinkedIn profile to receive personalized insights about how this topic relates to your background and career path.")
@@ -688,7 +577,8 @@ else:
                     if results and "transcript" in results and results["transcript"]:
                         study_content = results["transcript"]
                     
-                    # Generate personalized insights
+                    # Generate personalized insights (imported here since it is only needed on demand)
+                    from utils.personal_insight import process_profile_data
                     insights_result = process_profile_data(resume_file, linkedin_file, study_content)
                     
                     if insights_result["success"]:
@@ -700,6 +590,7 @@ else:
     
     # Add export functionality
     if results:
+        from utils.export_utils import create_export_section
         create_export_section(results)
     
     # Add another reset button at the bottom
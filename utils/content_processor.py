@@ -1,14 +1,18 @@
-# The imports from openai_helpers are moved inside the functions to avoid circular imports
-from .transcription import get_youtube_transcript, transcribe_audio
-from .file_processor import process_file
+# The imports from openai_helpers are moved inside the functions to avoid circular imports.
+# Transcription and file processing are imported inside the transcript helpers so that importing
+# this module does not load Whisper or the document parsers.
+import functools
 import logging
 import os
 import io
 import re
-import nltk
+import threading
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from collections import Counter
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize, sent_tokenize
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .nlp import get_nlp
+from . import disk_cache
 
 # Import free AI helpers as fallbacks
 from .free_ai_helpers import get_summary as free_get_summary
@@ -22,17 +26,36 @@ from .static_fallbacks import get_static_summary, get_static_resources
 from .static_fallbacks import generate_static_study_guide, generate_static_quiz
 from .static_fallbacks import generate_static_topic_notes
 
-# Try to download NLTK resources silently
-try:
-    nltk.download('punkt', quiet=True)
-    nltk.download('stopwords', quiet=True)
-except:
-    # Continue even if download fails
-    pass
-
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Regular expressions used when analysing transcripts, compiled once at import
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+WHITESPACE_RE = re.compile(r'\s+')
+SLIDE_TOPIC_RE = re.compile(r'Slide \d+:?\s*([^0-9\n]+?)(?:\d|$)')
+SLIDE_TITLE_RE = re.compile(r'Slide\s+(\d+):\s*([^\n]+)', re.IGNORECASE)
+SLIDE_MARKER_RE = re.compile(r'slide\s+\d+', re.IGNORECASE)
+CAPITALIZED_PHRASE_RE = re.compile(r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,2})\b')
+BOLD_TEXT_RE = re.compile(r'\*\*(.*?)\*\*')
+
+# Coarse tokenizers for topic extraction; frequency counting does not need Punkt.
+# WORD_RE only matches words longer than 3 characters.
+WORD_RE = re.compile(r'\w{4,}')
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+# How long a stored AI response is reused for the same input, in seconds
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+
+# Number of leading characters searched for "Slide N" markers
+SLIDE_SCAN_LENGTH = 4096
+
+# Phrases that introduce an explicit topic, e.g. "Topic: Cellular respiration."
+TOPIC_MARKERS = ("topic:", "subject:", "about:", "focuses on:")
+
+# Topic extraction only looks at this many characters; word frequencies settle long before
+MAX_TOPIC_TEXT_LENGTH = 50000
+
+@st.cache_data(show_spinner=False, max_entries=32)
 def extract_main_topics(text, top_n=3):
     """
     Extract the main topics from a text using NLP techniques.
@@ -45,58 +68,70 @@ def extract_main_topics(text, top_n=3):
         str: The main topic as a string
     """
     try:
+        # Short input such as a typed topic is already the topic
+        if len(text) < 200:
+            topic = ' '.join(text.split())
+            if len(topic) > 80:
+                # Cut at the last whole word that fits
+                topic = topic[:81].rsplit(' ', 1)[0]
+            return topic
+        
+        # Skip the tail of very long transcripts
+        text = text[:MAX_TOPIC_TEXT_LENGTH]
+        
+        # Try to find specific topic markers. This runs on the original text, since
+        # cleaning strips the colons and full stops the markers rely on.
+        text_lower = text.lower()
+        for keyword in TOPIC_MARKERS:
+            idx = text_lower.find(keyword)
+            if idx == -1:
+                continue
+            idx += len(keyword)
+            # The topic runs to the end of the sentence or line
+            end_idx = min((pos for pos in (text.find('.', idx), text.find('\n', idx)) if pos != -1), default=-1)
+            if end_idx > 0:
+                topic = ' '.join(text[idx:end_idx].split())
+                if 3 <= len(topic.split()) <= 10:
+                    return topic
+        
         # Clean the text
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # Try to find specific topic markers
-        topic_keywords = ["topic:", "subject:", "about:", "focuses on:"]
-        for keyword in topic_keywords:
-            if keyword in text.lower():
-                idx = text.lower().find(keyword) + len(keyword)
-                end_idx = text.find('.', idx)
-                if end_idx > 0:
-                    topic = text[idx:end_idx].strip()
-                    if 3 <= len(topic.split()) <= 10:
-                        return topic
+        text = PUNCTUATION_RE.sub(' ', text)
+        text = WHITESPACE_RE.sub(' ', text).strip()
+        text_lower = text.lower()
         
         # Find main topic from slide titles
-        slide_pattern = r'Slide \d+:?\s*([^0-9\n]+?)(?:\d|$)'
-        slide_titles = re.findall(slide_pattern, text)
+        slide_titles = SLIDE_TOPIC_RE.findall(text)
         if slide_titles:
             # Get the most common meaningful slide title
             filtered_titles = [title.strip() for title in slide_titles 
                              if len(title.split()) <= 5 and len(title.strip()) > 3]
             if filtered_titles:
-                return max(set(filtered_titles), key=filtered_titles.count)
+                return Counter(filtered_titles).most_common(1)[0][0]
         
         # Try to find the main subject using frequency analysis
+        nlp = get_nlp()
+        stop_words = nlp["stop_words"]
         try:
-            # Tokenize
-            words = word_tokenize(text.lower())
-            
-            # Filter stop words and short words
-            try:
-                stop_words = set(stopwords.words('english'))
-            except:
-                # Fallback if NLTK data is not available
-                stop_words = {"the", "and", "a", "an", "in", "on", "at", "with", "for", "to", "of", "is", "are"}
-            
-            words = [word for word in words if word not in stop_words and len(word) > 3]
+            # Count words longer than 3 characters, then drop the stop words. Counting the
+            # plain token list stays in Counter's C loop, and each stop word is removed once
+            # instead of being checked against every token.
+            word_freq = Counter(WORD_RE.findall(text_lower))
+            for word in stop_words & word_freq.keys():
+                del word_freq[word]
             
             # Get the most frequent words
-            word_freq = Counter(words)
             most_common_words = [word for word, _ in word_freq.most_common(15)]
             
             # Look for these words in sentences to extract key phrases
-            sentences = sent_tokenize(text)
+            # Only the first 10 sentences are used, so stop splitting after them
+            sentences = SENTENCE_RE.split(text, maxsplit=10)
             topic_candidates = []
             
             for sent in sentences[:10]:  # Look at first 10 sentences
-                for word in most_common_words:
-                    if word in sent.lower():
-                        topic_candidates.append(sent.strip())
-                        break
+                # Lower-case once per sentence rather than once per candidate word
+                sent_lower = sent.lower()
+                if any(word in sent_lower for word in most_common_words):
+                    topic_candidates.append(sent.strip())
             
             if topic_candidates:
                 # Return the first good candidate
@@ -117,11 +152,6 @@ def extract_main_topics(text, top_n=3):
         # Simple fallback: Extract first 3-5 meaningful words from first sentence
         first_sentence = text.split('.')[0]
         words = first_sentence.split()
-        try:
-            stop_words = set(stopwords.words('english'))
-        except:
-            # Fallback if NLTK data is not available
-            stop_words = {"the", "and", "a", "an", "in", "on", "at", "with", "for", "to", "of", "is", "are"}
         clean_words = [w for w in words if len(w) > 3 and w.lower() not in stop_words][:5]
         
         # If we still have nothing, just return the first few words
@@ -136,6 +166,7 @@ def extract_main_topics(text, top_n=3):
         return ' '.join(text.split()[:5])
 
 # Add functions for extracting information from slide content
+@st.cache_data(show_spinner=False, max_entries=32)
 def extract_slide_information(text):
     """
     Extract useful information from slide content.
@@ -148,8 +179,7 @@ def extract_slide_information(text):
     """
     try:
         # Extract slide titles
-        slide_pattern = r'Slide\s+(\d+):\s*([^\n]+)'
-        slide_matches = re.findall(slide_pattern, text, re.IGNORECASE)
+        slide_matches = SLIDE_TITLE_RE.findall(text)
         
         slides = []
         for num, title in slide_matches:
@@ -162,28 +192,34 @@ def extract_slide_information(text):
         slides.sort(key=lambda x: x["number"])
         
         # Extract potential key terms (capitalized phrases, bold text)
-        key_terms = []
+        terms = []
+        seen_terms = set()
         
         # Look for capitalized multi-word phrases that might be important concepts
-        term_matches = re.findall(r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,2})\b', text)
+        term_matches = CAPITALIZED_PHRASE_RE.findall(text)
         for term in term_matches:
-            if len(term) > 5 and term not in [t["term"] for t in key_terms]:
-                key_terms.append({
-                    "term": term,
-                    "context": get_term_context(text, term)
-                })
+            if len(terms) >= 10:
+                break
+            if len(term) > 5 and term not in seen_terms:
+                seen_terms.add(term)
+                terms.append(term)
         
         # Look for words in **bold** or marked with emphasis
-        bold_matches = re.findall(r'\*\*(.*?)\*\*', text)
+        bold_matches = BOLD_TEXT_RE.findall(text) if len(terms) < 10 else []
         for term in bold_matches:
-            if term and term not in [t["term"] for t in key_terms]:
-                key_terms.append({
-                    "term": term,
-                    "context": get_term_context(text, term)
-                })
+            if len(terms) >= 10:
+                break
+            if term and term not in seen_terms:
+                seen_terms.add(term)
+                terms.append(term)
+        
+        # Look up the context for every term in one pass over the text
+        contexts = get_terms_context(text, terms)
+        key_terms = [{"term": term, "context": contexts[term]} for term in terms]
         
         # Extract main topics using the extract_main_topics function
-        main_topics = extract_main_topics(text, top_n=5).split(', ')
+        # Uses the default top_n so process_input's fallback call hits the same cache entry
+        main_topics = extract_main_topics(text).split(', ')
         
         return {
             "slides": slides,
@@ -225,142 +261,552 @@ def get_term_context(text, term, context_length=100):
     except Exception:
         return ""
 
-# Define fallback wrapper functions that try OpenAI first, then free APIs
-def get_summary(text, max_bullets=7):
-    """Wrapper that tries OpenAI first, then Llama 4 Maverick, then static fallback."""
+def get_terms_context(text, terms, context_length=100):
+    """
+    Get the surrounding context for several terms with a single scan of the text.
+    
+    Args:
+        text (str): The full text
+        terms (list): The terms to find context for
+        context_length (int): The number of characters to include before and after
+        
+    Returns:
+        dict: Mapping of each term to its highlighted context ("" if not found)
+    """
+    contexts = {}
+    if not terms:
+        return contexts
+    
     try:
-        # Try OpenAI first
-        logger.info("Trying OpenAI for summary")
-        # Import here to avoid circular imports
-        from .openai_helpers import get_summary as openai_get_summary
-        result = openai_get_summary(text, max_bullets)
-        if result["success"]:
-            return result
-        
-        # If OpenAI fails, try Llama 4 Maverick via free AI helper
-        logger.info("OpenAI failed, trying Llama 4 Maverick for summary")
-        result = free_get_summary(text, max_bullets)
-        if result["success"]:
-            return result
+        # Terms that differ only in case share their first occurrence
+        terms_by_lower = {}
+        for term in terms:
+            terms_by_lower.setdefault(term.lower(), []).append(term)
+        
+        # Longest first, so a term is not shadowed by a shorter term it starts with
+        combined = re.compile(
+            "|".join(re.escape(term) for term in sorted(terms_by_lower, key=len, reverse=True)),
+            re.IGNORECASE
+        )
+        
+        for match in combined.finditer(text):
+            found = terms_by_lower.pop(match.group(0).lower(), None)
+            if found is None:
+                continue
             
-        # If all AI helpers fail, use static fallback
-        logger.info("All AI models failed, using static fallback for summary")
-        return get_static_summary(text, max_bullets)
+            # Same window as get_term_context: up to context_length characters on the same line
+            start, end = match.span()
+            line_start = text.rfind("\n", max(0, start - context_length), start) + 1
+            line_end = text.find("\n", end, end + context_length)
+            context = text[max(line_start, start - context_length):line_end if line_end != -1 else end + context_length]
+            
+            for term in found:
+                contexts[term] = re.sub(f"({re.escape(term)})", r"**\1**", context, flags=re.IGNORECASE)
+            if not terms_by_lower:
+                break
     except Exception as e:
-        logger.exception(f"Error in get_summary fallback: {str(e)}")
-        # If all else fails, use static fallback
-        logger.info("Using static fallback for summary after exception")
-        return get_static_summary(text, max_bullets)
+        logger.warning(f"Error collecting term contexts: {str(e)}")
+    
+    # Terms hidden inside overlapping matches fall back to an individual search
+    for term in terms:
+        if term not in contexts:
+            contexts[term] = get_term_context(text, term, context_length)
+    
+    return contexts
 
-def get_resources(topic, max_resources=3):
-    """Wrapper that tries OpenAI first, then Llama 4 Maverick, then static fallback."""
+def response_cache_key(*parts):
+    """
+    Build the disk cache key for an AI response.
+    
+    Whitespace is collapsed first so transcripts that differ only in spacing or
+    line breaks (re-runs, re-exported files) share a cache entry.
+    
+    Args:
+        *parts: The wrapper arguments identifying the response
+        
+    Returns:
+        str: The cache key
+    """
+    return disk_cache.content_key(*(' '.join(str(part).split()) for part in parts))
+
+def openai_helper(name):
+    """
+    Return a function that calls the named openai_helpers function.
+    
+    openai_helpers is imported on first call rather than at import time to avoid
+    circular imports and to defer loading the OpenAI client.
+    """
+    def call(*args):
+        from . import openai_helpers
+        return getattr(openai_helpers, name)(*args)
+    return call
+
+def is_ai_result(result):
+    """
+    Check whether a generator result holds real AI output.
+    
+    Static content and content built offline after the APIs failed are flagged
+    "fallback"; they still count as successful for display but shouldn't be kept.
+    
+    Args:
+        result (dict): A generator's result dictionary, or None
+        
+    Returns:
+        bool: True if the result succeeded and didn't come from a fallback
+    """
+    return bool(result and result.get("success") and not result.get("fallback"))
+
+def generate_with_fallbacks(label, namespace, generators, static_fallback, *args):
+    """
+    Try each AI generator in turn, falling back to static content if they all fail.
+    
+    The first successful AI response is stored in the disk cache, and a cached
+    response younger than RESPONSE_CACHE_TTL is returned without calling any API.
+    Results built offline after the APIs failed, and the static content, are
+    flagged "fallback" and are not stored.
+    
+    Args:
+        label (str): What is being generated, for logging (e.g. "summary")
+        namespace (str): The disk cache namespace for this kind of response
+        generators (tuple): (model name, function) pairs to try in order
+        static_fallback: Function producing static content from the same arguments
+        *args: The arguments passed to every generator
+        
+    Returns:
+        dict: The generator's result dictionary
+    """
     try:
-        # Try OpenAI first
-        logger.info("Trying OpenAI for resources")
-        # Import here to avoid circular imports
-        from .openai_helpers import get_resources as openai_get_resources
-        result = openai_get_resources(topic, max_resources)
-        if result["success"]:
-            return result
-        
-        # If OpenAI fails, try Llama 4 Maverick via free AI helper
-        logger.info("OpenAI failed, trying Llama 4 Maverick for resources")
-        result = free_get_resources(topic, max_resources)
-        if result["success"]:
-            return result
+        cache_key = response_cache_key(*args)
+        cached_result = disk_cache.load(namespace, cache_key, max_age=RESPONSE_CACHE_TTL)
+        if cached_result:
+            logger.info(f"Using cached {label}")
+            return cached_result
+        
+        for model_name, generate in generators:
+            logger.info(f"Trying {model_name} for {label}")
+            try:
+                result = generate(*args)
+            except Exception as e:
+                logger.exception(f"Error from {model_name} for {label}: {str(e)}")
+                continue
             
-        # If all AI helpers fail, use static fallback
-        logger.info("All AI models failed, using static fallback for resources")
-        return get_static_resources(topic, max_resources)
+            if result["success"]:
+                if not result.get("fallback"):
+                    disk_cache.store(namespace, cache_key, result)
+                return result
+            logger.info(f"{model_name} failed for {label}")
+        
+        logger.info(f"All AI models failed, using static fallback for {label}")
     except Exception as e:
-        logger.exception(f"Error in get_resources fallback: {str(e)}")
-        # If all else fails, use static fallback
-        logger.info("Using static fallback for resources after exception")
-        return get_static_resources(topic, max_resources)
+        logger.exception(f"Error in {label} fallback: {str(e)}")
+        logger.info(f"Using static fallback for {label} after exception")
+    
+    return {**static_fallback(*args), "fallback": True}
+
+def script_thread_pool(max_workers):
+    """
+    Create a thread pool whose workers share the calling script run's context.
+    
+    The cached wrappers below are called from worker threads; with the context
+    attached, st.cache_data doesn't log "missing ScriptRunContext" warnings there.
+    
+    Args:
+        max_workers (int): The number of worker threads
+        
+    Returns:
+        ThreadPoolExecutor: The thread pool
+    """
+    ctx = get_script_run_ctx()
+    return ThreadPoolExecutor(
+        max_workers=max_workers,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+    )
+
+def cache_ai_results(generate):
+    """
+    Cache a fallback wrapper's results in memory on its arguments, except fallback content.
+    
+    Static and offline fallback results are raised out of the cached function, so
+    st.cache_data doesn't keep them and the APIs are retried on the next call.
+    """
+    @st.cache_data(show_spinner=False, ttl=3600, max_entries=64)
+    @functools.wraps(generate)
+    def cached(*args):
+        result = generate(*args)
+        if result.get("fallback"):
+            raise ProcessingFailed(result)
+        return result
+    
+    @functools.wraps(generate)
+    def call(*args):
+        try:
+            return cached(*args)
+        except ProcessingFailed as e:
+            return e.result
+    return call
+
+# Define fallback wrapper functions that try OpenAI first, then free APIs.
+# Results are cached on their inputs so identical text or topics skip the API round-trip,
+# and successful AI responses are also kept on disk so they survive server restarts.
+@cache_ai_results
+def get_summary(text, max_bullets=7):
+    """Wrapper that tries OpenAI first, then Llama 4 Maverick, then static fallback."""
+    return generate_with_fallbacks(
+        "summary", "summary",
+        (("OpenAI", openai_helper("get_summary")), ("Llama 4 Maverick", free_get_summary)),
+        get_static_summary, text, max_bullets
+    )
+
+@cache_ai_results
+def get_resources(topic, max_resources=3):
+    """Wrapper that tries OpenAI first, then Llama 4 Maverick, then static fallback."""
+    return generate_with_fallbacks(
+        "resources", "resources",
+        (("OpenAI", openai_helper("get_resources")), ("Llama 4 Maverick", free_get_resources)),
+        get_static_resources, topic, max_resources
+    )
 
+@cache_ai_results
 def generate_study_guide(text):
     """Wrapper that tries OpenAI first, then Llama 4 Maverick, then static fallback."""
-    try:
-        # Try OpenAI first
-        logger.info("Trying OpenAI for study guide")
-        # Import here to avoid circular imports
-        from .openai_helpers import generate_study_guide as openai_generate_study_guide
-        result = openai_generate_study_guide(text)
-        if result["success"]:
-            return result
-        
-        # If OpenAI fails, try Llama 4 Maverick via free AI helper
-        logger.info("OpenAI failed, trying Llama 4 Maverick for study guide")
-        result = free_generate_study_guide(text)
-        if result["success"]:
-            return result
-            
-        # If all AI helpers fail, use static fallback
-        logger.info("All AI models failed, using static fallback for study guide")
-        return generate_static_study_guide(text)
-    except Exception as e:
-        logger.exception(f"Error in generate_study_guide fallback: {str(e)}")
-        # If all else fails, use static fallback
-        logger.info("Using static fallback for study guide after exception")
-        return generate_static_study_guide(text)
+    return generate_with_fallbacks(
+        "study guide", "study_guide",
+        (("OpenAI", openai_helper("generate_study_guide")), ("Llama 4 Maverick", free_generate_study_guide)),
+        generate_static_study_guide, text
+    )
 
+@cache_ai_results
 def generate_quiz(text, num_questions=5):
     """Wrapper that tries OpenAI first, then Llama 4 Maverick, then static fallback."""
-    try:
-        # Try OpenAI first
-        logger.info("Trying OpenAI for quiz")
-        # Import here to avoid circular imports
-        from .openai_helpers import generate_quiz as openai_generate_quiz
-        result = openai_generate_quiz(text, num_questions)
-        if result["success"]:
-            return result
-        
-        # If OpenAI fails, try Llama 4 Maverick via free AI helper
-        logger.info("OpenAI failed, trying Llama 4 Maverick for quiz")
-        result = free_generate_quiz(text, num_questions)
-        if result["success"]:
-            return result
-            
-        # If all AI helpers fail, use static fallback
-        logger.info("All AI models failed, using static fallback for quiz")
-        return generate_static_quiz(text, num_questions)
-    except Exception as e:
-        logger.exception(f"Error in generate_quiz fallback: {str(e)}")
-        # If all else fails, use static fallback
-        logger.info("Using static fallback for quiz after exception")
-        return generate_static_quiz(text, num_questions)
+    return generate_with_fallbacks(
+        "quiz", "quiz",
+        (("OpenAI", openai_helper("generate_quiz")), ("Llama 4 Maverick", free_generate_quiz)),
+        generate_static_quiz, text, num_questions
+    )
 
 def generate_topic_notes(text, max_sections=3):
     """Generate detailed notes for each topic with key points in bold and examples using Llama 4 Maverick."""
-    try:
-        logger.info("Generating detailed topic notes using Llama 4 Maverick")
-        # Try Llama 4 Maverick via free AI helper first
-        result = generate_detailed_notes(text, max_sections)
-        if result["success"]:
-            return result
-            
-        # If AI helper fails, use static fallback
-        logger.info("Llama 4 Maverick failed, using static fallback for detailed notes")
-        return generate_static_topic_notes(text, max_sections)
-    except Exception as e:
-        logger.exception(f"Error in generate_topic_notes: {str(e)}")
-        # If all else fails, use static fallback
-        logger.info("Using static fallback for detailed notes after exception")
-        return generate_static_topic_notes(text, max_sections)
+    return generate_with_fallbacks(
+        "detailed notes", "detailed_notes",
+        (("Llama 4 Maverick", generate_detailed_notes),),
+        generate_static_topic_notes, text, max_sections
+    )
+
+def submit_batch(text, topic):
+    """Submit the four study kit prompts as a single OpenAI Batch API job."""
+    logger.info("Submitting study kit batch to OpenAI")
+    # Import here to avoid circular imports
+    from .openai_helpers import submit_study_kit_batch
+    return submit_study_kit_batch(text, topic)
 
-def process_input(input_type, input_content):
+def collect_batch(batch_id, text, topic):
     """
-    Process the user input and generate study materials.
+    Poll a study kit batch and fill in its results once complete.
+    
+    Any section that failed inside the batch is regenerated through the regular
+    fallback wrappers so the study kit is always complete.
+    
+    Args:
+        batch_id (str): The id returned by submit_batch
+        text (str): The study text the batch was submitted for
+        topic (str): The main topic the batch was submitted for
+        
+    Returns:
+        dict: Dictionary with success status, batch status and, once completed,
+              results keyed by "summary", "resources", "study_guide" and "quiz"
+    """
+    # Import here to avoid circular imports
+    from .openai_helpers import retrieve_study_kit_batch
+    batch_result = retrieve_study_kit_batch(batch_id)
+    
+    if not batch_result["success"] or batch_result["results"] is None:
+        return batch_result
+    
+    fallbacks = {
+        "summary": lambda: get_summary(text),
+        "resources": lambda: get_resources(topic),
+        "study_guide": lambda: generate_study_guide(text),
+        "quiz": lambda: generate_quiz(text),
+    }
+    
+    results = batch_result["results"]
+    for section, fallback in fallbacks.items():
+        if section not in results or not results[section]["success"]:
+            logger.info(f"Batch result missing for {section}, using fallback")
+            results[section] = fallback()
+    
+    return batch_result
+
+class ProcessingFailed(Exception):
+    """Raised inside the cached pipeline so that failed or fallback results are not cached."""
+    def __init__(self, result):
+        super().__init__(result.get("error"))
+        self.result = result
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=64)
+def _process_input_cached(input_type, payload, file_name=None, _on_stage=None):
+    """Run process_input on a hashable payload, checking the disk cache first."""
+    cache_key = disk_cache.content_key(input_type, file_name or "", payload)
+    cached_result = disk_cache.load("processed_input", cache_key, max_age=RESPONSE_CACHE_TTL)
+    if cached_result:
+        logger.info(f"Using cached study materials for {input_type} input")
+        return cached_result
+    
+    if isinstance(payload, bytes):
+        # Rebuild a file-like object with the same interface as an uploaded file
+        input_content = io.BytesIO(payload)
+        input_content.name = file_name
+    else:
+        input_content = payload
+    
+    result = process_input(input_type, input_content, _on_stage)
+    # Materials with fallback sections aren't kept, so the input is retried once the APIs recover
+    if not result["success"] or result.get("fallback"):
+        raise ProcessingFailed(result)
+    
+    disk_cache.store("processed_input", cache_key, result)
+    return result
+
+def process_input_cached(input_type, input_content, on_stage=None):
+    """
+    Cached version of process_input.
+    
+    Identical text, the same YouTube video or identical uploaded file bytes reuse the
+    previously generated study materials instead of calling the APIs again.
     
     Args:
         input_type (str): The type of input ('text', 'youtube', 'audio', or 'file')
         input_content: The actual content (text, YouTube URL, audio file, or uploaded file)
+        on_stage: Optional progress callback, only called when the result is not cached
         
     Returns:
         dict: Dictionary with all generated study materials and success status
     """
+    try:
+        if input_type == "youtube":
+            from .transcription import extract_youtube_id
+            video_id = extract_youtube_id(input_content)
+            # Key on the video id so URL variations (timestamps, playlists) share an entry
+            if video_id:
+                return _process_input_cached("youtube", f"https://www.youtube.com/watch?v={video_id}", _on_stage=on_stage)
+            return process_input(input_type, input_content, on_stage)
+        
+        if input_type in ("audio", "file"):
+            return _process_input_cached(input_type, input_content.getvalue(), input_content.name, _on_stage=on_stage)
+        
+        return _process_input_cached(input_type, input_content, _on_stage=on_stage)
+    
+    except ProcessingFailed as e:
+        return e.result
+
+def transcript_from_text(text):
+    """Use typed or pasted text as the transcript as-is."""
+    logger.info("Processing text input")
+    return text, None
+
+def transcript_from_youtube(url):
+    """Fetch the transcript of a YouTube video."""
+    logger.info(f"Processing YouTube URL: {url}")
+    from .transcription import get_youtube_transcript
+    
+    transcript_result = get_youtube_transcript(url)
+    if not transcript_result["success"]:
+        logger.error(f"Failed to get YouTube transcript: {transcript_result['error']}")
+        return None, transcript_result["error"]
+    
+    logger.info("Successfully retrieved YouTube transcript")
+    return transcript_result["transcript"], None
+
+def transcript_from_audio(audio_file):
+    """Transcribe an uploaded audio file."""
+    logger.info("Processing audio file")
+    from .transcription import transcribe_audio
+    
+    transcript_result = transcribe_audio(audio_file)
+    if not transcript_result["success"]:
+        logger.error(f"Failed to transcribe audio: {transcript_result['error']}")
+        return None, transcript_result["error"]
+    
+    logger.info("Successfully transcribed audio")
+    return transcript_result["transcript"], None
+
+def is_video_upload(uploaded_file):
+    """Return whether an uploaded file is a video, whose audio is transcribed."""
+    from .file_processor import VIDEO_EXTENSIONS
+    return os.path.splitext(uploaded_file.name)[1].lower() in VIDEO_EXTENSIONS
+
+def transcript_from_file(uploaded_file):
+    """Extract the text of an uploaded document, or transcribe the audio of a video file."""
+    logger.info(f"Processing file: {uploaded_file.name}")
+    from .file_processor import process_file
+    
+    file_extension = uploaded_file.name.split('.')[-1].lower()
+    
+    # Check if it's a video file that needs audio extraction
+    if is_video_upload(uploaded_file):
+        logger.info("Processing video file for audio extraction")
+        video_result = process_file(uploaded_file)
+        
+        if not (video_result["success"] and "audio_file" in video_result):
+            logger.error(f"Failed to process video file: {video_result.get('error', 'Unknown error')}")
+            return None, video_result.get("error", "Failed to process video file")
+        
+        logger.info("Successfully extracted audio from video, transcribing...")
+        # Now transcribe the extracted audio
+        from .transcription import transcribe_audio
+        # Closing the extracted audio deletes its temporary file
+        with video_result["audio_file"] as audio_file:
+            transcript_result = transcribe_audio(audio_file)
+        
+        if not transcript_result["success"]:
+            logger.error(f"Failed to transcribe audio from video: {transcript_result['error']}")
+            return None, transcript_result["error"]
+        
+        logger.info("Successfully transcribed audio from video")
+        return transcript_result["transcript"], None
+    
+    # For all other file types, extract text content
+    file_result = process_file(uploaded_file)
+    
+    if not file_result["success"]:
+        logger.error(f"Failed to process file: {file_result.get('error', 'Unknown error')}")
+        return None, file_result.get("error", "Failed to process file")
+    
+    logger.info("Successfully processed file")
+    transcript = file_result["text"]
+    
+    # If it's a ZIP file, add a note about processing multiple files
+    if file_extension == 'zip' and 'file_count' in file_result:
+        logger.info(f"Processed {file_result['file_count']} files from ZIP archive")
+        transcript = f"[Processed {file_result['file_count']} files from ZIP archive]\n\n" + transcript
+    
+    return transcript, None
+
+def transcript_cache_key(input_type, input_content):
+    """
+    Build the disk cache key for an input's transcript.
+    
+    Args:
+        input_type (str): The type of input ('text', 'youtube', 'audio', or 'file')
+        input_content: The actual content (text, YouTube URL, audio file, or uploaded file)
+        
+    Returns:
+        str: The cache key, or None if the transcript should not be cached
+    """
+    if input_type == "youtube":
+        from .transcription import extract_youtube_id
+        video_id = extract_youtube_id(input_content)
+        return disk_cache.content_key("youtube", video_id) if video_id else None
+    
+    if input_type == "audio" or (input_type == "file" and is_video_upload(input_content)):
+        # The name is part of the key since the extension decides how the file is read
+        return disk_cache.content_key(input_type, input_content.name, input_content.getvalue())
+    
+    # Text input is its own transcript, and process_file already caches parsed documents
+    return None
+
+# Step 1 handlers: each turns one kind of input into (transcript, error)
+TRANSCRIPT_SOURCES = {
+    "text": transcript_from_text,
+    "youtube": transcript_from_youtube,
+    "audio": transcript_from_audio,
+    "file": transcript_from_file
+}
+
+def pick_topic(transcript):
+    """Choose the topic used to look up resources, preferring slide titles for slide content."""
+    # Check if this looks like slide content. Slide markers start the text of a
+    # presentation, so only the beginning of the transcript is scanned.
+    is_slide_content = SLIDE_MARKER_RE.search(transcript, 0, SLIDE_SCAN_LENGTH) is not None
+    
+    if is_slide_content:
+        # Extract slide-specific information
+        logger.info("Detected slide content, extracting slide information")
+        slide_info = extract_slide_information(transcript)
+        
+        # Use the main topics from slide extraction for resources
+        if slide_info["main_topics"] and slide_info["main_topics"][0] != "general topic":
+            topic = ", ".join(slide_info["main_topics"][:3])
+            logger.info(f"Extracted main topics from slides: {topic}")
+            return topic
+    
+    # Regular topic extraction for non-slide content, or when slide extraction failed
+    topic = extract_main_topics(transcript)
+    logger.info(f"Extracted main topic: {topic}")
+    return topic
+
+def process_input_stream(input_type, input_content):
+    """
+    Process the user input, yielding each step's result as soon as it is ready.
+    
+    The transcript is always yielded first; if it fails, nothing else follows.
+    The study materials are then yielded in the order they finish.
+    
+    Args:
+        input_type (str): The type of input ('text', 'youtube', 'audio', or 'file')
+        input_content: The actual content (text, YouTube URL, audio file, or uploaded file)
+        
+    Yields:
+        tuple: (stage, result dict) where stage is "transcript", "summary", "resources",
+               "study_guide", "quiz" or "detailed_notes"
+    """
     logger.info(f"Processing input of type: {input_type}")
     
+    # Step 1: Get the text content based on input type
+    get_transcript = TRANSCRIPT_SOURCES.get(input_type)
+    if get_transcript is None:
+        logger.error(f"Invalid input type: {input_type}")
+        yield "transcript", {"success": False, "error": "Invalid input type"}
+        return
+    
+    # Fetching, parsing and transcribing are deterministic, so reuse earlier transcripts
+    cache_key = transcript_cache_key(input_type, input_content)
+    cached_transcript = disk_cache.load("transcripts", cache_key) if cache_key else None
+    if cached_transcript:
+        logger.info(f"Using cached transcript for {input_type} input")
+        transcript, error = cached_transcript["transcript"], None
+    else:
+        transcript, error = get_transcript(input_content)
+        if cache_key and transcript and not error:
+            disk_cache.store("transcripts", cache_key, {"transcript": transcript})
+    
+    if error:
+        yield "transcript", {"success": False, "error": error}
+        return
+    if not transcript:
+        logger.error("Failed to process input: No valid transcript")
+        yield "transcript", {"success": False, "error": "Failed to process input: No valid transcript"}
+        return
+    
+    yield "transcript", {"success": True, "transcript": transcript}
+    
+    topic = pick_topic(transcript)
+    
+    # Steps 2-6 only depend on the transcript and topic, so the API calls run concurrently
+    logger.info("Generating summary, resources, study guide, quiz and detailed notes")
+    with script_thread_pool(max_workers=5) as executor:
+        futures = {
+            executor.submit(get_summary, transcript): "summary",
+            executor.submit(get_resources, topic): "resources",
+            executor.submit(generate_study_guide, transcript): "study_guide",
+            executor.submit(generate_quiz, transcript): "quiz",
+            executor.submit(generate_topic_notes, transcript): "detailed_notes",
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def process_input(input_type, input_content, on_stage=None):
+    """
+    Process the user input and generate study materials.
+    
+    Args:
+        input_type (str): The type of input ('text', 'youtube', 'audio', or 'file')
+        input_content: The actual content (text, YouTube URL, audio file, or uploaded file)
+        on_stage: Optional function called with (stage, result dict) as each step finishes
+        
+    Returns:
+        dict: Dictionary with all generated study materials and success status
+    """
     result = {
         "success": False,
         "transcript": None,
@@ -373,163 +819,51 @@ def process_input(input_type, input_content):
     }
     
     try:
-        # Step 1: Get the text content based on input type
-        if input_type == "text":
-            logger.info("Processing text input")
-            result["transcript"] = input_content
-            result["success"] = True
-        
-        elif input_type == "youtube":
-            logger.info(f"Processing YouTube URL: {input_content}")
-            transcript_result = get_youtube_transcript(input_content)
-            if transcript_result["success"]:
-                logger.info("Successfully retrieved YouTube transcript")
-                result["transcript"] = transcript_result["transcript"]
-                result["success"] = True
-            else:
-                logger.error(f"Failed to get YouTube transcript: {transcript_result['error']}")
-                return {"success": False, "error": transcript_result["error"]}
-        
-        elif input_type == "audio":
-            logger.info("Processing audio file")
-            transcript_result = transcribe_audio(input_content)
-            if transcript_result["success"]:
-                logger.info("Successfully transcribed audio")
-                result["transcript"] = transcript_result["transcript"]
-                result["success"] = True
-            else:
-                logger.error(f"Failed to transcribe audio: {transcript_result['error']}")
-                return {"success": False, "error": transcript_result["error"]}
-                
-        elif input_type == "file":
-            logger.info(f"Processing file: {input_content.name}")
-            # Check if it's a video file that needs audio extraction
-            file_extension = input_content.name.split('.')[-1].lower()
-            
-            if file_extension in ['mp4', 'mov', 'avi', 'mkv']:
-                logger.info("Processing video file for audio extraction")
-                video_result = process_file(input_content)
-                
-                if video_result["success"] and "audio_file" in video_result:
-                    logger.info("Successfully extracted audio from video, transcribing...")
-                    # Now transcribe the extracted audio
-                    transcript_result = transcribe_audio(video_result["audio_file"])
-                    
-                    if transcript_result["success"]:
-                        logger.info("Successfully transcribed audio from video")
-                        result["transcript"] = transcript_result["transcript"]
-                        result["success"] = True
-                    else:
-                        logger.error(f"Failed to transcribe audio from video: {transcript_result['error']}")
-                        return {"success": False, "error": transcript_result["error"]}
-                else:
-                    logger.error(f"Failed to process video file: {video_result.get('error', 'Unknown error')}")
-                    return {"success": False, "error": video_result.get("error", "Failed to process video file")}
-            else:
-                # For all other file types, extract text content
-                file_result = process_file(input_content)
-                
-                if file_result["success"]:
-                    logger.info(f"Successfully processed file")
-                    result["transcript"] = file_result["text"]
-                    result["success"] = True
-                    
-                    # If it's a ZIP file, add a note about processing multiple files
-                    if file_extension == 'zip' and 'file_count' in file_result:
-                        logger.info(f"Processed {file_result['file_count']} files from ZIP archive")
-                        result["transcript"] = f"[Processed {file_result['file_count']} files from ZIP archive]\n\n" + result["transcript"]
-                else:
-                    logger.error(f"Failed to process file: {file_result.get('error', 'Unknown error')}")
-                    return {"success": False, "error": file_result.get("error", "Failed to process file")}
-        else:
-            logger.error(f"Invalid input type: {input_type}")
-            return {"success": False, "error": "Invalid input type"}
+        stage_results = {}
+        for stage, stage_result in process_input_stream(input_type, input_content):
+            stage_results[stage] = stage_result
+            if on_stage:
+                on_stage(stage, stage_result)
         
-        # If we have a valid transcript, proceed with generating study materials
-        if result["success"] and result["transcript"]:
-            # Check if this looks like slide content
-            is_slide_content = re.search(r'slide\s+\d+', result["transcript"], re.IGNORECASE) is not None
-            
-            if is_slide_content:
-                # Extract slide-specific information
-                logger.info("Detected slide content, extracting slide information")
-                slide_info = extract_slide_information(result["transcript"])
-                
-                # Use the main topics from slide extraction for resources
-                if slide_info["main_topics"] and slide_info["main_topics"][0] != "general topic":
-                    topic = ", ".join(slide_info["main_topics"][:3])
-                    logger.info(f"Extracted main topics from slides: {topic}")
-                else:
-                    # Fallback to regular topic extraction
-                    topic = extract_main_topics(result["transcript"])
-                    logger.info(f"Extracted main topic: {topic}")
-            else:
-                # Regular topic extraction for non-slide content
-                topic = extract_main_topics(result["transcript"])
-                logger.info(f"Extracted main topic: {topic}")
-            
-            # Step 2: Generate summary
-            logger.info("Generating summary")
-            summary_result = get_summary(result["transcript"])
-            if summary_result["success"]:
-                logger.info("Summary generated successfully")
-                result["summary"] = summary_result["summary"]
-            else:
-                logger.error(f"Failed to generate summary: {summary_result['error']}")
-                result["error"] = summary_result["error"]
-                return result
-            
-            # Step 3: Find resources
-            logger.info("Finding resources")
-            resources_result = get_resources(topic)
-            if resources_result["success"]:
-                logger.info("Resources found successfully")
-                result["resources"] = resources_result["resources"]
-            else:
-                logger.error(f"Failed to find resources: {resources_result['error']}")
-                result["error"] = resources_result["error"]
-                return result
-            
-            # Step 4: Generate study guide
-            logger.info("Generating study guide")
-            study_guide_result = generate_study_guide(result["transcript"])
-            if study_guide_result["success"]:
-                logger.info("Study guide generated successfully")
-                result["study_guide"] = study_guide_result["study_guide"]
-            else:
-                logger.error(f"Failed to generate study guide: {study_guide_result['error']}")
-                result["error"] = study_guide_result["error"]
-                return result
-            
-            # Step 5: Generate quiz
-            logger.info("Generating quiz")
-            quiz_result = generate_quiz(result["transcript"])
-            if quiz_result["success"]:
-                logger.info("Quiz generated successfully")
-                result["quiz"] = quiz_result["quiz"]
+        transcript_result = stage_results["transcript"]
+        if not transcript_result["success"]:
+            return {"success": False, "error": transcript_result["error"]}
+        
+        result["transcript"] = transcript_result["transcript"]
+        result["success"] = True
+        
+        # Required sections, checked in step order so the reported error does not depend on timing
+        required_steps = (
+            ("summary", "summary"),
+            ("resources", "resources"),
+            ("study guide", "study_guide"),
+            ("quiz", "quiz"),
+        )
+        for label, key in required_steps:
+            step_result = stage_results[key]
+            if step_result["success"]:
+                logger.info(f"Generated {label} successfully")
+                result[key] = step_result[key]
             else:
-                logger.error(f"Failed to generate quiz: {quiz_result['error']}")
-                result["error"] = quiz_result["error"]
+                logger.error(f"Failed to generate {label}: {step_result['error']}")
+                result["error"] = step_result["error"]
                 return result
-            
-            # Step 6: Generate detailed notes with examples
-            logger.info("Generating detailed topic notes")
-            notes_result = generate_topic_notes(result["transcript"])
-            if notes_result["success"]:
-                logger.info("Detailed notes generated successfully")
-                result["detailed_notes"] = {"notes": notes_result["notes"]}
-            else:
-                logger.error(f"Failed to generate detailed notes: {notes_result['error']}")
-                # Don't return error here, as this is a bonus feature
-                # Just continue without detailed notes
-                
-            logger.info("All processing completed successfully")
-            result["success"] = True
-            return result
         
+        # Detailed notes with examples
+        notes_result = stage_results["detailed_notes"]
+        if notes_result["success"]:
+            logger.info("Detailed notes generated successfully")
+            result["detailed_notes"] = {"notes": notes_result["notes"]}
         else:
-            logger.error("Failed to process input: No valid transcript")
-            return {"success": False, "error": "Failed to process input: No valid transcript"}
+            logger.error(f"Failed to generate detailed notes: {notes_result['error']}")
+            # Don't return error here, as this is a bonus feature
+            # Just continue without detailed notes
+        
+        # Note whether any section came from static or offline fallback content
+        result["fallback"] = any(stage_result.get("fallback") for stage_result in stage_results.values())
+        
+        logger.info("All processing completed successfully")
+        return result
     
     except Exception as e:
         logger.exception(f"Unexpected error in process_input: {str(e)}")
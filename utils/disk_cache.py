@@ -0,0 +1,89 @@
+"""
+Persistent on-disk cache for the AI Study Assistant.
+Stores JSON-serializable results keyed by a content hash so they survive
+across sessions and server restarts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Directory where cached results are stored
+CACHE_DIR = os.environ.get("STUDY_KIT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "studykit"))
+
+def content_key(*parts):
+    """
+    Build a cache key from one or more strings or byte strings.
+    
+    Args:
+        *parts (str or bytes): The values that identify the cached value
+        
+    Returns:
+        str: A SHA-1 hex digest of the combined parts
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _cache_path(namespace, key):
+    """Return the file path for a cache entry."""
+    return os.path.join(CACHE_DIR, namespace, f"{key}.json")
+
+def load(namespace, key, max_age=None):
+    """
+    Load a cached value.
+    
+    Args:
+        namespace (str): The group of cached values (e.g. "study_kit")
+        key (str): The key returned by content_key
+        max_age (float, optional): Ignore entries written more than this many seconds ago
+        
+    Returns:
+        The cached value, or None if nothing (fresh enough) is cached under this key
+    """
+    try:
+        path = _cache_path(namespace, key)
+        if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Error reading cache entry {namespace}/{key}: {str(e)}")
+        return None
+
+def store(namespace, key, value):
+    """
+    Store a JSON-serializable value in the cache.
+    
+    Args:
+        namespace (str): The group of cached values (e.g. "study_kit")
+        key (str): The key returned by content_key
+        value: The value to cache
+        
+    Returns:
+        bool: True if the value was written, False otherwise
+    """
+    try:
+        path = _cache_path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        # Write to a temporary file first so readers never see a partial entry
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(path),
+                                         suffix=".tmp", delete=False) as temp_file:
+            json.dump(value, temp_file)
+            temp_path = temp_file.name
+        os.replace(temp_path, path)
+        return True
+    except Exception as e:
+        logger.warning(f"Error writing cache entry {namespace}/{key}: {str(e)}")
+        return False
@@ -1,10 +1,130 @@
+import html
+import io
 import json
 import logging
+import re
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
+# Try to import orjson for faster JSON serialization
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Markdown patterns used by the text and HTML exports, compiled once at import.
+# All rules are alternatives of one pattern so each conversion is a single pass;
+# the inner text of headings, emphasis and links is converted with INLINE_RE.
+INLINE_MARKDOWN = r'\*\*(?P<bold>.+?)\*\*|\*(?P<italic>.+?)\*|\[(?P<label>.+?)\]\((?P<url>.+?)\)'
+MARKDOWN_RE = re.compile(r'^(?P<hashes>#{1,6})(?P<gap>[ \t]+)(?P<heading>.+)|' + INLINE_MARKDOWN, re.MULTILINE)
+INLINE_RE = re.compile(INLINE_MARKDOWN)
+
+# Quiz option lines indexed by whether the option is the correct answer
+QUIZ_OPTION_FORMATS = ("- {key}: {value}\n", "- **{key}:** {value} ✓\n")
+
+# Static HTML document wrapping the converted export body, built once at import
+HTML_EXPORT_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Study Kit: {title}</title>
+    <style>
+        body {{ 
+            font-family: Arial, sans-serif; 
+            line-height: 1.6;
+            max-width: 800px;
+            margin: 0 auto;
+            padding: 20px;
+        }}
+        h1, h2, h3 {{ color: #2c3e50; }}
+        a {{ color: #3498db; }}
+        .resource {{ margin-bottom: 20px; padding: 10px; border: 1px solid #eee; }}
+        .flashcard {{ margin-bottom: 15px; padding: 10px; background-color: #f9f9f9; }}
+        .question {{ font-weight: bold; }}
+        .quiz-question {{ margin-bottom: 30px; }}
+        .option {{ margin-left: 20px; }}
+        .correct {{ color: #27ae60; font-weight: bold; }}
+    </style>
+</head>
+<body>
+    <p>{body}</p>
+</body>
+</html>
+"""
+
+def dumps_json_bytes(data):
+    """Serialize data to indented UTF-8 JSON bytes, using orjson when it is installed."""
+    if HAS_ORJSON:
+        return orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, default=str).encode()
+
+def dumps_json(data):
+    """Serialize data to an indented JSON string, using orjson when it is installed."""
+    if HAS_ORJSON:
+        return dumps_json_bytes(data).decode()
+    return json.dumps(data, indent=2, default=str)
+
+def markdown_to_text(match):
+    """re.sub callback converting one markdown element to plain text."""
+    if match.group("heading") is not None:
+        return INLINE_RE.sub(markdown_to_text, match.group("heading")) + "\n" + "=" * 30
+    if match.group("bold") is not None:
+        return INLINE_RE.sub(markdown_to_text, match.group("bold"))
+    if match.group("italic") is not None:
+        return INLINE_RE.sub(markdown_to_text, match.group("italic"))
+    return f'{INLINE_RE.sub(markdown_to_text, match.group("label"))} ({match.group("url")})'
+
+def markdown_to_html(match):
+    """re.sub callback converting one markdown element to HTML."""
+    if match.group("heading") is not None:
+        heading = INLINE_RE.sub(markdown_to_html, match.group("heading"))
+        level = len(match.group("hashes"))
+        # Only the top three heading levels (with a single space) are converted
+        if level <= 3 and match.group("gap") == " ":
+            return f"<h{level}>{heading}</h{level}>"
+        return match.group("hashes") + match.group("gap") + heading
+    if match.group("bold") is not None:
+        return f'<strong>{INLINE_RE.sub(markdown_to_html, match.group("bold"))}</strong>'
+    if match.group("italic") is not None:
+        return f'<em>{INLINE_RE.sub(markdown_to_html, match.group("italic"))}</em>'
+    return f'<a href="{match.group("url")}">{INLINE_RE.sub(markdown_to_html, match.group("label"))}</a>'
+
+@dataclass
+class ExportBundle:
+    """Study materials unpacked once from the nested generator results for the exports."""
+    __slots__ = ("topic", "summary", "resources", "study_guide", "key_terms",
+                 "important_concepts", "flashcards", "quiz", "insights")
+    topic: str
+    summary: Optional[str]  # None when no summary is available
+    resources: list
+    study_guide: Optional[dict]  # None when the study guide failed
+    key_terms: list
+    important_concepts: list
+    flashcards: list
+    quiz: Optional[list]  # None when the quiz failed
+    insights: dict
+    
+    @classmethod
+    def from_raw(cls, topic, summary, resources, study_guide, quiz, insights):
+        """Build a bundle from the {"success": ..., ...} dicts returned by the generators."""
+        guide = None
+        if study_guide and study_guide.get("success", False):
+            guide = study_guide.get("study_guide", {}).get("study_guide", {})
+        return cls(
+            topic=topic,
+            summary=summary.get("summary") if summary and summary.get("success", False) else None,
+            resources=resources.get("resources", {}).get("resources", []) if resources and resources.get("success", False) else [],
+            study_guide=guide,
+            key_terms=guide.get("key_terms", []) if guide else [],
+            important_concepts=guide.get("important_concepts", []) if guide else [],
+            flashcards=guide.get("flashcards", []) if guide else [],
+            quiz=quiz.get("quiz", {}).get("quiz", []) if quiz and quiz.get("success", False) else None,
+            insights=insights or {}
+        )
+
 def generate_export_file(topic, summary, resources, study_guide, quiz, insights, export_format="md"):
     """
     Generate an export file with all study materials.
@@ -22,219 +142,197 @@ def generate_export_file(topic, summary, resources, study_guide, quiz, insights,
         str: The content of the export file
     """
     try:
-        if export_format == "json":
-            return generate_json_export(topic, summary, resources, study_guide, quiz, insights)
-        elif export_format == "html":
-            return generate_html_export(topic, summary, resources, study_guide, quiz, insights)
-        elif export_format == "txt":
-            return generate_text_export(topic, summary, resources, study_guide, quiz, insights)
-        else:  # Default to markdown
-            return generate_markdown_export(topic, summary, resources, study_guide, quiz, insights)
+        # Default to markdown for unknown formats
+        exporter = EXPORTERS.get(export_format, generate_markdown_export)
+        return exporter(ExportBundle.from_raw(topic, summary, resources, study_guide, quiz, insights))
     
     except Exception as e:
         logger.exception(f"Error generating export file: {str(e)}")
         # Return a simple error message in the requested format
-        if export_format == "json":
-            return json.dumps({"error": f"Failed to generate export: {str(e)}"})
-        elif export_format == "html":
-            return f"<html><body><h1>Error</h1><p>Failed to generate export: {str(e)}</p></body></html>"
-        elif export_format == "txt":
-            return f"ERROR: Failed to generate export: {str(e)}"
-        else:
-            return f"# Error\n\nFailed to generate export: {str(e)}"
+        format_error = EXPORT_ERROR_FORMATTERS.get(export_format, markdown_export_error)
+        return format_error(f"Failed to generate export: {str(e)}")
+
+def write_key_terms(buf, terms):
+    """Write the key terms and definitions of the study guide to buf."""
+    buf.write("### Key Terms and Definitions\n\n")
+    if not terms:
+        buf.write("No key terms available.\n")
+        return
+    buf.write("".join(
+        f"**{term.get('term', 'Term')}**: {term.get('definition', 'No definition available.')}\n\n"
+        for term in terms
+    ))
 
-def generate_markdown_export(topic, summary, resources, study_guide, quiz, insights):
+def write_flashcards(buf, cards):
+    """Write the study guide flashcards to buf."""
+    buf.write("\n### Flashcards\n\n")
+    if not cards:
+        buf.write("No flashcards available.\n")
+        return
+    buf.write("".join(
+        f"**Q{i+1}:** {card.get('question', 'Question')}\n**A{i+1}:** {card.get('answer', 'Answer')}\n\n"
+        for i, card in enumerate(cards)
+    ))
+
+def write_quiz(buf, questions):
+    """Write the practice quiz questions, marking the correct options, to buf."""
+    if not questions:
+        buf.write("No quiz questions available.\n")
+        return
+    for i, q in enumerate(questions):
+        buf.write(f"### Question {i+1}: {q.get('question', 'Question')}\n\n")
+        
+        options = q.get("options", {})
+        correct = q.get("correct_answer")
+        buf.write("".join(
+            QUIZ_OPTION_FORMATS[key == correct].format(key=key, value=value)
+            for key, value in options.items()
+        ))
+        
+        buf.write(f"\n**Explanation:** {q.get('explanation', 'No explanation available.')}\n\n")
+
+def generate_markdown_export(bundle):
     """Generate a Markdown export file."""
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
-    content = f"""# Study Kit: {topic}
+    # Write the pieces to an in-memory buffer and read it once at the end
+    buf = io.StringIO()
+    buf.write(f"""# Study Kit: {bundle.topic}
 Generated on: {now}
 
 ## 1. Key Concepts Summary
 
-"""
+""")
     
     # Add summary
-    if summary and summary.get("success", False):
-        content += summary.get("summary", "No summary available.")
-    else:
-        content += "No summary available."
+    buf.write(bundle.summary if bundle.summary is not None else "No summary available.")
     
-    content += "\n\n## 2. Recommended Resources\n\n"
+    buf.write("\n\n## 2. Recommended Resources\n\n")
     
     # Add resources
-    if resources and resources.get("success", False):
-        res_list = resources.get("resources", {}).get("resources", [])
-        if res_list:
-            for res in res_list:
-                content += f"### {res.get('title', 'Resource')}\n"
-                content += f"**Type:** {res.get('type', 'Resource')}\n"
-                content += f"**Description:** {res.get('description', 'No description available.')}\n"
-                content += f"**URL:** [{res.get('url', '#')}]({res.get('url', '#')})\n\n"
-        else:
-            content += "No resources available.\n"
+    if bundle.resources:
+        buf.write("".join(
+            f"### {res.get('title', 'Resource')}\n"
+            f"**Type:** {res.get('type', 'Resource')}\n"
+            f"**Description:** {res.get('description', 'No description available.')}\n"
+            f"**URL:** [{res.get('url', '#')}]({res.get('url', '#')})\n\n"
+            for res in bundle.resources
+        ))
     else:
-        content += "No resources available.\n"
+        buf.write("No resources available.\n")
     
-    content += "\n## 3. Study Guide\n\n"
+    buf.write("\n## 3. Study Guide\n\n")
     
     # Add study guide
-    if study_guide and study_guide.get("success", False):
-        guide = study_guide.get("study_guide", {}).get("study_guide", {})
-        
+    if bundle.study_guide is not None:
         # Key terms
-        content += "### Key Terms and Definitions\n\n"
-        terms = guide.get("key_terms", [])
-        if terms:
-            for term in terms:
-                content += f"**{term.get('term', 'Term')}**: {term.get('definition', 'No definition available.')}\n\n"
-        else:
-            content += "No key terms available.\n"
+        write_key_terms(buf, bundle.key_terms)
         
         # Important concepts
-        content += "\n### Important Concepts\n\n"
-        concepts = guide.get("important_concepts", [])
-        if concepts:
-            for i, concept in enumerate(concepts):
-                content += f"{i+1}. {concept}\n"
+        buf.write("\n### Important Concepts\n\n")
+        if bundle.important_concepts:
+            buf.write("".join(f"{i+1}. {concept}\n" for i, concept in enumerate(bundle.important_concepts)))
         else:
-            content += "No important concepts available.\n"
+            buf.write("No important concepts available.\n")
         
         # Flashcards
-        content += "\n### Flashcards\n\n"
-        cards = guide.get("flashcards", [])
-        if cards:
-            for i, card in enumerate(cards):
-                content += f"**Q{i+1}:** {card.get('question', 'Question')}\n"
-                content += f"**A{i+1}:** {card.get('answer', 'Answer')}\n\n"
-        else:
-            content += "No flashcards available.\n"
+        write_flashcards(buf, bundle.flashcards)
     else:
-        content += "No study guide available.\n"
+        buf.write("No study guide available.\n")
     
-    content += "\n## 4. Practice Quiz\n\n"
+    buf.write("\n## 4. Practice Quiz\n\n")
     
     # Add quiz
-    if quiz and quiz.get("success", False):
-        questions = quiz.get("quiz", {}).get("quiz", [])
-        if questions:
-            for i, q in enumerate(questions):
-                content += f"### Question {i+1}: {q.get('question', 'Question')}\n\n"
-                
-                options = q.get("options", {})
-                for key, value in options.items():
-                    if key == q.get("correct_answer"):
-                        content += f"- **{key}:** {value} ✓\n"
-                    else:
-                        content += f"- {key}: {value}\n"
-                
-                content += f"\n**Explanation:** {q.get('explanation', 'No explanation available.')}\n\n"
-        else:
-            content += "No quiz questions available.\n"
+    if bundle.quiz is not None:
+        write_quiz(buf, bundle.quiz)
     else:
-        content += "No quiz available.\n"
+        buf.write("No quiz available.\n")
     
     # Add personalized insights if available
+    insights = bundle.insights
     if insights:
-        content += "\n## 5. Personalized Insights\n\n"
+        buf.write("\n## 5. Personalized Insights\n\n")
         
-        content += "### How This Content Relates to Your Background\n"
-        content += insights.get("relevance", "No insights available.") + "\n\n"
+        buf.write("### How This Content Relates to Your Background\n")
+        buf.write(insights.get("relevance", "No insights available.") + "\n\n")
         
-        content += "### Alignment with Your Skills\n"
-        content += insights.get("alignment", "No insights available.") + "\n\n"
+        buf.write("### Alignment with Your Skills\n")
+        buf.write(insights.get("alignment", "No insights available.") + "\n\n")
         
-        content += "### Areas for Growth\n"
-        content += insights.get("growth_areas", "No insights available.") + "\n\n"
+        buf.write("### Areas for Growth\n")
+        buf.write(insights.get("growth_areas", "No insights available.") + "\n\n")
         
-        content += "### Applying This Knowledge\n"
-        content += insights.get("applications", "No insights available.") + "\n\n"
+        buf.write("### Applying This Knowledge\n")
+        buf.write(insights.get("applications", "No insights available.") + "\n\n")
         
-        content += "### Customized Learning Path\n"
-        content += insights.get("learning_path", "No insights available.") + "\n\n"
+        buf.write("### Customized Learning Path\n")
+        buf.write(insights.get("learning_path", "No insights available.") + "\n\n")
     
-    return content
+    return buf.getvalue()
 
-def generate_text_export(topic, summary, resources, study_guide, quiz, insights):
+def generate_text_export(bundle):
     """Generate a plain text export file."""
     # Convert markdown to plain text
-    md_content = generate_markdown_export(topic, summary, resources, study_guide, quiz, insights)
+    md_content = generate_markdown_export(bundle)
     
-    # Replace markdown formatting with plain text equivalents
-    text_content = md_content
-    text_content = re.sub(r'#{1,6}\s+(.+)', r'\1\n' + '=' * 30, text_content)  # Replace headers
-    text_content = re.sub(r'\*\*(.+?)\*\*', r'\1', text_content)  # Remove bold
-    text_content = re.sub(r'\*(.+?)\*', r'\1', text_content)  # Remove italic
-    text_content = re.sub(r'\[(.+?)\]\((.+?)\)', r'\1 (\2)', text_content)  # Convert links
-    
-    return text_content
+    # Replace headers, bold, italic and links with plain text equivalents in one pass
+    return MARKDOWN_RE.sub(markdown_to_text, md_content)
 
-def generate_html_export(topic, summary, resources, study_guide, quiz, insights):
+def generate_html_export(bundle):
     """Generate an HTML export file."""
     # Convert markdown to HTML
-    md_content = generate_markdown_export(topic, summary, resources, study_guide, quiz, insights)
+    md_content = generate_markdown_export(bundle)
     
     # Simple markdown to HTML conversion (for a proper implementation, use a markdown library)
-    html_content = md_content
-    
-    # Replace headers
-    html_content = re.sub(r'# (.+)', r'<h1>\1</h1>', html_content)
-    html_content = re.sub(r'## (.+)', r'<h2>\1</h2>', html_content)
-    html_content = re.sub(r'### (.+)', r'<h3>\1</h3>', html_content)
-    
-    # Replace bold and italic
-    html_content = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html_content)
-    html_content = re.sub(r'\*(.+?)\*', r'<em>\1</em>', html_content)
-    
-    # Replace links
-    html_content = re.sub(r'\[(.+?)\]\((.+?)\)', r'<a href="\2">\1</a>', html_content)
+    # Replace headers, bold, italic and links in one pass
+    html_content = MARKDOWN_RE.sub(markdown_to_html, md_content)
     
     # Replace line breaks
     html_content = html_content.replace('\n\n', '</p><p>')
     
-    # Wrap in HTML structure
-    html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>Study Kit: {topic}</title>
-    <style>
-        body {{ 
-            font-family: Arial, sans-serif; 
-            line-height: 1.6;
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        h1, h2, h3 {{ color: #2c3e50; }}
-        a {{ color: #3498db; }}
-        .resource {{ margin-bottom: 20px; padding: 10px; border: 1px solid #eee; }}
-        .flashcard {{ margin-bottom: 15px; padding: 10px; background-color: #f9f9f9; }}
-        .question {{ font-weight: bold; }}
-        .quiz-question {{ margin-bottom: 30px; }}
-        .option {{ margin-left: 20px; }}
-        .correct {{ color: #27ae60; font-weight: bold; }}
-    </style>
-</head>
-<body>
-    <p>{html_content}</p>
-</body>
-</html>
-"""
-    
-    return html
+    # Wrap in the HTML document scaffold, escaping the topic for the title
+    return HTML_EXPORT_TEMPLATE.format(title=html.escape(bundle.topic), body=html_content)
 
-def generate_json_export(topic, summary, resources, study_guide, quiz, insights):
+def generate_json_export(bundle):
     """Generate a JSON export file."""
     export_data = {
-        "topic": topic,
+        "topic": bundle.topic,
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
-        "summary": summary.get("summary", "") if summary and summary.get("success", False) else None,
-        "resources": resources.get("resources", {}).get("resources", []) if resources and resources.get("success", False) else [],
-        "study_guide": study_guide.get("study_guide", {}).get("study_guide", {}) if study_guide and study_guide.get("success", False) else {},
-        "quiz": quiz.get("quiz", {}).get("quiz", []) if quiz and quiz.get("success", False) else [],
-        "insights": insights if insights else {}
+        "summary": bundle.summary,
+        "resources": bundle.resources,
+        "study_guide": bundle.study_guide if bundle.study_guide is not None else {},
+        "quiz": bundle.quiz if bundle.quiz is not None else [],
+        "insights": bundle.insights
     }
     
-    return json.dumps(export_data, indent=2)
+    return dumps_json(export_data)
 
-# Add utility function to help with text replacements in export formats
-import re
+def json_export_error(message):
+    """Format an export error as a JSON document."""
+    return json.dumps({"error": message})
+
+def html_export_error(message):
+    """Format an export error as an HTML page."""
+    return f"<html><body><h1>Error</h1><p>{message}</p></body></html>"
+
+def text_export_error(message):
+    """Format an export error as plain text."""
+    return f"ERROR: {message}"
+
+def markdown_export_error(message):
+    """Format an export error as markdown."""
+    return f"# Error\n\n{message}"
+
+# Export generator and error formatter for each supported export format
+EXPORTERS = {
+    "json": generate_json_export,
+    "html": generate_html_export,
+    "txt": generate_text_export,
+    "md": generate_markdown_export
+}
+
+EXPORT_ERROR_FORMATTERS = {
+    "json": json_export_error,
+    "html": html_export_error,
+    "txt": text_export_error,
+    "md": markdown_export_error
+}
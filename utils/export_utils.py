@@ -3,221 +3,250 @@ Export utilities for the AI Study Assistant.
 Provides functionality to export study materials in various formats.
 """
 
-import base64
-import json
 import io
 import os
 from datetime import datetime
 import streamlit as st
+from .export import dumps_json_bytes
 
-def get_download_link(content, filename, text):
+def entries_with_keys(items, *keys):
     """
-    Generate a download link for a file.
+    Keep the entries of a generated list that are dicts carrying all the given keys.
+    
+    The sections validate their entries once with this, so the write loops need no guards.
     
     Args:
-        content (str): Content to be downloaded
-        filename (str): Name of the download file
-        text (str): Text to display for the download link
+        items (list): Entries from the generated study materials
+        *keys (str): Keys every kept entry must have
         
     Returns:
-        str: HTML string for the download link
+        list: The valid entries, in their original order
     """
-    # Encode the content to base64
-    b64 = base64.b64encode(content.encode()).decode()
-    
-    # Generate the download link
-    href = f'<a href="data:file/txt;base64,{b64}" download="{filename}">{text}</a>'
-    return href
+    required = set(keys)
+    return [item for item in items if isinstance(item, dict) and required <= item.keys()]
+
+def write_key_terms(buf, key_terms):
+    """Write the key terms section of the markdown export to buf."""
+    buf.write("### Key Terms\n\n")
+    buf.write("".join(f"**{term_entry['term']}**: {term_entry['definition']}\n\n" for term_entry in key_terms))
+
+def write_flashcards(buf, flashcards):
+    """Write the flashcards section of the markdown export to buf."""
+    buf.write("### Flashcards\n\n")
+    buf.write("".join(
+        f"**Q{i+1}:** {card['question']}\n\n**A{i+1}:** {card['answer']}\n\n"
+        for i, card in enumerate(flashcards)
+    ))
+
+def write_quiz(buf, quiz):
+    """Write the practice quiz questions of the markdown export to buf."""
+    for i, question in enumerate(quiz):
+        buf.write(f"**Question {i+1}:** {question['question']}\n\n")
+        
+        options = question["options"]
+        buf.write("".join(f"- {opt}: {text}\n" for opt, text in options.items()))
+        
+        # Include correct answer
+        if "correct_answer" in question:
+            buf.write(f"\n*Correct Answer: {question['correct_answer']}*\n\n")
 
-def format_markdown_content(title, results):
+def format_markdown_content(title, results, now=None):
     """
     Format study materials as markdown content.
     
     Args:
         title (str): Title for the markdown content
         results (dict): Dictionary containing study materials
+        now (datetime, optional): Generation time for the header; defaults to the current time
         
     Returns:
         str: Formatted markdown content
     """
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    generated_at = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
     
-    markdown_content = f"# {title}\nGenerated on: {now}\n\n"
+    # Write the pieces to an in-memory buffer and read it once at the end
+    buf = io.StringIO()
+    buf.write(f"# {title}\nGenerated on: {generated_at}\n\n")
     
     # Add Key Concepts Summary
-    markdown_content += "## 🧠 Key Concepts Summary\n\n"
+    buf.write("## 🧠 Key Concepts Summary\n\n")
     if "summary" in results and results["summary"] and isinstance(results["summary"], dict):
         summary = results["summary"].get("summary", "")
         if summary:
-            markdown_content += f"{summary}\n\n"
+            buf.write(f"{summary}\n\n")
     
     # Add Suggested Resources
-    markdown_content += "## 📚 Suggested Resources\n\n"
+    buf.write("## 📚 Suggested Resources\n\n")
     if "resources" in results and results["resources"] and isinstance(results["resources"], dict):
         resources = results["resources"].get("resources", [])
         if resources and isinstance(resources, list):
-            for resource in resources:
-                if isinstance(resource, dict) and "title" in resource and "url" in resource:
-                    markdown_content += f"- [{resource['title']}]({resource['url']})\n"
-            markdown_content += "\n"
+            buf.write("".join(
+                f"- [{resource['title']}]({resource['url']})\n"
+                for resource in entries_with_keys(resources, "title", "url")
+            ))
+            buf.write("\n")
     
     # Add Study Guide
-    markdown_content += "## 📝 Study Guide & Flashcards\n\n"
+    buf.write("## 📝 Study Guide & Flashcards\n\n")
     if "study_guide" in results and results["study_guide"] and isinstance(results["study_guide"], dict):
         study_guide = results["study_guide"].get("study_guide", {})
+        if not isinstance(study_guide, dict):
+            study_guide = {}
         
         # Key Terms
-        if study_guide and "key_terms" in study_guide and study_guide["key_terms"]:
-            markdown_content += "### Key Terms\n\n"
-            for term_entry in study_guide["key_terms"]:
-                if isinstance(term_entry, dict) and "term" in term_entry and "definition" in term_entry:
-                    markdown_content += f"**{term_entry['term']}**: {term_entry['definition']}\n\n"
+        key_terms = entries_with_keys(study_guide.get("key_terms") or [], "term", "definition")
+        if key_terms:
+            write_key_terms(buf, key_terms)
         
         # Important Concepts
-        if study_guide and "important_concepts" in study_guide and study_guide["important_concepts"]:
-            markdown_content += "### Important Concepts\n\n"
-            for i, concept in enumerate(study_guide["important_concepts"]):
-                markdown_content += f"{i+1}. {concept}\n"
-            markdown_content += "\n"
+        if study_guide.get("important_concepts"):
+            buf.write("### Important Concepts\n\n")
+            buf.write("".join(f"{i+1}. {concept}\n" for i, concept in enumerate(study_guide["important_concepts"])))
+            buf.write("\n")
         
         # Flashcards
-        if study_guide and "flashcards" in study_guide and study_guide["flashcards"]:
-            markdown_content += "### Flashcards\n\n"
-            for i, card in enumerate(study_guide["flashcards"]):
-                if isinstance(card, dict) and "question" in card and "answer" in card:
-                    markdown_content += f"**Q{i+1}:** {card['question']}\n\n"
-                    markdown_content += f"**A{i+1}:** {card['answer']}\n\n"
+        flashcards = entries_with_keys(study_guide.get("flashcards") or [], "question", "answer")
+        if flashcards:
+            write_flashcards(buf, flashcards)
     
     # Add Quiz
-    markdown_content += "## ❓ Practice Quiz\n\n"
+    buf.write("## ❓ Practice Quiz\n\n")
     if "quiz" in results and results["quiz"] and isinstance(results["quiz"], dict):
         quiz = results["quiz"].get("quiz", [])
         if quiz and isinstance(quiz, list):
-            for i, question in enumerate(quiz):
-                if isinstance(question, dict) and "question" in question and "options" in question:
-                    markdown_content += f"**Question {i+1}:** {question['question']}\n\n"
-                    
-                    options = question.get("options", {})
-                    for opt, text in options.items():
-                        markdown_content += f"- {opt}: {text}\n"
-                    
-                    # Include correct answer
-                    if "correct_answer" in question:
-                        markdown_content += f"\n*Correct Answer: {question['correct_answer']}*\n\n"
+            write_quiz(buf, entries_with_keys(quiz, "question", "options"))
     
     # Add Topic Notes if available
     if "topic_notes" in results and results["topic_notes"] and isinstance(results["topic_notes"], dict):
         topic_notes = results["topic_notes"].get("notes", [])
         if topic_notes and isinstance(topic_notes, list):
-            markdown_content += "## 📘 Detailed Topic Notes\n\n"
-            for section in topic_notes:
-                if isinstance(section, dict) and "topic" in section:
-                    markdown_content += f"### {section['topic']}\n\n"
-                    
-                    if "definition" in section:
-                        markdown_content += f"**Definition:** {section['definition']}\n\n"
-                    
-                    if "key_points" in section and isinstance(section["key_points"], list):
-                        markdown_content += "**Key Points:**\n\n"
-                        for point in section["key_points"]:
-                            markdown_content += f"- {point}\n"
-                        markdown_content += "\n"
-                    
-                    if "examples" in section and isinstance(section["examples"], list):
-                        markdown_content += "**Examples:**\n\n"
-                        for example in section["examples"]:
-                            markdown_content += f"- {example}\n"
-                        markdown_content += "\n"
-                    
-                    if "diagrams" in section and isinstance(section["diagrams"], list):
-                        markdown_content += "**Diagrams:**\n\n"
-                        for diagram in section["diagrams"]:
-                            markdown_content += f"- {diagram}\n"
-                        markdown_content += "\n"
+            buf.write("## 📘 Detailed Topic Notes\n\n")
+            for section in entries_with_keys(topic_notes, "topic"):
+                buf.write(f"### {section['topic']}\n\n")
+                
+                if "definition" in section:
+                    buf.write(f"**Definition:** {section['definition']}\n\n")
+                
+                if "key_points" in section and isinstance(section["key_points"], list):
+                    buf.write("**Key Points:**\n\n")
+                    buf.write("".join(f"- {point}\n" for point in section["key_points"]))
+                    buf.write("\n")
+                
+                if "examples" in section and isinstance(section["examples"], list):
+                    buf.write("**Examples:**\n\n")
+                    buf.write("".join(f"- {example}\n" for example in section["examples"]))
+                    buf.write("\n")
+                
+                if "diagrams" in section and isinstance(section["diagrams"], list):
+                    buf.write("**Diagrams:**\n\n")
+                    buf.write("".join(f"- {diagram}\n" for diagram in section["diagrams"]))
+                    buf.write("\n")
     
-    return markdown_content
+    return buf.getvalue()
 
-def export_to_json(results, title="AI Study Assistant Results"):
+# The exports are cached on (results, title): reruns such as editing other widgets reuse
+# the built content, and the timestamps reflect when the export was first generated.
+# _now is left out of the cache key so sharing one timestamp doesn't defeat the cache.
+@st.cache_data(show_spinner=False, max_entries=16)
+def export_to_json(results, title="AI Study Assistant Results", _now=None):
     """
     Export study materials to JSON format.
     
     Args:
         results (dict): Dictionary containing study materials
         title (str): Title for the JSON file
+        _now (datetime, optional): Export time shared by all formats; defaults to the current time
         
     Returns:
-        dict: Dictionary with the JSON content, filename, and download link text
+        dict: Dictionary with the JSON content, filename, download button label and MIME type
     """
+    now = _now or datetime.now()
+    
     # Clean up the results dictionary to ensure it's serializable
     clean_results = {
         "title": title,
-        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "generated_at": now.strftime("%Y-%m-%d %H:%M:%S"),
         "data": results
     }
     
-    # Convert to JSON string with indentation for readability
-    json_str = json.dumps(clean_results, indent=2)
+    # Serialize straight to bytes with indentation for readability; the download
+    # button sends bytes as-is, so no str round-trip is needed
+    json_bytes = dumps_json_bytes(clean_results)
     
     # Generate filename
-    filename = f"study_materials_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    filename = f"study_materials_{now.strftime('%Y%m%d_%H%M%S')}.json"
     
     return {
-        "content": json_str,
+        "content": json_bytes,
         "filename": filename,
-        "download_text": "Download as JSON"
+        "download_text": "Download as JSON",
+        "mime": "application/json"
     }
 
-def export_to_markdown(results, title="AI Study Assistant Results"):
+@st.cache_data(show_spinner=False, max_entries=16)
+def export_to_markdown(results, title="AI Study Assistant Results", _now=None):
     """
     Export study materials to Markdown format.
     
     Args:
         results (dict): Dictionary containing study materials
         title (str): Title for the markdown file
+        _now (datetime, optional): Export time shared by all formats; defaults to the current time
         
     Returns:
-        dict: Dictionary with the markdown content, filename, and download link text
+        dict: Dictionary with the markdown content, filename, download button label and MIME type
     """
+    now = _now or datetime.now()
+    
     # Format the content as markdown
-    markdown_str = format_markdown_content(title, results)
+    markdown_str = format_markdown_content(title, results, now)
     
     # Generate filename
-    filename = f"study_materials_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+    filename = f"study_materials_{now.strftime('%Y%m%d_%H%M%S')}.md"
     
     return {
         "content": markdown_str,
         "filename": filename,
-        "download_text": "Download as Markdown"
+        "download_text": "Download as Markdown",
+        "mime": "text/markdown"
     }
 
-def export_to_text(results, title="AI Study Assistant Results"):
+@st.cache_data(show_spinner=False, max_entries=16)
+def export_to_text(results, title="AI Study Assistant Results", markdown_str=None, _now=None):
     """
     Export study materials to plain text format.
     
     Args:
         results (dict): Dictionary containing study materials
         title (str): Title for the text file
+        markdown_str (str, optional): Markdown already built for these results; built here if omitted
+        _now (datetime, optional): Export time shared by all formats; defaults to the current time
         
     Returns:
-        dict: Dictionary with the text content, filename, and download link text
+        dict: Dictionary with the text content, filename, download button label and MIME type
     """
+    now = _now or datetime.now()
+    
     # Use the markdown content but without formatting
-    markdown_str = format_markdown_content(title, results)
+    if markdown_str is None:
+        markdown_str = format_markdown_content(title, results, now)
     
     # Replace markdown formatting with plain text alternatives
     # This is a simple conversion - it won't handle all markdown syntax
     text_str = markdown_str
     text_str = text_str.replace("## ", "").replace("### ", "")
-    text_str = text_str.replace("**", "").replace("*", "")
+    # Dropping every "*" also removes the "**" bold markers
+    text_str = text_str.replace("*", "")
     text_str = text_str.replace("[", "").replace("](", " - ").replace(")", "")
     
     # Generate filename
-    filename = f"study_materials_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    filename = f"study_materials_{now.strftime('%Y%m%d_%H%M%S')}.txt"
     
     return {
         "content": text_str,
         "filename": filename,
-        "download_text": "Download as Text"
+        "download_text": "Download as Text",
+        "mime": "text/plain"
     }
 
 def create_export_section(results):
@@ -240,35 +269,24 @@ def create_export_section(results):
     # Ask the user for a title for their export
     title = st.text_input("Title for your study materials:", "AI Study Assistant Results")
     
-    # Create columns for the different export formats
-    col1, col2, col3 = st.columns(3)
+    # Only the selected format is generated on each rerun
+    export_format = st.radio("Export format:", ["Markdown", "JSON", "Text"], horizontal=True)
     
-    # Export as Markdown
-    with col1:
-        markdown_export = export_to_markdown(results, title)
-        markdown_link = get_download_link(
-            markdown_export["content"],
-            markdown_export["filename"],
-            markdown_export["download_text"]
-        )
-        st.markdown(markdown_link, unsafe_allow_html=True)
+    # Stamp the export with a single time for its header and filename
+    now = datetime.now()
     
-    # Export as JSON
-    with col2:
-        json_export = export_to_json(results, title)
-        json_link = get_download_link(
-            json_export["content"],
-            json_export["filename"],
-            json_export["download_text"]
-        )
-        st.markdown(json_link, unsafe_allow_html=True)
+    if export_format == "JSON":
+        export = export_to_json(results, title, _now=now)
+    elif export_format == "Text":
+        # Reuse the (cached) markdown export instead of formatting it again
+        markdown_export = export_to_markdown(results, title, _now=now)
+        export = export_to_text(results, title, markdown_export["content"], _now=now)
+    else:
+        export = export_to_markdown(results, title, _now=now)
     
-    # Export as Text
-    with col3:
-        text_export = export_to_text(results, title)
-        text_link = get_download_link(
-            text_export["content"],
-            text_export["filename"],
-            text_export["download_text"]
-        )
-        st.markdown(text_link, unsafe_allow_html=True)
\ No newline at end of file
+    st.download_button(
+        label=export["download_text"],
+        data=export["content"],
+        file_name=export["filename"],
+        mime=export["mime"]
+    )
@@ -1,23 +1,93 @@
+import atexit
+import io
+import json
 import os
+import shutil
+import subprocess
 import zipfile
 import tempfile
-import re
 import logging
-import nbformat
-from pptx import Presentation
-from docx import Document
-from PyPDF2 import PdfReader
-# Try to import moviepy with error handling
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from . import disk_cache
+# Locate ffmpeg for extracting audio from videos: the system binary if there is one,
+# otherwise the static build shipped with imageio-ffmpeg
+FFMPEG_PATH = shutil.which("ffmpeg")
+if FFMPEG_PATH is None:
+    try:
+        import imageio_ffmpeg
+        FFMPEG_PATH = imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        FFMPEG_PATH = None
+# The document parsers are imported where they're used, so loading this module
+# doesn't pay for parsers the uploaded files never need.
+# pypdfium2 is a much faster PDF text extractor than PyPDF2, used when installed
+HAS_PDFIUM = find_spec("pypdfium2") is not None
+# Try to import orjson for faster notebook parsing
 try:
-    import moviepy.editor
-    from moviepy.editor import VideoFileClip
-    HAS_MOVIEPY = True
+    import orjson
+    HAS_ORJSON = True
 except ImportError:
-    HAS_MOVIEPY = False
+    HAS_ORJSON = False
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Video formats, whose audio track is extracted for transcription
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv')
+
+# Chunk size used when streaming uploads to disk
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Directory holding this process's temporary video and audio files, removed at exit
+TEMP_DIR = tempfile.mkdtemp(prefix="study_assist_")
+atexit.register(shutil.rmtree, TEMP_DIR, ignore_errors=True)
+
+# Worker threads used to parse the files of a ZIP archive in parallel
+ZIP_WORKERS = min(8, os.cpu_count() or 1)
+# How many read-but-unparsed members may wait for a ZIP worker at once
+ZIP_READ_AHEAD = ZIP_WORKERS * 2
+
+# ZIP members with these extensions are parsed; anything else is never decompressed
+ZIP_MEMBER_EXTENSIONS = frozenset({'.txt', '.py', '.docx', '.pptx', '.pdf', '.ipynb'})
+# ZIP members larger than this (uncompressed) are skipped
+MAX_ZIP_MEMBER_BYTES = 200 * 1024 * 1024
+
+# WordprocessingML element names, as lxml reports them, used to read .docx text
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+WORD_BODY = WORD_NAMESPACE + "body"
+WORD_PARAGRAPH = WORD_NAMESPACE + "p"
+WORD_RUN = WORD_NAMESPACE + "r"
+WORD_HYPERLINK = WORD_NAMESPACE + "hyperlink"
+WORD_TEXT = WORD_NAMESPACE + "t"
+WORD_BREAK = WORD_NAMESPACE + "br"
+WORD_TYPE = WORD_NAMESPACE + "type"
+WORD_VAL = WORD_NAMESPACE + "val"
+WORD_TABLE = WORD_NAMESPACE + "tbl"
+WORD_TABLE_ROW = WORD_NAMESPACE + "tr"
+WORD_TABLE_CELL = WORD_NAMESPACE + "tc"
+WORD_GRID_BEFORE = WORD_NAMESPACE + "trPr/" + WORD_NAMESPACE + "gridBefore"
+WORD_GRID_SPAN = WORD_NAMESPACE + "tcPr/" + WORD_NAMESPACE + "gridSpan"
+WORD_VERTICAL_MERGE = WORD_NAMESPACE + "tcPr/" + WORD_NAMESPACE + "vMerge"
+
+# Text of the run children python-docx reads besides w:t and w:br; everything else
+# in a run (soft hyphens, deleted text, drawings, ...) contributes nothing
+WORD_RUN_CHARACTERS = {
+    WORD_NAMESPACE + "tab": "\t",
+    WORD_NAMESPACE + "ptab": "\t",
+    WORD_NAMESPACE + "cr": "\n",
+    WORD_NAMESPACE + "noBreakHyphen": "-",
+}
+
+# One lxml parser per thread for reading .docx XML, as lxml parsers can't be shared
+# between threads and ZIP archive members are parsed on several
+WORD_XML_PARSERS = threading.local()
+
+# PDFium isn't thread-safe, and ZIP archive members are parsed on several threads
+PDFIUM_LOCK = threading.Lock()
+
 def process_file(file, file_type=None):
     """
     Process a file based on its type and extract text content.
@@ -39,28 +109,105 @@ def process_file(file, file_type=None):
         
         logger.info(f"Processing file: {file_name} with extension: {extension}")
         
-        # Handle different file types
-        if extension == '.zip':
-            return process_zip_file(file)
-        elif extension == '.pptx':
-            return process_pptx_file(file)
-        elif extension == '.docx':
-            return process_docx_file(file)
-        elif extension == '.pdf':
-            return process_pdf_file(file)
-        elif extension in ['.py', '.txt']:
-            return process_text_file(file)
-        elif extension == '.ipynb':
-            return process_jupyter_notebook(file)
-        elif extension in ['.mp4', '.mov', '.avi', '.mkv']:
-            return process_video_file(file)
-        else:
-            return {"success": False, "error": f"Unsupported file type: {extension}"}
+        # Parsed text is cached on disk by content, so re-uploading a file skips parsing.
+        # Videos are left out since their result holds the extracted audio, not text.
+        cache_key = None
+        if extension not in VIDEO_EXTENSIONS:
+            cache_key = disk_cache.content_key(extension, file.getvalue())
+            cached_result = disk_cache.load("parsed_files", cache_key)
+            if cached_result:
+                logger.info(f"Using cached text for {file_name}")
+                return cached_result
+        
+        result = parse_file(file, extension)
+        if cache_key and result.get("success"):
+            disk_cache.store("parsed_files", cache_key, result)
+        return result
     
     except Exception as e:
         logger.exception(f"Error processing file: {str(e)}")
         return {"success": False, "error": f"Error processing file: {str(e)}"}
 
+def parse_file(file, extension):
+    """
+    Extract content from a file with the handler for its extension.
+    
+    Args:
+        file: The file object
+        extension: The lowercased file extension, including the dot
+        
+    Returns:
+        dict: Dictionary with success status and extracted content or error message
+    """
+    # Look up the handler for this file type
+    handler = FILE_HANDLERS.get(extension)
+    if handler is None:
+        return {"success": False, "error": f"Unsupported file type: {extension}"}
+    return handler(file)
+
+def parse_zip_member(file_name, extension, data):
+    """
+    Parse one file read from a ZIP archive.
+    
+    Args:
+        file_name: The member's name inside the archive
+        extension: The member's lowercased file extension
+        data: The member's decompressed bytes
+        
+    Returns:
+        str: The member's text with its section header, or None if it was skipped or failed
+    """
+    # Process based on file type
+    if extension in ['.txt', '.py']:
+        file_content = data.decode('utf-8', errors='ignore')
+        return f"\n\n# FILE: {file_name}\n{file_content}"
+    
+    elif extension == '.docx':
+        try:
+            file_content = '\n'.join(read_docx_lines(io.BytesIO(data), include_tables=False))
+            return f"\n\n# DOCUMENT: {file_name}\n{file_content}"
+        except Exception as e:
+            logger.warning(f"Error processing DOCX file {file_name}: {str(e)}")
+    
+    elif extension == '.pptx':
+        try:
+            from pptx import Presentation
+            prs = Presentation(io.BytesIO(data))
+            file_content = '\n'.join([shape.text for slide in prs.slides 
+                                for shape in slide.shapes if hasattr(shape, "text")])
+            return f"\n\n# PRESENTATION: {file_name}\n{file_content}"
+        except Exception as e:
+            logger.warning(f"Error processing PPTX file {file_name}: {str(e)}")
+    
+    elif extension == '.pdf':
+        try:
+            if HAS_PDFIUM:
+                page_texts = extract_pdfium_page_texts(data)
+            else:
+                from PyPDF2 import PdfReader
+                reader = PdfReader(io.BytesIO(data))
+                page_texts = [page.extract_text() for page in reader.pages]
+            file_content = "".join(page_text + "\n" for page_text in page_texts)
+            return f"\n\n# PDF: {file_name}\n{file_content}"
+        except Exception as e:
+            logger.warning(f"Error processing PDF file {file_name}: {str(e)}")
+    
+    elif extension == '.ipynb':
+        try:
+            parts = []
+            for cell in load_notebook_cells(data):
+                if cell.get("cell_type") == 'markdown':
+                    parts.append(f"# Markdown\n{notebook_text(cell.get('source', ''))}\n\n")
+                elif cell.get("cell_type") == 'code':
+                    parts.append(f"# Code\n{notebook_text(cell.get('source', ''))}\n\n")
+            file_content = "".join(parts)
+            
+            return f"\n\n# JUPYTER NOTEBOOK: {file_name}\n{file_content}"
+        except Exception as e:
+            logger.warning(f"Error processing Jupyter notebook {file_name}: {str(e)}")
+    
+    return None
+
 def process_zip_file(zip_file):
     """
     Process a ZIP file containing multiple study materials.
@@ -72,92 +219,60 @@ def process_zip_file(zip_file):
         dict: Dictionary with success status and extracted content or error message
     """
     try:
-        # Create a temporary directory
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Write the zip file to the temporary directory
-            zip_path = os.path.join(temp_dir, 'archive.zip')
-            with open(zip_path, 'wb') as f:
-                f.write(zip_file.getvalue())
+        # Members are read into memory on this thread (ZipFile isn't thread-safe) and
+        # parsed in parallel, since each file parses independently. Reading only runs
+        # ZIP_READ_AHEAD members ahead of the workers, so decompression overlaps parsing
+        # without holding the whole decompressed archive in memory at once
+        read_ahead = threading.BoundedSemaphore(ZIP_READ_AHEAD)
+        # The upload is already an in-memory buffer, so the archive is opened from it
+        # directly rather than through a temporary copy on disk
+        with zipfile.ZipFile(zip_file, 'r') as zip_ref, ThreadPoolExecutor(max_workers=ZIP_WORKERS) as executor:
+            members = []
             
-            # Extract the contents
-            combined_text = ""
-            file_count = 0
-            
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                # Get list of files
-                files = zip_ref.namelist()
+            # Pick out the files to process
+            for zip_info in zip_ref.infolist():
+                file_name = zip_info.filename
+                
+                # Skip directories, hidden files and macOS resource forks
+                if (zip_info.is_dir() or os.path.basename(file_name).startswith('.')
+                        or file_name.startswith('__MACOSX/') or '/__MACOSX/' in file_name):
+                    continue
                 
-                # Process each file
-                for file_name in files:
-                    # Skip directories and hidden files
-                    if file_name.endswith('/') or file_name.startswith('.'):
-                        continue
-                    
-                    # Get file extension
-                    extension = os.path.splitext(file_name)[1].lower()
-                    
-                    # Extract file to temp directory
-                    zip_ref.extract(file_name, temp_dir)
-                    extracted_path = os.path.join(temp_dir, file_name)
-                    
-                    # Process based on file type
-                    if extension in ['.txt', '.py']:
-                        with open(extracted_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            file_content = f.read()
-                            combined_text += f"\n\n# FILE: {file_name}\n{file_content}"
-                            file_count += 1
-                    
-                    elif extension == '.docx':
-                        try:
-                            doc = Document(extracted_path)
-                            file_content = '\n'.join([para.text for para in doc.paragraphs])
-                            combined_text += f"\n\n# DOCUMENT: {file_name}\n{file_content}"
-                            file_count += 1
-                        except Exception as e:
-                            logger.warning(f"Error processing DOCX file {file_name}: {str(e)}")
-                    
-                    elif extension == '.pptx':
-                        try:
-                            prs = Presentation(extracted_path)
-                            file_content = '\n'.join([shape.text for slide in prs.slides 
-                                                for shape in slide.shapes if hasattr(shape, "text")])
-                            combined_text += f"\n\n# PRESENTATION: {file_name}\n{file_content}"
-                            file_count += 1
-                        except Exception as e:
-                            logger.warning(f"Error processing PPTX file {file_name}: {str(e)}")
-                    
-                    elif extension == '.pdf':
-                        try:
-                            reader = PdfReader(extracted_path)
-                            file_content = ""
-                            for page in reader.pages:
-                                file_content += page.extract_text() + "\n"
-                            combined_text += f"\n\n# PDF: {file_name}\n{file_content}"
-                            file_count += 1
-                        except Exception as e:
-                            logger.warning(f"Error processing PDF file {file_name}: {str(e)}")
-                    
-                    elif extension == '.ipynb':
-                        try:
-                            with open(extracted_path, 'r', encoding='utf-8') as f:
-                                nb = nbformat.read(f, as_version=4)
-                            
-                            file_content = ""
-                            for cell in nb.cells:
-                                if cell.cell_type == 'markdown':
-                                    file_content += f"# Markdown\n{cell.source}\n\n"
-                                elif cell.cell_type == 'code':
-                                    file_content += f"# Code\n{cell.source}\n\n"
-                            
-                            combined_text += f"\n\n# JUPYTER NOTEBOOK: {file_name}\n{file_content}"
-                            file_count += 1
-                        except Exception as e:
-                            logger.warning(f"Error processing Jupyter notebook {file_name}: {str(e)}")
+                # Get file extension, skipping unsupported files before anything is decompressed
+                extension = os.path.splitext(file_name)[1].lower()
+                if extension not in ZIP_MEMBER_EXTENSIONS:
+                    continue
+                
+                if zip_info.file_size > MAX_ZIP_MEMBER_BYTES:
+                    logger.warning(f"Skipping {file_name} in ZIP archive: {zip_info.file_size} bytes exceeds the size limit")
+                    continue
+                
+                members.append((zip_info, extension))
             
-            if file_count == 0:
-                return {"success": False, "error": "No valid files found in the ZIP archive"}
+            # Submit the largest files first, so a big file isn't left parsing on
+            # one worker after the others have run out of work
+            futures = [None] * len(members)
+            for index in sorted(range(len(members)), key=lambda i: members[i][0].file_size, reverse=True):
+                zip_info, extension = members[index]
+                
+                # Read the decompressed member straight from the archive
+                read_ahead.acquire()
+                try:
+                    data = zip_ref.read(zip_info)
+                    future = executor.submit(parse_zip_member, zip_info.filename, extension, data)
+                except BaseException:
+                    read_ahead.release()
+                    raise
+                future.add_done_callback(lambda _: read_ahead.release())
+                futures[index] = future
             
-            return {"success": True, "text": combined_text, "file_count": file_count}
+            # Collect in archive order so the combined text is deterministic
+            sections = [section for section in (future.result() for future in futures) if section is not None]
+        
+        if not sections:
+            return {"success": False, "error": "No valid files found in the ZIP archive"}
+        
+        return {"success": True, "text": "".join(sections), "file_count": len(sections)}
     
     except Exception as e:
         logger.exception(f"Error processing ZIP file: {str(e)}")
@@ -174,29 +289,23 @@ def process_pptx_file(pptx_file):
         dict: Dictionary with success status and extracted text or error message
     """
     try:
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(suffix='.pptx', delete=False) as temp_file:
-            temp_file.write(pptx_file.getvalue())
-            temp_path = temp_file.name
-        
-        # Extract text from the presentation
-        prs = Presentation(temp_path)
+        # Extract text from the presentation (the parsers read seekable file objects directly)
+        from pptx import Presentation
+        prs = Presentation(pptx_file)
         
-        # Get text from slides
-        text_content = ""
+        # Get text from slides, collecting the pieces and joining once
+        parts = []
         for i, slide in enumerate(prs.slides):
-            text_content += f"Slide {i+1}:\n"
+            parts.append(f"Slide {i+1}:\n")
             
             for shape in slide.shapes:
                 if hasattr(shape, "text"):
-                    text_content += f"{shape.text}\n"
+                    parts.append(f"{shape.text}\n")
             
-            text_content += "\n"
+            parts.append("\n")
+        text_content = "".join(parts)
         
-        # Delete the temporary file
-        os.unlink(temp_path)
-        
-        if not text_content.strip():
+        if not text_content or text_content.isspace():
             return {"success": False, "error": "No text content found in the presentation"}
             
         return {"success": True, "text": text_content}
@@ -205,6 +314,99 @@ def process_pptx_file(pptx_file):
         logger.exception(f"Error processing PowerPoint file: {str(e)}")
         return {"success": False, "error": f"Error processing PowerPoint file: {str(e)}"}
 
+def word_run_text(run, pieces):
+    """Append the text of a w:r element to pieces, as python-docx's Run.text reads it."""
+    for element in run:
+        if element.tag == WORD_TEXT:
+            pieces.append(element.text or "")
+        elif element.tag == WORD_BREAK:
+            # Only line breaks are text; page and column breaks are dropped
+            if element.get(WORD_TYPE, "textWrapping") == "textWrapping":
+                pieces.append("\n")
+        else:
+            pieces.append(WORD_RUN_CHARACTERS.get(element.tag, ""))
+
+def word_paragraph_text(paragraph):
+    """
+    Return the text of a w:p element as python-docx's Paragraph.text builds it.
+    
+    Only the paragraph's own runs and those directly inside its hyperlinks are read,
+    so runs nested in text boxes or tracked insertions (w:ins) are left out.
+    """
+    pieces = []
+    for child in paragraph:
+        if child.tag == WORD_RUN:
+            word_run_text(child, pieces)
+        elif child.tag == WORD_HYPERLINK:
+            for run in child.iterfind(WORD_RUN):
+                word_run_text(run, pieces)
+    return "".join(pieces)
+
+def word_table_rows(table):
+    """
+    Yield the cell texts of each w:tr in a w:tbl, as python-docx's _Row.cells gives them.
+    
+    A cell spanning several grid columns is repeated once per column, and a cell
+    continuing a vertical merge repeats the text of the cell above it.
+    """
+    above = {}
+    for row in table.iterfind(WORD_TABLE_ROW):
+        grid_before = row.find(WORD_GRID_BEFORE)
+        offset = 0 if grid_before is None else int(grid_before.get(WORD_VAL, 0))
+        cells = []
+        for cell in row.iterfind(WORD_TABLE_CELL):
+            grid_span = cell.find(WORD_GRID_SPAN)
+            span = 1 if grid_span is None else int(grid_span.get(WORD_VAL, 1))
+            vertical_merge = cell.find(WORD_VERTICAL_MERGE)
+            if vertical_merge is not None and vertical_merge.get(WORD_VAL, "continue") == "continue":
+                text = above.get(offset, "")
+            else:
+                text = '\n'.join(word_paragraph_text(paragraph) for paragraph in cell.iterfind(WORD_PARAGRAPH))
+            above[offset] = text
+            cells.extend([text] * span)
+            offset += span
+        yield cells
+
+def word_xml_parser():
+    """Return this thread's lxml parser for WordprocessingML, creating it on first use."""
+    parser = getattr(WORD_XML_PARSERS, "parser", None)
+    if parser is None:
+        # lxml is installed with python-docx
+        from lxml import etree
+        parser = WORD_XML_PARSERS.parser = etree.XMLParser(resolve_entities=False)
+    return parser
+
+def read_docx_lines(docx_file, include_tables=True):
+    """
+    Extract the text of a Word document by parsing its word/document.xml with lxml.
+    
+    This skips building python-docx's Paragraph, Run, Table and Cell objects,
+    which dominates extraction time on long documents.
+    
+    Args:
+        docx_file: The DOCX file object or path
+        include_tables: Whether to add one " | "-separated line per table row
+        
+    Returns:
+        list: The body paragraphs' text, followed by the table rows
+    """
+    from lxml import etree
+    
+    with zipfile.ZipFile(docx_file) as docx_zip:
+        document_xml = docx_zip.read("word/document.xml")
+    body = etree.fromstring(document_xml, word_xml_parser()).find(WORD_BODY)
+    
+    # Get text from paragraphs
+    lines = [word_paragraph_text(paragraph) for paragraph in body.iterfind(WORD_PARAGRAPH)]
+    
+    # Get text from tables
+    if include_tables:
+        for table in body.iterfind(WORD_TABLE):
+            for cells in word_table_rows(table):
+                lines.append(' | '.join(cells))
+    
+    return lines
+
 def process_docx_file(docx_file):
     """
     Extract text from a Word document.
@@ -216,28 +418,10 @@ def process_docx_file(docx_file):
         dict: Dictionary with success status and extracted text or error message
     """
     try:
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_file:
-            temp_file.write(docx_file.getvalue())
-            temp_path = temp_file.name
-        
-        # Extract text from the document
-        doc = Document(temp_path)
-        
-        # Get text from paragraphs
-        paragraphs = [para.text for para in doc.paragraphs]
-        text_content = '\n'.join(paragraphs)
-        
-        # Get text from tables
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = ' | '.join(cell.text for cell in row.cells)
-                text_content += f"\n{row_text}"
+        # Extract text from the document's paragraphs and tables
+        text_content = '\n'.join(read_docx_lines(docx_file))
         
-        # Delete the temporary file
-        os.unlink(temp_path)
-        
-        if not text_content.strip():
+        if not text_content or text_content.isspace():
             return {"success": False, "error": "No text content found in the document"}
             
         return {"success": True, "text": text_content}
@@ -246,6 +430,33 @@ def process_docx_file(docx_file):
         logger.exception(f"Error processing Word file: {str(e)}")
         return {"success": False, "error": f"Error processing Word file: {str(e)}"}
 
+def extract_pdfium_page_texts(pdf_bytes):
+    """
+    Extract the text of the pages of a PDF with PDFium.
+    
+    Args:
+        pdf_bytes: The PDF file content
+        
+    Returns:
+        list: The text of each page, in page order
+    """
+    import pypdfium2 as pdfium
+    
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        try:
+            page_texts = []
+            for page_index in range(len(pdf)):
+                page = pdf[page_index]
+                textpage = page.get_textpage()
+                # PDFium separates lines with \r\n
+                page_texts.append(textpage.get_text_range().replace("\r\n", "\n"))
+                textpage.close()
+                page.close()
+            return page_texts
+        finally:
+            pdf.close()
+
 def process_pdf_file(pdf_file):
     """
     Extract text from a PDF document.
@@ -257,25 +468,24 @@ def process_pdf_file(pdf_file):
         dict: Dictionary with success status and extracted text or error message
     """
     try:
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            temp_file.write(pdf_file.getvalue())
-            temp_path = temp_file.name
-        
-        # Extract text from the PDF
-        reader = PdfReader(temp_path)
-        
-        # Get text from pages
-        text_content = ""
-        for i, page in enumerate(reader.pages):
-            page_text = page.extract_text()
-            if page_text:
-                text_content += f"Page {i+1}:\n{page_text}\n\n"
+        # Extract text from the PDF, preferring PDFium when it is installed
+        if HAS_PDFIUM:
+            page_texts = extract_pdfium_page_texts(pdf_file.getvalue())
+        else:
+            from PyPDF2 import PdfReader
+            reader = PdfReader(pdf_file)
+            
+            # Get text from pages
+            page_texts = [page.extract_text() for page in reader.pages]
         
-        # Delete the temporary file
-        os.unlink(temp_path)
+        # Collect the pieces and join once
+        parts = []
+        for i, page_text in enumerate(page_texts):
+            if page_text:
+                parts.append(f"Page {i+1}:\n{page_text}\n\n")
+        text_content = "".join(parts)
         
-        if not text_content.strip():
+        if not text_content or text_content.isspace():
             return {"success": False, "error": "No text content found in the PDF"}
             
         return {"success": True, "text": text_content}
@@ -298,7 +508,7 @@ def process_text_file(text_file):
         # Read the text file
         text_content = text_file.getvalue().decode('utf-8')
         
-        if not text_content.strip():
+        if not text_content or text_content.isspace():
             return {"success": False, "error": "Empty text file"}
             
         return {"success": True, "text": text_content}
@@ -307,40 +517,67 @@ def process_text_file(text_file):
         logger.exception(f"Error processing text file: {str(e)}")
         return {"success": False, "error": f"Error processing text file: {str(e)}"}
 
-def process_jupyter_notebook(ipynb_file):
+def notebook_text(value):
+    """Return a notebook text field, which the .ipynb JSON may store as a list of lines."""
+    return "".join(value) if isinstance(value, list) else value
+
+def load_notebook_cells(notebook_content):
+    """
+    Parse a notebook's JSON and return its cells.
+    
+    Args:
+        notebook_content: The .ipynb file content, as bytes or str
+        
+    Returns:
+        list: The cells, as dicts
+    """
+    # Reading the JSON directly skips nbformat's schema validation, which costs
+    # far more than the parse itself
+    nb = orjson.loads(notebook_content) if HAS_ORJSON else json.loads(notebook_content)
+    
+    if "cells" not in nb:
+        # Notebooks older than format 4 keep their cells in worksheets; let nbformat upgrade them
+        import nbformat
+        if isinstance(notebook_content, bytes):
+            notebook_content = notebook_content.decode('utf-8')
+        nb = nbformat.reads(notebook_content, as_version=4)
+    
+    return nb["cells"]
+
+def process_jupyter_notebook(ipynb_file, include_outputs=False):
     """
     Extract code and markdown content from a Jupyter notebook.
     
     Args:
         ipynb_file: The iPython notebook file object
+        include_outputs: Whether to include the text of stream and execute_result outputs
         
     Returns:
         dict: Dictionary with success status and extracted text or error message
     """
     try:
-        # Read the notebook content
-        notebook_content = ipynb_file.getvalue().decode('utf-8')
-        
-        # Parse the notebook
-        nb = nbformat.reads(notebook_content, as_version=4)
-        
-        # Extract text from cells
-        text_content = ""
-        for i, cell in enumerate(nb.cells):
-            if cell.cell_type == 'markdown':
-                text_content += f"Cell {i+1} (Markdown):\n{cell.source}\n\n"
-            elif cell.cell_type == 'code':
-                text_content += f"Cell {i+1} (Code):\n{cell.source}\n\n"
-                # Include outputs if available
-                if hasattr(cell, 'outputs') and cell.outputs:
-                    for output in cell.outputs:
-                        if output.output_type == 'stream' and 'text' in output:
-                            text_content += f"Output:\n{output.text}\n"
-                        elif output.output_type == 'execute_result' and 'data' in output:
-                            if 'text/plain' in output.data:
-                                text_content += f"Result:\n{output.data['text/plain']}\n"
-        
-        if not text_content.strip():
+        # Read and parse the notebook content
+        cells = load_notebook_cells(ipynb_file.getvalue())
+        
+        # Extract text from cells, collecting the pieces and joining once
+        parts = []
+        for i, cell in enumerate(cells):
+            cell_type = cell.get("cell_type")
+            if cell_type == 'markdown':
+                parts.append(f"Cell {i+1} (Markdown):\n{notebook_text(cell.get('source', ''))}\n\n")
+            elif cell_type == 'code':
+                parts.append(f"Cell {i+1} (Code):\n{notebook_text(cell.get('source', ''))}\n\n")
+                # Outputs are mostly rich data such as images, so they're only read on request
+                if include_outputs:
+                    for output in cell.get("outputs") or []:
+                        if output.get("output_type") == 'stream' and 'text' in output:
+                            parts.append(f"Output:\n{notebook_text(output['text'])}\n")
+                        elif output.get("output_type") == 'execute_result' and 'data' in output:
+                            if 'text/plain' in output['data']:
+                                parts.append(f"Result:\n{notebook_text(output['data']['text/plain'])}\n")
+        text_content = "".join(parts)
+        
+        if not text_content or text_content.isspace():
             return {"success": False, "error": "No content found in the Jupyter notebook"}
             
         return {"success": True, "text": text_content}
@@ -349,6 +586,40 @@ def process_jupyter_notebook(ipynb_file):
         logger.exception(f"Error processing Jupyter notebook: {str(e)}")
         return {"success": False, "error": f"Error processing Jupyter notebook: {str(e)}"}
 
+def run_ffmpeg_audio_extraction(video_path, audio_path, codec_args):
+    """
+    Write the first audio track of a video to audio_path with ffmpeg.
+    
+    Args:
+        video_path: Path of the source video
+        audio_path: Path of the audio file to write
+        codec_args: ffmpeg arguments choosing how the audio is encoded
+        
+    Returns:
+        subprocess.CompletedProcess: The finished ffmpeg run, with its stderr as text
+    """
+    # Map only the first audio track and pass -vn, so ffmpeg never decodes the video frames
+    return subprocess.run(
+        [FFMPEG_PATH, "-y", "-loglevel", "error", "-i", video_path, "-map", "0:a:0", "-vn", *codec_args, audio_path],
+        capture_output=True,
+        text=True
+    )
+
+def remove_temp_file(path):
+    """Delete a temporary file, ignoring it if it's already gone."""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+class TempAudioFile(io.BufferedReader):
+    """A read-only temporary file that deletes itself when closed (or garbage collected)."""
+    
+    def close(self):
+        path = self.name
+        super().close()
+        remove_temp_file(path)
+
 def process_video_file(video_file):
     """
     Extract audio from a video file and prepare it for transcription.
@@ -359,59 +630,72 @@ def process_video_file(video_file):
     Returns:
         dict: Dictionary with success status and the audio file object for transcription
     """
-    # Check if moviepy is available
-    if not HAS_MOVIEPY:
+    # Check if ffmpeg is available
+    if FFMPEG_PATH is None:
         return {
             "success": False, 
-            "error": "Video processing is not available. The moviepy module is not installed correctly."
+            "error": "Video processing is not available. ffmpeg could not be found."
         }
     
+    video_path = None
+    audio_path = None
     try:
-        # Create a temporary file for the video
-        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_video_file:
-            temp_video_file.write(video_file.getvalue())
-            video_path = temp_video_file.name
-        
-        # Create a temporary file for the extracted audio
-        audio_path = video_path + ".mp3"
-        
-        # Extract audio from video
+        # Stream the video into a temporary file in chunks, rather than copying
+        # the whole upload into memory with getvalue() first
+        video_path = os.path.join(TEMP_DIR, uuid.uuid4().hex + ".mp4")
+        with open(video_path, 'wb') as temp_video_file:
+            video_file.seek(0)
+            shutil.copyfileobj(video_file, temp_video_file, COPY_CHUNK_SIZE)
+        
+        # Copy the audio track as-is into a Matroska audio file, which holds almost any
+        # codec and which faster-whisper decodes directly, so nothing is re-encoded
+        audio_path = video_path + ".mka"
         logger.info(f"Extracting audio from video to {audio_path}")
-        
-        # Since we checked HAS_MOVIEPY at the beginning, we know VideoFileClip is available
-        video = VideoFileClip(video_path)
-        
-        # Check if audio track exists
-        if video.audio is None:
-            # Clean up temporary file
-            os.unlink(video_path)
-            video.close()
-            return {"success": False, "error": "No audio track found in the video file"}
-        
-        video.audio.write_audiofile(audio_path, logger=None)
-        
-        # Close the video file to release resources
-        video.close()
-        
-        # Read the audio file
-        with open(audio_path, 'rb') as audio_file:
-            audio_data = audio_file.read()
-        
-        # Clean up temporary files
-        os.unlink(video_path)
-        os.unlink(audio_path)
-        
-        # Create a file-like object for the audio data
-        import io
-        audio_bytes = io.BytesIO(audio_data)
-        audio_bytes.name = "extracted_audio.mp3"
+        completed = run_ffmpeg_audio_extraction(video_path, audio_path, ["-acodec", "copy"])
+        
+        if completed.returncode != 0 and "matches no streams" not in completed.stderr:
+            # Fall back to re-encoding as MP3 if the track can't be stream-copied
+            logger.info(f"Audio stream copy failed, re-encoding as MP3: {completed.stderr.strip()}")
+            if os.path.exists(audio_path):
+                os.unlink(audio_path)
+            audio_path = video_path + ".mp3"
+            completed = run_ffmpeg_audio_extraction(video_path, audio_path, ["-acodec", "libmp3lame", "-q:a", "4"])
+        
+        if completed.returncode != 0:
+            # Check if audio track exists
+            if "matches no streams" in completed.stderr:
+                return {"success": False, "error": "No audio track found in the video file"}
+            return {"success": False, "error": f"Error extracting audio from video: {completed.stderr.strip()}"}
+        
+        # Hand back the extracted audio as an open file rather than reading it into memory;
+        # the temporary file is removed when the caller closes it
+        audio_handle = TempAudioFile(io.FileIO(audio_path, 'rb'))
+        audio_path = None
         
         return {
             "success": True, 
-            "audio_file": audio_bytes, 
+            "audio_file": audio_handle, 
             "message": "Audio extracted from video file for transcription"
         }
     
     except Exception as e:
         logger.exception(f"Error processing video file: {str(e)}")
-        return {"success": False, "error": f"Error processing video file: {str(e)}"}
\ No newline at end of file
+        return {"success": False, "error": f"Error processing video file: {str(e)}"}
+    
+    finally:
+        # Clean up temporary files
+        for path in (video_path, audio_path):
+            if path and os.path.exists(path):
+                os.unlink(path)
+
+# Handlers for each supported upload type, keyed by lowercased extension
+FILE_HANDLERS = {
+    '.zip': process_zip_file,
+    '.pptx': process_pptx_file,
+    '.docx': process_docx_file,
+    '.pdf': process_pdf_file,
+    '.py': process_text_file,
+    '.txt': process_text_file,
+    '.ipynb': process_jupyter_notebook,
+    **dict.fromkeys(VIDEO_EXTENSIONS, process_video_file),
+}
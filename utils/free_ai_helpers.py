@@ -1,14 +1,68 @@
 import os
 import json
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 import random
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from . import disk_cache
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Regular expressions used to parse model responses and build fallbacks, compiled once at import
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+TOPIC_PHRASE_RE = re.compile(r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})')
+KEY_TERM_RE = re.compile(r'\b([A-Z][a-z]{3,})\b')
+JSON_BLOCK_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```')
+RESOURCE_LINE_RE = re.compile(r'- Title: "?(.*?)"?,\s*Type: "?(.*?)"?,\s*Description: "?(.*?)"?,\s*URL: "?(https?://[^"\s]+)')
+MARKDOWN_HEADING_RE = re.compile(r'(?m)^#+\s+(.+?)$')
+BOLD_TEXT_RE = re.compile(r'\*\*(.+?)\*\*')
+EXAMPLE_RE = re.compile(r'(?:Example|For example|For instance|e\.g\.)[:\s]+(.*?)(?=(?:\n\n)|$)', re.IGNORECASE | re.DOTALL)
+DIAGRAM_RE = re.compile(r'(?:Diagram|Figure|Visual|Image|Picture|Illustration|Graph|Chart)[:\s]+(.*?)(?=(?:\n\n)|$)', re.IGNORECASE | re.DOTALL)
+EXTRA_NEWLINES_RE = re.compile(r'\n{3,}')
+SLIDE_TOPIC_RE = re.compile(r'Slide \d+:?\s*([^0-9\n]+?)(?:\d|$)')
+SLIDE_HEADER_RE = re.compile(r'Slide \d+:\s*([^\n]+)')
+CAPITALIZED_TERM_RE = re.compile(r'\b([A-Z][a-z]{3,}(?:\s+[A-Z]?[a-z]+){0,2})\b')
+LONG_CAPITALIZED_WORD_RE = re.compile(r'\b[A-Z][a-z]{5,}\b')
+DEFINITION_SPLIT_RE = re.compile(r' is | refers to | means ')
+
+# Study guide sections, and the alternative entry formats tried within each, in order
+TERMS_SECTION_RE = re.compile(r'(?:KEY TERMS?|Key Terms?|TERMS?|Terms?|DEFINITIONS?|Definitions?)(?::|;|\n)(.*?)(?:(?:IMPORTANT CONCEPTS|Important Concepts|CONCEPTS|Concepts|FLASHCARDS|Flashcards)|$)', re.DOTALL | re.IGNORECASE)
+TERM_DEFINITION_RES = (
+    re.compile(r'[\d\*\-\•]*\s*([^:]+)[:]\s*(.*?)(?=(?:[\d\*\-\•])|$)', re.DOTALL),  # Standard pattern
+    re.compile(r'[\d\*\-\•]+\s*([^:]+)[:]\s*(.*?)(?=(?:[\d\*\-\•]+)|$)', re.DOTALL),  # Numbered items
+    re.compile(r'([^:]+)[:]\s*(.*?)(?=\n\n|\n[A-Z]|\Z)', re.DOTALL),                 # Simple term: definition
+    re.compile(r'([^:]+)[:]\s*(.*?)(?=\n\s*[^:]+:|\Z)', re.DOTALL)                   # Term: definition until next term
+)
+DIRECT_TERM_RE = re.compile(r'([A-Z][a-zA-Z\s]{2,20}):\s*((?:[^\n]+\n?){1,3})')
+CONCEPTS_SECTION_RES = (
+    re.compile(r'(?:IMPORTANT CONCEPTS|Important Concepts|CONCEPTS|Concepts)(?::|;|\n)(.*?)(?:(?:FLASHCARDS|Flashcards)|$)', re.DOTALL | re.IGNORECASE),
+    re.compile(r'(?:KEY CONCEPTS|Key Concepts)(?::|;|\n)(.*?)(?:(?:FLASHCARDS|Flashcards)|$)', re.DOTALL | re.IGNORECASE)
+)
+CONCEPT_ENTRY_RES = (
+    re.compile(r'[\d\*\-\•]+\s*(.*?)(?=(?:[\d\*\-\•]+)|$)', re.DOTALL),  # Bulleted or numbered
+    re.compile(r'(?:^|\n)\s*((?:[^\n]+\n?){1,3})', re.DOTALL)            # Any paragraph-like chunk
+)
+FLASHCARDS_SECTION_RES = (
+    re.compile(r'(?:FLASHCARDS|Flashcards)(?::|;|\n)(.*?)$', re.DOTALL | re.IGNORECASE),
+    re.compile(r'(?:STUDY CARDS|Study Cards|QUESTION|QUESTIONS)(?::|;|\n)(.*?)$', re.DOTALL | re.IGNORECASE)
+)
+FLASHCARD_ENTRY_RES = (
+    re.compile(r'[\d\*\-\•]*\s*(?:Q:|Question:)?\s*([^?]*\?)\s*(?:A:|Answer:)?\s*(.*?)(?=(?:[\d\*\-\•](?:\s*(?:Q:|Question:)))|$)', re.DOTALL | re.IGNORECASE),
+    re.compile(r'(?:Q:|Question:)\s*([^?]*\?)\s*(?:A:|Answer:)\s*(.*?)(?=(?:Q:|Question:)|$)', re.DOTALL | re.IGNORECASE),
+    re.compile(r'(\d+\.\s*[^?]*\?)\s*(.*?)(?=\d+\.\s*|$)', re.DOTALL | re.IGNORECASE)
+)
+
+# Quiz question parts
+QUESTION_SPLIT_RE = re.compile(r'\d+\.\s+')
+FIRST_LINE_RE = re.compile(r'([^\n]+)')
+OPTION_RE = re.compile(r'([A-D])(?:\.|\))\s+([^\n]+)')
+CORRECT_ANSWER_RE = re.compile(r'(?:Answer|Correct(?:\s+Answer)?|The correct answer is)[^A-D]*([A-D])', re.IGNORECASE)
+EXPLANATION_RE = re.compile(r'(?:Explanation|Reason)[^\n]*:\s*([^\n]+)', re.IGNORECASE)
+
 def get_reliable_url(topic, resource_type="Article"):
     """
     Generate a reliable URL for a given topic and resource type.
@@ -68,6 +122,23 @@ FREE_ENDPOINTS = [
 # Define the preferred endpoint (Llama 4 Maverick)
 PREFERRED_ENDPOINT = "https://api-inference.huggingface.co/models/meta-llama/Meta-Llama-4-Maverick"
 
+# Endpoint tried as a last resort when the randomly chosen endpoints fail
+LAST_CHANCE_ENDPOINT = "https://api-inference.huggingface.co/models/google/flan-t5-xxl"
+
+# How long a cached API response is reused for identical requests, in seconds
+API_CACHE_TTL = 24 * 60 * 60
+
+# Seconds to wait for the primary request before hedging with the last-chance endpoint
+FALLBACK_HEDGE_DELAY = 15
+
+# Shared HTTP session, so every request to the (single) inference host reuses a pooled
+# keep-alive connection instead of repeating the TCP and TLS handshakes.
+# Retries are handled in make_api_request, so the adapter doesn't retry on its own.
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.headers.update({"Content-Type": "application/json"})
+HTTP_SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=0))
+HTTP_SESSION.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=0))
+
 def get_random_endpoint():
     """
     Get an endpoint from the list of free endpoints.
@@ -95,11 +166,19 @@ def make_api_request(prompt, max_retries=3, endpoint=None):
     Returns:
         str: The API response or None if all requests failed
     """
+    # Identical prompts reuse a recent response instead of making the HTTP call again.
+    # Requests for a random endpoint share one entry, as any endpoint's answer will do.
+    cache_key = disk_cache.content_key(endpoint or "", prompt)
+    cached_response = disk_cache.load("ai_responses", cache_key, max_age=API_CACHE_TTL)
+    if cached_response:
+        logger.info("Using cached AI response")
+        return cached_response
+    
     if not endpoint:
         endpoint = get_random_endpoint()
     
-    # Add Hugging Face API token if available
-    headers = {"Content-Type": "application/json"}
+    # Add Hugging Face API token if available (the session already sets the content type)
+    headers = {}
     hf_token = os.environ.get("HUGGINGFACE_API_KEY")
     if hf_token:
         headers["Authorization"] = f"Bearer {hf_token}"
@@ -154,22 +233,27 @@ def make_api_request(prompt, max_retries=3, endpoint=None):
     for attempt in range(max_retries):
         try:
             logger.info(f"Making request to AI endpoint: {endpoint}")
-            response = requests.post(endpoint, headers=headers, json=data, timeout=30)  # Increased timeout
+            response = HTTP_SESSION.post(endpoint, headers=headers, json=data, timeout=30)  # Increased timeout
             
             if response.status_code == 200:
                 response_data = response.json()
                 
-                # Handle different response formats
+                # Handle different response formats; only text the model actually
+                # generated is cached, not a stringified error or status payload
                 if isinstance(response_data, list) and len(response_data) > 0:
                     if "generated_text" in response_data[0]:
-                        return response_data[0]["generated_text"]
+                        generated_text = response_data[0]["generated_text"]
+                        disk_cache.store("ai_responses", cache_key, generated_text)
                     else:
-                        return str(response_data[0])
+                        generated_text = str(response_data[0])
                 elif isinstance(response_data, dict) and "generated_text" in response_data:
-                    return response_data["generated_text"]
+                    generated_text = response_data["generated_text"]
+                    disk_cache.store("ai_responses", cache_key, generated_text)
                 else:
                     # Just return the whole response as string if we can't parse it
-                    return str(response_data)
+                    generated_text = str(response_data)
+                
+                return generated_text
             
             # If rate limited, wait and retry
             if response.status_code == 429:
@@ -189,6 +273,48 @@ def make_api_request(prompt, max_retries=3, endpoint=None):
     
     return None
 
+def make_api_request_with_fallback(prompt, fallback_endpoint=LAST_CHANCE_ENDPOINT):
+    """
+    Make an API request, hedging with a fallback endpoint if it fails or is slow.
+    
+    The fallback is only requested once the primary request has failed, or is still
+    running after FALLBACK_HEDGE_DELAY seconds; in that case whichever of the two
+    answers first is used.
+    
+    Args:
+        prompt (str): The prompt to send to the API
+        fallback_endpoint (str): The endpoint to fall back to
+        
+    Returns:
+        str: The API response or None if both requests failed
+    """
+    # A pool per call, so the primary starts right away rather than queueing behind
+    # other sessions' requests, and the hedge delay counts only its own running time.
+    # Both requests share HTTP_SESSION, which is safe to use from several threads.
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        primary = executor.submit(make_api_request, prompt)
+        done, _ = wait([primary], timeout=FALLBACK_HEDGE_DELAY)
+        
+        if done:
+            generated_text = primary.result()
+            if generated_text:
+                return generated_text
+            return make_api_request(prompt, endpoint=fallback_endpoint)
+        
+        # The primary request is slow (retrying or rate limited), so race it with the fallback
+        logger.info("Primary AI request is slow, also trying the fallback endpoint")
+        fallback = executor.submit(make_api_request, prompt, endpoint=fallback_endpoint)
+        for future in as_completed([primary, fallback]):
+            generated_text = future.result()
+            if generated_text:
+                return generated_text
+        
+        return None
+    finally:
+        # Don't wait for a request that lost the race
+        executor.shutdown(wait=False)
+
 def get_summary(text, max_bullets=7):
     """
     Generate a summary of the given text in bullet points using free AI APIs.
@@ -230,7 +356,7 @@ def get_summary(text, max_bullets=7):
             logger.warning("Using fallback structured summary method")
             
             # Extract sentences and organize by potential topics
-            sentences = re.split(r'(?<=[.!?])\s+', truncated_text)
+            sentences = SENTENCE_RE.split(truncated_text)
             
             # Find capitalized phrases that might be topics or key terms
             topics = []
@@ -238,11 +364,11 @@ def get_summary(text, max_bullets=7):
             
             for sentence in sentences:
                 # Look for capitalized multi-word phrases that might be topics
-                topic_matches = re.findall(r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})', sentence)
+                topic_matches = TOPIC_PHRASE_RE.findall(sentence)
                 topics.extend(topic_matches)
                 
                 # Look for capitalized terms that might be key terms
-                term_matches = re.findall(r'\b([A-Z][a-z]{3,})\b', sentence)
+                term_matches = KEY_TERM_RE.findall(sentence)
                 key_terms.extend(term_matches)
             
             # Get unique topics and terms
@@ -292,7 +418,7 @@ def get_summary(text, max_bullets=7):
                             structured_summary += f"• {point}\n"
                     structured_summary += "\n"
             
-            return {"success": True, "summary": structured_summary}
+            return {"success": True, "summary": structured_summary, "fallback": True}
     
     except Exception as e:
         return {"success": False, "error": f"Error generating summary: {str(e)}"}
@@ -355,12 +481,12 @@ def get_resources(topic, max_resources=3):
             for i in range(min(max_resources, len(reliable_sources))):
                 resources.append(reliable_sources[i])
             
-            return {"success": True, "resources": {"resources": resources}}
+            return {"success": True, "resources": {"resources": resources}, "fallback": True}
             
         # Try to parse JSON from the response
         try:
             # Check if the response contains JSON data enclosed in ```json ... ``` or similar
-            json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', generated_text)
+            json_match = JSON_BLOCK_RE.search(generated_text)
             
             if json_match:
                 json_str = json_match.group(1)
@@ -371,8 +497,7 @@ def get_resources(topic, max_resources=3):
                 
         except json.JSONDecodeError:
             # If JSON parsing fails, extract data with regex
-            resource_pattern = r'- Title: "?(.*?)"?,\s*Type: "?(.*?)"?,\s*Description: "?(.*?)"?,\s*URL: "?(https?://[^"\s]+)'
-            matches = re.findall(resource_pattern, generated_text)
+            matches = RESOURCE_LINE_RE.findall(generated_text)
             
             resources_data = []
             for match in matches:
@@ -443,7 +568,7 @@ def generate_detailed_notes(text, max_sections=3):
         if not generated_text:
             # Create basic notes from the text if API fails
             sections = []
-            sentences = re.split(r'(?<=[.!?])\s+', truncated_text)
+            sentences = SENTENCE_RE.split(truncated_text)
             
             # Try to identify potential section topics
             potential_topics = []
@@ -507,20 +632,20 @@ def generate_detailed_notes(text, max_sections=3):
                             "diagrams": diagrams
                         })
             
-            return {"success": True, "notes": sections}
+            return {"success": True, "notes": sections, "fallback": True}
         
         # Try to parse the generated text into sections
         sections = []
         
         # Split by markdown headers (## or # headers)
-        section_texts = re.split(r'(?m)^#+\s+(.+?)$', generated_text)
+        section_texts = MARKDOWN_HEADING_RE.split(generated_text)
         
         # Process each section
         current_title = None
         for i, text_block in enumerate(section_texts):
             if i % 2 == 0 and i > 0:  # Even indexes after 0 are content blocks
                 # Extract key points (bolded text)
-                key_points = re.findall(r'\*\*(.+?)\*\*', text_block)
+                key_points = BOLD_TEXT_RE.findall(text_block)
                 
                 # Extract definition (first paragraph after title)
                 paragraphs = text_block.split('\n\n')
@@ -528,7 +653,7 @@ def generate_detailed_notes(text, max_sections=3):
                 
                 # Extract examples
                 examples = []
-                example_matches = re.finditer(r'(?:Example|For example|For instance|e\.g\.)[:\s]+(.*?)(?=(?:\n\n)|$)', text_block, re.IGNORECASE | re.DOTALL)
+                example_matches = EXAMPLE_RE.finditer(text_block)
                 for match in example_matches:
                     examples.append(match.group(1).strip())
                 
@@ -537,7 +662,7 @@ def generate_detailed_notes(text, max_sections=3):
                 
                 # Extract diagram references
                 diagrams = []
-                diagram_matches = re.finditer(r'(?:Diagram|Figure|Visual|Image|Picture|Illustration|Graph|Chart)[:\s]+(.*?)(?=(?:\n\n)|$)', text_block, re.IGNORECASE | re.DOTALL)
+                diagram_matches = DIAGRAM_RE.finditer(text_block)
                 for match in diagram_matches:
                     diagrams.append(match.group(1).strip())
                 
@@ -547,7 +672,7 @@ def generate_detailed_notes(text, max_sections=3):
                     content = content.replace(f"**{point}**", point)
                 
                 # Clean up content
-                content = re.sub(r'\n{3,}', '\n\n', content.strip())
+                content = EXTRA_NEWLINES_RE.sub('\n\n', content.strip())
                 
                 # Add the section
                 sections.append({
@@ -571,7 +696,7 @@ def generate_detailed_notes(text, max_sections=3):
                     title = first_line if len(first_line.split()) <= 7 else f"Topic {i+1}"
                     
                     # Find key sentences (ones with key terms)
-                    sentences = re.split(r'(?<=[.!?])\s+', para)
+                    sentences = SENTENCE_RE.split(para)
                     definition = sentences[0] if sentences else "No definition available."
                     
                     key_sentences = []
@@ -632,8 +757,7 @@ def generate_study_guide(text):
         
         # Extract slide titles
         slide_titles = []
-        slide_pattern = r'Slide \d+:?\s*([^0-9\n]+?)(?:\d|$)'
-        matches = re.findall(slide_pattern, truncated_text)
+        matches = SLIDE_TOPIC_RE.findall(truncated_text)
         if matches:
             slide_titles = [title.strip() for title in matches if len(title.strip()) > 3]
         
@@ -651,17 +775,11 @@ def generate_study_guide(text):
             f"Format your response with clear section headings. Make sure all definitions are accurate and examples are relevant.\n\n{truncated_text}"
         )
         
-        # Try to get study guide from API
-        generated_text = make_api_request(prompt)
+        # Try to get study guide from API, with another model queried alongside as a last resort
+        generated_text = make_api_request_with_fallback(prompt)
         
         if not generated_text:
-            # Simple fallback if all APIs fail
-            # Try another model as a last resort
-            last_chance_endpoint = "https://api-inference.huggingface.co/models/google/flan-t5-xxl"
-            generated_text = make_api_request(prompt, endpoint=last_chance_endpoint)
-            
-            if not generated_text:
-                return {"success": False, "error": "Unable to generate study guide. Please try again later."}
+            return {"success": False, "error": "Unable to generate study guide. Please try again later."}
         
         # Process and structure the response
         sections = {
@@ -672,23 +790,14 @@ def generate_study_guide(text):
         
         # Try different parsing approaches for key terms
         # Method 1: Look for clearly marked sections
-        terms_pattern = r'(?:KEY TERMS?|Key Terms?|TERMS?|Terms?|DEFINITIONS?|Definitions?)(?::|;|\n)(.*?)(?:(?:IMPORTANT CONCEPTS|Important Concepts|CONCEPTS|Concepts|FLASHCARDS|Flashcards)|$)'
-        terms_match = re.search(terms_pattern, generated_text, re.DOTALL | re.IGNORECASE)
+        terms_match = TERMS_SECTION_RE.search(generated_text)
         
         if terms_match:
             terms_text = terms_match.group(1).strip()
             # Try different patterns for term:definition pairs
-            term_patterns = [
-                r'[\d\*\-\•]*\s*([^:]+)[:]\s*(.*?)(?=(?:[\d\*\-\•])|$)',  # Standard pattern
-                r'[\d\*\-\•]+\s*([^:]+)[:]\s*(.*?)(?=(?:[\d\*\-\•]+)|$)',  # Numbered items
-                r'([^:]+)[:]\s*(.*?)(?=\n\n|\n[A-Z]|\Z)',                 # Simple term: definition
-                r'([^:]+)[:]\s*(.*?)(?=\n\s*[^:]+:|\Z)'                  # Term: definition until next term
-            ]
-            
-            # Try each pattern
             term_entries = []
-            for pattern in term_patterns:
-                found_entries = re.findall(pattern, terms_text, re.DOTALL)
+            for pattern in TERM_DEFINITION_RES:
+                found_entries = pattern.findall(terms_text)
                 if found_entries:
                     term_entries = found_entries
                     break
@@ -708,7 +817,7 @@ def generate_study_guide(text):
         # Method 2: If section headers aren't clear, look for term-definition patterns directly
         if not sections["key_terms"]:
             # Look for patterns like "Term: definition" throughout the text
-            direct_terms = re.findall(r'([A-Z][a-zA-Z\s]{2,20}):\s*((?:[^\n]+\n?){1,3})', generated_text)
+            direct_terms = DIRECT_TERM_RE.findall(generated_text)
             
             for term, definition in direct_terms:
                 term = term.strip()
@@ -720,23 +829,13 @@ def generate_study_guide(text):
                     })
         
         # Extract important concepts with multiple patterns
-        concepts_patterns = [
-            r'(?:IMPORTANT CONCEPTS|Important Concepts|CONCEPTS|Concepts)(?::|;|\n)(.*?)(?:(?:FLASHCARDS|Flashcards)|$)',
-            r'(?:KEY CONCEPTS|Key Concepts)(?::|;|\n)(.*?)(?:(?:FLASHCARDS|Flashcards)|$)'
-        ]
-        
-        for pattern in concepts_patterns:
-            concepts_match = re.search(pattern, generated_text, re.DOTALL | re.IGNORECASE)
+        for pattern in CONCEPTS_SECTION_RES:
+            concepts_match = pattern.search(generated_text)
             if concepts_match:
                 concepts_text = concepts_match.group(1).strip()
                 # Try different patterns for bullet points or numbered items
-                concept_patterns = [
-                    r'[\d\*\-\•]+\s*(.*?)(?=(?:[\d\*\-\•]+)|$)',  # Bulleted or numbered
-                    r'(?:^|\n)\s*((?:[^\n]+\n?){1,3})'            # Any paragraph-like chunk
-                ]
-                
-                for cp in concept_patterns:
-                    concept_entries = re.findall(cp, concepts_text, re.DOTALL)
+                for cp in CONCEPT_ENTRY_RES:
+                    concept_entries = cp.findall(concepts_text)
                     if concept_entries:
                         for concept in concept_entries:
                             concept = concept.strip()
@@ -748,32 +847,21 @@ def generate_study_guide(text):
         if not sections["important_concepts"]:
             # Look for sentences containing key phrases that suggest important concepts
             key_phrases = ["is defined as", "refers to", "is a concept", "important to note", "key concept"]
-            sentences = re.split(r'(?<=[.!?])\s+', generated_text)
+            sentences = SENTENCE_RE.split(generated_text)
             
             for sentence in sentences:
                 if any(phrase in sentence.lower() for phrase in key_phrases) and len(sentence) > 20:
                     sections["important_concepts"].append(sentence.strip())
         
         # Extract flashcards with varied patterns
-        cards_patterns = [
-            r'(?:FLASHCARDS|Flashcards)(?::|;|\n)(.*?)$',
-            r'(?:STUDY CARDS|Study Cards|QUESTION|QUESTIONS)(?::|;|\n)(.*?)$'
-        ]
-        
-        for pattern in cards_patterns:
-            cards_match = re.search(pattern, generated_text, re.DOTALL | re.IGNORECASE)
+        for pattern in FLASHCARDS_SECTION_RES:
+            cards_match = pattern.search(generated_text)
             if cards_match:
                 cards_text = cards_match.group(1).strip()
                 
                 # Try various Q&A patterns
-                qa_patterns = [
-                    r'[\d\*\-\•]*\s*(?:Q:|Question:)?\s*([^?]*\?)\s*(?:A:|Answer:)?\s*(.*?)(?=(?:[\d\*\-\•](?:\s*(?:Q:|Question:)))|$)',
-                    r'(?:Q:|Question:)\s*([^?]*\?)\s*(?:A:|Answer:)\s*(.*?)(?=(?:Q:|Question:)|$)',
-                    r'(\d+\.\s*[^?]*\?)\s*(.*?)(?=\d+\.\s*|$)'
-                ]
-                
-                for qap in qa_patterns:
-                    card_entries = re.findall(qap, cards_text, re.DOTALL | re.IGNORECASE)
+                for qap in FLASHCARD_ENTRY_RES:
+                    card_entries = qap.findall(cards_text)
                     if card_entries:
                         for question, answer in card_entries:
                             question = question.strip()
@@ -788,8 +876,8 @@ def generate_study_guide(text):
         # Generate reliable fallback content if we couldn't parse properly
         if not sections["key_terms"]:
             # Extract capitalized terms that are likely important concepts
-            cap_terms = re.findall(r'\b([A-Z][a-z]{3,}(?:\s+[A-Z]?[a-z]+){0,2})\b', truncated_text)
-            slide_titles = re.findall(r'Slide \d+:?\s*([^0-9\n]+?)(?:\d|$)', truncated_text)
+            cap_terms = CAPITALIZED_TERM_RE.findall(truncated_text)
+            slide_titles = SLIDE_TOPIC_RE.findall(truncated_text)
             
             potential_terms = []
             
@@ -811,7 +899,7 @@ def generate_study_guide(text):
                 
                 # Find a sentence containing this term to use as definition
                 term_sentences = []
-                sentences = re.split(r'(?<=[.!?])\s+', truncated_text)
+                sentences = SENTENCE_RE.split(truncated_text)
                 
                 for sentence in sentences:
                     if term in sentence and len(sentence) > 20:
@@ -826,7 +914,7 @@ def generate_study_guide(text):
         
         if not sections["important_concepts"]:
             # Extract sentences that seem to define concepts
-            sentences = re.split(r'(?<=[.!?])\s+', truncated_text)
+            sentences = SENTENCE_RE.split(truncated_text)
             concept_sentences = []
             
             # Look for definitional sentences
@@ -836,7 +924,7 @@ def generate_study_guide(text):
                         concept_sentences.append(sentence)
             
             # Add slide headers if available
-            slide_headers = re.findall(r'Slide \d+:\s*([^\n]+)', truncated_text)
+            slide_headers = SLIDE_HEADER_RE.findall(truncated_text)
             
             # Take top 5 concepts
             for i, sentence in enumerate(concept_sentences[:5]):
@@ -844,8 +932,8 @@ def generate_study_guide(text):
         
         if not sections["flashcards"]:
             # Generate Q&A pairs from content
-            sentences = re.split(r'(?<=[.!?])\s+', truncated_text)
-            slide_titles = re.findall(r'Slide \d+:?\s*([^0-9\n]+?)(?:\d|$)', truncated_text)
+            sentences = SENTENCE_RE.split(truncated_text)
+            slide_titles = SLIDE_TOPIC_RE.findall(truncated_text)
             
             flashcards_created = 0
             
@@ -877,7 +965,7 @@ def generate_study_guide(text):
                         break
                     
                     if " is " in sentence or " refers to " in sentence:
-                        parts = re.split(r' is | refers to | means ', sentence, maxsplit=1)
+                        parts = DEFINITION_SPLIT_RE.split(sentence, maxsplit=1)
                         if len(parts) == 2 and len(parts[0]) > 3 and len(parts[1]) > 10:
                             sections["flashcards"].append({
                                 "question": f"What is {parts[0].strip()}?",
@@ -924,8 +1012,7 @@ def generate_quiz(text, num_questions=5):
         
         # Extract slide titles and topics for more targeted questions
         slide_titles = []
-        slide_pattern = r'Slide \d+:?\s*([^0-9\n]+?)(?:\d|$)'
-        matches = re.findall(slide_pattern, truncated_text)
+        matches = SLIDE_TOPIC_RE.findall(truncated_text)
         if matches:
             slide_titles = [title.strip() for title in matches if len(title.strip()) > 3]
         
@@ -945,22 +1032,17 @@ def generate_quiz(text, num_questions=5):
             f"Format each question with a number, followed by options on separate lines.\n\n{truncated_text}"
         )
         
-        # Try to get quiz from API
-        generated_text = make_api_request(prompt)
+        # Try to get quiz from API, with another model queried alongside as a last resort
+        generated_text = make_api_request_with_fallback(prompt)
         
         if not generated_text:
-            # Try another model as a last resort
-            last_chance_endpoint = "https://api-inference.huggingface.co/models/google/flan-t5-xxl"
-            generated_text = make_api_request(prompt, endpoint=last_chance_endpoint)
-            
-            if not generated_text:
-                return {"success": False, "error": "Unable to generate quiz. Please try again later."}
+            return {"success": False, "error": "Unable to generate quiz. Please try again later."}
         
         # Process and structure the response
         quiz_questions = []
         
         # Extract questions, options, answers and explanations
-        questions = re.split(r'\d+\.\s+', generated_text)
+        questions = QUESTION_SPLIT_RE.split(generated_text)
         # Remove empty first element if split creates it
         if questions and not questions[0].strip():
             questions = questions[1:]
@@ -970,7 +1052,7 @@ def generate_quiz(text, num_questions=5):
                 continue
                 
             # Extract question text
-            question_match = re.match(r'([^\n]+)', q_text)
+            question_match = FIRST_LINE_RE.match(q_text)
             if not question_match:
                 continue
             
@@ -978,7 +1060,7 @@ def generate_quiz(text, num_questions=5):
             
             # Extract options
             options = {}
-            option_matches = re.findall(r'([A-D])(?:\.|\))\s+([^\n]+)', q_text)
+            option_matches = OPTION_RE.findall(q_text)
             
             for opt, text in option_matches:
                 options[opt] = text.strip()
@@ -991,11 +1073,11 @@ def generate_quiz(text, num_questions=5):
                 options[missing[0]] = f"Option {missing[0]}"
             
             # Extract correct answer
-            correct_match = re.search(r'(?:Answer|Correct(?:\s+Answer)?|The correct answer is)[^A-D]*([A-D])', q_text, re.IGNORECASE)
+            correct_match = CORRECT_ANSWER_RE.search(q_text)
             correct_answer = correct_match.group(1) if correct_match else "A"
             
             # Extract explanation
-            explanation_match = re.search(r'(?:Explanation|Reason)[^\n]*:\s*([^\n]+)', q_text, re.IGNORECASE)
+            explanation_match = EXPLANATION_RE.search(q_text)
             explanation = explanation_match.group(1).strip() if explanation_match else "See the text for details."
             
             quiz_questions.append({
@@ -1008,8 +1090,8 @@ def generate_quiz(text, num_questions=5):
         # Ensure we have the requested number of questions
         if len(quiz_questions) < num_questions:
             # Extract sentences for basic questions if needed
-            sentences = re.split(r'(?<=[.!?])\s+', truncated_text)
-            keywords = re.findall(r'\b[A-Z][a-z]{5,}\b', truncated_text)
+            sentences = SENTENCE_RE.split(truncated_text)
+            keywords = LONG_CAPITALIZED_WORD_RE.findall(truncated_text)
             
             for i in range(len(quiz_questions), num_questions):
                 if i < len(sentences) and len(sentences[i].split()) > 5:
@@ -0,0 +1,56 @@
+"""
+Shared NLP resources for the AI Study Assistant.
+The NLTK data is loaded once per Streamlit server process and shared across all sessions.
+NLTK itself is only imported the first time those resources are needed.
+"""
+
+import logging
+import streamlit as st
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Used when the NLTK stopwords corpus is not available
+FALLBACK_STOP_WORDS = frozenset({"the", "and", "a", "an", "in", "on", "at", "with", "for", "to", "of", "is", "are"})
+
+# NLTK resources needed for topic extraction, as (resource name, data path) pairs
+NLTK_RESOURCES = (("stopwords", "corpora/stopwords"),)
+
+def ensure_nltk_resource(resource, path):
+    """Download a single NLTK resource if it is not already present."""
+    import nltk
+    
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        try:
+            nltk.download(resource, quiet=True)
+        except Exception as e:
+            # Continue even if download fails
+            logger.warning(f"Could not download NLTK {resource}: {str(e)}")
+
+def ensure_nltk_data():
+    """Download the NLTK data used by the app if not already present."""
+    for resource, path in NLTK_RESOURCES:
+        ensure_nltk_resource(resource, path)
+
+@st.cache_resource
+def get_nlp():
+    """
+    Load the English stopwords once per process.
+    
+    Returns:
+        dict: Dictionary with a stop_words set
+    """
+    try:
+        ensure_nltk_data()
+        from nltk.corpus import stopwords
+        stop_words = frozenset(stopwords.words('english'))
+    except (ImportError, LookupError):
+        # Fallback if NLTK or its data is not available
+        logger.warning("NLTK stopwords not available, using the built-in list")
+        stop_words = FALLBACK_STOP_WORDS
+    
+    return {
+        "stop_words": stop_words
+    }
@@ -16,22 +16,9 @@ if OPENAI_API_KEY:
     except Exception as e:
         print(f"Error initializing OpenAI client: {e}")
 
-def get_summary(text, max_bullets=7):
-    """
-    Generate a summary of the given text in bullet points.
-    
-    Args:
-        text (str): The text to summarize
-        max_bullets (int): Maximum number of bullet points to generate
-        
-    Returns:
-        dict: Dictionary with success status and either summary or error message
-    """
-    if client is None:
-        return {"success": False, "error": "OpenAI API key not configured"}
-        
-    try:
-        prompt = f"""
+def build_summary_request(text, max_bullets=7):
+    """Build the chat completion request body for a summary."""
+    prompt = f"""
         Create a comprehensive, structured summary of the key concepts from the following text:
 
         {text}
@@ -49,34 +36,40 @@ def get_summary(text, max_bullets=7):
         Use markdown formatting throughout for clear, structured presentation.
         """
 
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=1000,
-        )
-        
-        summary = response.choices[0].message.content
-        return {"success": True, "summary": summary}
-    
-    except Exception as e:
-        return {"success": False, "error": f"Error generating summary: {str(e)}"}
+    return {
+        "model": MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": 1000,
+    }
 
-def get_resources(topic, max_resources=3):
+def parse_summary_response(content):
+    """Turn the raw content of a summary completion into a result dict."""
+    return {"success": True, "summary": content}
+
+def get_summary(text, max_bullets=7):
     """
-    Generate suggested resources for the given topic.
+    Generate a summary of the given text in bullet points.
     
     Args:
-        topic (str): The topic to find resources for
-        max_resources (int): Maximum number of resources to suggest
+        text (str): The text to summarize
+        max_bullets (int): Maximum number of bullet points to generate
         
     Returns:
-        dict: Dictionary with success status and either resources or error message
+        dict: Dictionary with success status and either summary or error message
     """
     if client is None:
         return {"success": False, "error": "OpenAI API key not configured"}
         
     try:
-        prompt = f"""
+        response = client.chat.completions.create(**build_summary_request(text, max_bullets))
+        return parse_summary_response(response.choices[0].message.content)
+    
+    except Exception as e:
+        return {"success": False, "error": f"Error generating summary: {str(e)}"}
+
+def build_resources_request(topic, max_resources=3):
+    """Build the chat completion request body for resource suggestions."""
+    prompt = f"""
         Create {max_resources} reliable educational resources on the topic: "{topic}"
         
         For each resource, create:
@@ -104,42 +97,49 @@ def get_resources(topic, max_resources=3):
         }}
         """
 
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            max_tokens=1000,
-        )
-        
-        try:
-            content = response.choices[0].message.content
-            resources = json.loads(content)
-            # Make sure resources has the expected format
-            if "resources" not in resources:
-                resources = {"resources": resources}
-            return {"success": True, "resources": resources}
-        except json.JSONDecodeError as e:
-            # Fallback for invalid JSON
-            return {"success": False, "error": f"Error parsing JSON response: {str(e)}"}
-    
-    except Exception as e:
-        return {"success": False, "error": f"Error finding resources: {str(e)}"}
+    return {
+        "model": MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {"type": "json_object"},
+        "max_tokens": 1000,
+    }
 
-def generate_study_guide(text):
+def parse_resources_response(content):
+    """Turn the raw content of a resources completion into a result dict."""
+    try:
+        resources = json.loads(content)
+        # Make sure resources has the expected format
+        if "resources" not in resources:
+            resources = {"resources": resources}
+        return {"success": True, "resources": resources}
+    except json.JSONDecodeError as e:
+        # Fallback for invalid JSON
+        return {"success": False, "error": f"Error parsing JSON response: {str(e)}"}
+
+def get_resources(topic, max_resources=3):
     """
-    Generate a study guide with definitions, key terms, and flashcards.
+    Generate suggested resources for the given topic.
     
     Args:
-        text (str): The text to generate a study guide from
+        topic (str): The topic to find resources for
+        max_resources (int): Maximum number of resources to suggest
         
     Returns:
-        dict: Dictionary with success status and either study guide or error message
+        dict: Dictionary with success status and either resources or error message
     """
     if client is None:
         return {"success": False, "error": "OpenAI API key not configured"}
         
     try:
-        prompt = f"""
+        response = client.chat.completions.create(**build_resources_request(topic, max_resources))
+        return parse_resources_response(response.choices[0].message.content)
+    
+    except Exception as e:
+        return {"success": False, "error": f"Error finding resources: {str(e)}"}
+
+def build_study_guide_request(text):
+    """Build the chat completion request body for a study guide."""
+    prompt = f"""
         Create a comprehensive study guide based on the following text:
         
         {text}
@@ -168,43 +168,48 @@ def generate_study_guide(text):
         }}
         """
 
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            max_tokens=2000,
-        )
-        
-        try:
-            content = response.choices[0].message.content
-            result = json.loads(content)
-            # Make sure response has expected format
-            if "study_guide" not in result:
-                result = {"study_guide": result}
-            return {"success": True, "study_guide": result}
-        except json.JSONDecodeError as e:
-            # Fallback for invalid JSON
-            return {"success": False, "error": f"Error parsing JSON response: {str(e)}"}
-    
-    except Exception as e:
-        return {"success": False, "error": f"Error generating study guide: {str(e)}"}
+    return {
+        "model": MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {"type": "json_object"},
+        "max_tokens": 2000,
+    }
 
-def generate_quiz(text, num_questions=5):
+def parse_study_guide_response(content):
+    """Turn the raw content of a study guide completion into a result dict."""
+    try:
+        result = json.loads(content)
+        # Make sure response has expected format
+        if "study_guide" not in result:
+            result = {"study_guide": result}
+        return {"success": True, "study_guide": result}
+    except json.JSONDecodeError as e:
+        # Fallback for invalid JSON
+        return {"success": False, "error": f"Error parsing JSON response: {str(e)}"}
+
+def generate_study_guide(text):
     """
-    Generate multiple-choice quiz questions based on the text.
+    Generate a study guide with definitions, key terms, and flashcards.
     
     Args:
-        text (str): The text to generate questions from
-        num_questions (int): Number of questions to generate
+        text (str): The text to generate a study guide from
         
     Returns:
-        dict: Dictionary with success status and either quiz or error message
+        dict: Dictionary with success status and either study guide or error message
     """
     if client is None:
         return {"success": False, "error": "OpenAI API key not configured"}
         
     try:
-        prompt = f"""
+        response = client.chat.completions.create(**build_study_guide_request(text))
+        return parse_study_guide_response(response.choices[0].message.content)
+    
+    except Exception as e:
+        return {"success": False, "error": f"Error generating study guide: {str(e)}"}
+
+def build_quiz_request(text, num_questions=5):
+    """Build the chat completion request body for a quiz."""
+    prompt = f"""
         Create {num_questions} multiple-choice questions based on this text:
         
         {text}
@@ -233,32 +238,154 @@ def generate_quiz(text, num_questions=5):
         }}
         """
 
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            max_tokens=2000,
-        )
+    return {
+        "model": MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {"type": "json_object"},
+        "max_tokens": 2000,
+    }
+
+def parse_quiz_response(content):
+    """Turn the raw content of a quiz completion into a result dict."""
+    try:
+        result = json.loads(content)
+        # Make sure response has expected format
+        if "quiz" not in result:
+            # If the response is an array, wrap it in an object
+            if isinstance(result, list):
+                result = {"quiz": result}
+            # If it's an object but doesn't have quiz key, add it
+            else:
+                result = {"quiz": result}
+        return {"success": True, "quiz": result}
+    except json.JSONDecodeError as e:
+        # Fallback for invalid JSON
+        return {"success": False, "error": f"Error parsing JSON response: {str(e)}"}
+
+def generate_quiz(text, num_questions=5):
+    """
+    Generate multiple-choice quiz questions based on the text.
+    
+    Args:
+        text (str): The text to generate questions from
+        num_questions (int): Number of questions to generate
         
-        try:
-            content = response.choices[0].message.content
-            result = json.loads(content)
-            # Make sure response has expected format
-            if "quiz" not in result:
-                # If the response is an array, wrap it in an object
-                if isinstance(result, list):
-                    result = {"quiz": result}
-                # If it's an object but doesn't have quiz key, add it
-                else:
-                    result = {"quiz": result}
-            return {"success": True, "quiz": result}
-        except json.JSONDecodeError as e:
-            # Fallback for invalid JSON
-            return {"success": False, "error": f"Error parsing JSON response: {str(e)}"}
+    Returns:
+        dict: Dictionary with success status and either quiz or error message
+    """
+    if client is None:
+        return {"success": False, "error": "OpenAI API key not configured"}
+        
+    try:
+        response = client.chat.completions.create(**build_quiz_request(text, num_questions))
+        return parse_quiz_response(response.choices[0].message.content)
     
     except Exception as e:
         return {"success": False, "error": f"Error generating quiz: {str(e)}"}
 
+# Parsers used to turn each line of a batch output file back into a result dict
+BATCH_RESPONSE_PARSERS = {
+    "summary": parse_summary_response,
+    "resources": parse_resources_response,
+    "study_guide": parse_study_guide_response,
+    "quiz": parse_quiz_response,
+}
+
+def submit_study_kit_batch(text, topic):
+    """
+    Submit the summary, resources, study guide and quiz prompts as one Batch API job.
+    
+    Batch jobs are billed at half the synchronous price but complete asynchronously,
+    so the results have to be collected later with retrieve_study_kit_batch.
+    
+    Args:
+        text (str): The study text
+        topic (str): The main topic used for resource suggestions
+        
+    Returns:
+        dict: Dictionary with success status and either batch_id or error message
+    """
+    if client is None:
+        return {"success": False, "error": "OpenAI API key not configured"}
+    
+    try:
+        batch_requests = {
+            "summary": build_summary_request(text),
+            "resources": build_resources_request(topic),
+            "study_guide": build_study_guide_request(text),
+            "quiz": build_quiz_request(text),
+        }
+        
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body
+            })
+            for custom_id, body in batch_requests.items()
+        ]
+        batch_input = "\n".join(lines).encode("utf-8")
+        
+        input_file = client.files.create(file=("study_kit_batch.jsonl", batch_input), purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return {"success": True, "batch_id": batch.id}
+    
+    except Exception as e:
+        return {"success": False, "error": f"Error submitting batch: {str(e)}"}
+
+def retrieve_study_kit_batch(batch_id):
+    """
+    Check on a study kit batch and parse its output once it has completed.
+    
+    Args:
+        batch_id (str): The id returned by submit_study_kit_batch
+        
+    Returns:
+        dict: Dictionary with success status, the batch status and, once completed,
+              a results dict keyed by "summary", "resources", "study_guide" and "quiz"
+    """
+    if client is None:
+        return {"success": False, "error": "OpenAI API key not configured"}
+    
+    try:
+        batch = client.batches.retrieve(batch_id)
+        
+        if batch.status in ("failed", "expired", "cancelled"):
+            return {"success": False, "status": batch.status, "error": f"Batch {batch.status}"}
+        
+        if batch.status != "completed":
+            return {"success": True, "status": batch.status, "results": None}
+        
+        results = {}
+        if batch.output_file_id:
+            output = client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                custom_id = entry.get("custom_id")
+                parser = BATCH_RESPONSE_PARSERS.get(custom_id)
+                if parser is None:
+                    continue
+                
+                response = entry.get("response") or {}
+                if entry.get("error") or response.get("status_code") != 200:
+                    results[custom_id] = {"success": False, "error": f"Batch request failed: {entry.get('error')}"}
+                    continue
+                
+                content = response["body"]["choices"][0]["message"]["content"]
+                results[custom_id] = parser(content)
+        
+        return {"success": True, "status": batch.status, "results": results}
+    
+    except Exception as e:
+        return {"success": False, "error": f"Error retrieving batch: {str(e)}"}
+
 def generate_personalized_insights(prompt_text):
     """
     Generate personalized insights based on a user's profile and study content.
@@ -3,6 +3,7 @@ import os
 import io
 import re
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from .file_processor import process_file
 from . import content_processor
 
@@ -215,9 +216,15 @@ def process_profile_data(resume_file, linkedin_file, study_content):
             "error": None
         }
         
+        # Parse the resume and LinkedIn profile concurrently, since they are independent
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            resume_future = executor.submit(extract_text_from_resume, resume_file) if resume_file else None
+            linkedin_future = executor.submit(extract_text_from_linkedin, linkedin_file) if linkedin_file else None
+            resume_result = resume_future.result() if resume_future else None
+            linkedin_result = linkedin_future.result() if linkedin_future else None
+        
         # Process resume
-        if resume_file:
-            resume_result = extract_text_from_resume(resume_file)
+        if resume_result:
             if not resume_result["success"]:
                 return {"success": False, "error": f"Error processing resume: {resume_result['error']}"}
             resume_text = resume_result["text"]
@@ -225,8 +232,7 @@ def process_profile_data(resume_file, linkedin_file, study_content):
             resume_text = "No resume provided."
         
         # Process LinkedIn profile
-        if linkedin_file:
-            linkedin_result = extract_text_from_linkedin(linkedin_file)
+        if linkedin_result:
             if not linkedin_result["success"]:
                 return {"success": False, "error": f"Error processing LinkedIn profile: {linkedin_result['error']}"}
             linkedin_text = linkedin_result["text"]
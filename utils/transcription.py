@@ -1,26 +1,29 @@
-import os
-import tempfile
 import requests
+import streamlit as st
 from youtube_transcript_api import YouTubeTranscriptApi
 import re
-from faster_whisper import WhisperModel
 
-# Initialize Whisper model
+# Whisper model settings
 # Options for model size: "tiny", "base", "small", "medium", "large-v2"
 model_size = "base"
-whisper_model = WhisperModel(model_size, device="cpu", compute_type="int8")
+
+@st.cache_resource
+def get_whisper_model():
+    """Load the Whisper model once per process, on first use so YouTube-only sessions never pay for it."""
+    from faster_whisper import WhisperModel
+    return WhisperModel(model_size, device="cpu", compute_type="int8")
+
+# Common YouTube URL patterns, compiled once at import
+YOUTUBE_ID_PATTERNS = [
+    re.compile(r'(?:https?:\/\/)?(?:www\.)?youtube\.com\/watch\?v=([^&\s]+)'),
+    re.compile(r'(?:https?:\/\/)?(?:www\.)?youtu\.be\/([^\?\s]+)'),
+    re.compile(r'(?:https?:\/\/)?(?:www\.)?youtube\.com\/embed\/([^\?\s]+)')
+]
 
 def extract_youtube_id(url):
     """Extract YouTube video ID from a URL."""
-    # Common YouTube URL patterns
-    patterns = [
-        r'(?:https?:\/\/)?(?:www\.)?youtube\.com\/watch\?v=([^&\s]+)',
-        r'(?:https?:\/\/)?(?:www\.)?youtu\.be\/([^\?\s]+)',
-        r'(?:https?:\/\/)?(?:www\.)?youtube\.com\/embed\/([^\?\s]+)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
+    for pattern in YOUTUBE_ID_PATTERNS:
+        match = pattern.search(url)
         if match:
             return match.group(1)
     
@@ -81,42 +84,19 @@ def get_youtube_transcript(youtube_url):
 
 def transcribe_audio(audio_file):
     """Transcribe audio file using Hugging Face's faster-whisper implementation."""
-    temp_path = None
     try:
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_file:
-            # Write uploaded file to the temp file
-            temp_file.write(audio_file.getvalue())
-            temp_path = temp_file.name
-        
-        # Transcribe the audio file with faster-whisper
-        segments, info = whisper_model.transcribe(temp_path, beam_size=5)
-        
-        # Check if transcription was successful
-        if not segments:
-            return {"success": False, "error": "No speech detected in the audio file."}
-        
-        # Combine all segments into a full transcript
-        transcription_text = ""
-        for segment in segments:
-            transcription_text += segment.text + " "
+        # faster-whisper decodes file-like objects directly, so the upload is read
+        # in place instead of being copied to a temporary file first
+        audio_file.seek(0)
+        segments, info = get_whisper_model().transcribe(audio_file, beam_size=5)
         
-        # Clean up the temporary file
-        if temp_path:
-            os.unlink(temp_path)
-            temp_path = None
+        # Combine all segments into a full transcript (transcription runs as segments are consumed)
+        transcription_text = " ".join(segment.text for segment in segments)
         
         if not transcription_text.strip():
-            return {"success": False, "error": "Transcription result is empty."}
+            return {"success": False, "error": "No speech detected in the audio file."}
         
         return {"success": True, "transcript": transcription_text.strip()}
     
     except Exception as e:
-        # Clean up the temporary file if it exists
-        if temp_path:
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
-        
         return {"success": False, "error": f"Error transcribing audio: {str(e)}"}